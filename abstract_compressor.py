@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Extractive abstract compression: keep each abstract's most useful sentences.
+
+Word truncation keeps an abstract's opening (motivation) and drops its end,
+where the results usually are. Instead, every sentence in the window is scored
+locally, with no API call:
+
+- salience: mean TF-IDF of its terms, with term frequency taken within the
+  paper and document frequency across all abstracts in the window;
+- position: the opening sentence (the problem) and the closing ones (results,
+  conclusions) score higher than the middle (method details);
+- result cues: numbers with units or percentages and words like "outperforms",
+  "improves", "reduces".
+
+The best sentences of each paper are kept, in their original order, until the
+per-paper token budget is used. Tokenizing sentences is the only per-sentence
+Python work; scoring and selection are NumPy operations over the whole window.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from paper_corpus import load_payload_entries, load_weeks
+from payload_planner import estimate_tokens, split_line, word_tokens
+
+DEFAULT_ABSTRACT_TOKENS = 120
+SALIENCE_WEIGHT = 1.0
+POSITION_WEIGHT = 0.5
+RESULT_WEIGHT = 1.0
+# Result cues counted per sentence before the score saturates.
+RESULT_CUE_CAP = 2
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+TERM_RE = re.compile(r"[a-z][a-z0-9-]{2,}")
+# Matched against lowercased sentences; a single alternation keeps the scan cheap.
+RESULT_RE = re.compile(
+    r"\b(?:\d+(?:\.\d+)?\s*(?:%|percent\b|db\b|x\b|times\b|fold\b|ms\b|[gm]bps\b|bps/hz)"
+    r"|outperform|improv|achiev|reduc|gain|increas|decreas|speedup|superior|compared)"
+)
+STOPWORDS = frozenset(
+    """
+    the and for are with this that from which these those their its into than then also can has have
+    been being was were our not but such via over under each both more most other based using use used
+    paper propose proposed study work approach method new show shows shown
+    """.split()
+)
+
+
+def split_sentences(text: str) -> list[str]:
+    text = " ".join(text.split())
+    if text.endswith("..."):  # already word-truncated in the payload cache
+        text = text[:-3].rstrip()
+    return [s for s in SENTENCE_RE.split(text) if s]
+
+
+def text_tokens(text: str) -> int:
+    return sum(map(word_tokens, text.split()))
+
+
+def score_sentences(papers: list[list[str]]) -> tuple[np.ndarray, np.ndarray]:
+    """Return (paper index, score) arrays over the concatenated sentences of papers."""
+    words: list[str] = []
+    n_words: list[int] = []
+    sentence_paper: list[int] = []
+    position: list[float] = []
+    cues: list[int] = []
+    for p, sentences in enumerate(papers):
+        last = len(sentences) - 1
+        for i, sentence in enumerate(sentences):
+            lower = sentence.lower()
+            found = TERM_RE.findall(lower)
+            words.extend(found)
+            n_words.append(len(found))
+            sentence_paper.append(p)
+            position.append(1.0 if i == 0 else i / last)
+            cues.append(len(RESULT_RE.findall(lower)))
+
+    paper_of = np.array(sentence_paper, dtype=np.int64)
+    n_sentences = len(paper_of)
+    if not n_sentences:
+        return paper_of, np.zeros(0)
+    vocab = {w: i for i, w in enumerate(dict.fromkeys(words))}
+    terms = np.fromiter(map(vocab.__getitem__, words), dtype=np.int64, count=len(words))
+    sentence_of = np.repeat(np.arange(n_sentences), n_words)
+    content = ~np.isin(terms, [vocab[w] for w in STOPWORDS if w in vocab])
+    terms, sentence_of = terms[content], sentence_of[content]
+
+    salience = np.zeros(n_sentences)
+    if len(terms):
+        n_vocab = len(vocab)
+        pairs, inverse, tf = np.unique(paper_of[sentence_of] * n_vocab + terms, return_inverse=True, return_counts=True)
+        df = np.bincount(pairs % n_vocab, minlength=n_vocab)
+        idf = np.log((len(papers) + 1) / (df + 1)) + 1.0
+        weights = tf[inverse] * idf[terms]
+        counts = np.bincount(sentence_of, minlength=n_sentences)
+        salience = np.bincount(sentence_of, weights=weights, minlength=n_sentences) / np.maximum(counts, 1)
+        best = np.zeros(len(papers))
+        np.maximum.at(best, paper_of, salience)
+        salience /= np.where(best > 0, best, 1.0)[paper_of]
+
+    result = np.minimum(np.array(cues), RESULT_CUE_CAP) / RESULT_CUE_CAP
+    score = SALIENCE_WEIGHT * salience + POSITION_WEIGHT * np.array(position) + RESULT_WEIGHT * result
+    return paper_of, score
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    kept, used = [], 0
+    for word in text.split():
+        used += word_tokens(word)
+        if used > budget:
+            break
+        kept.append(word)
+    return " ".join(kept)
+
+
+def compress_abstracts(abstracts: list[str], budget: int = DEFAULT_ABSTRACT_TOKENS) -> list[str]:
+    """Compress each abstract to its best sentences within budget estimated tokens.
+
+    Abstracts already within the budget are returned unchanged (they still
+    count toward the window's document frequencies). A paper always keeps its
+    best sentence, cut at the budget if that sentence alone is too long.
+    """
+    papers = [split_sentences(a) for a in abstracts]
+    paper_of, score = score_sentences(papers)
+    flat = [s for sentences in papers for s in sentences]
+    tokens = np.array([text_tokens(s) for s in flat], dtype=np.int64)
+
+    # Sort by paper, then score (best first); keep the prefix of each paper that fits.
+    order = np.lexsort((-score, paper_of))
+    paper_sorted = paper_of[order]
+    cumulative = np.cumsum(tokens[order])
+    starts = np.flatnonzero(np.r_[True, paper_sorted[1:] != paper_sorted[:-1]])
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(order)]))
+    offset = np.r_[0, cumulative][starts]
+    within = cumulative - offset[group]
+    keep = np.zeros(len(flat), dtype=bool)
+    keep[order[(within <= budget) | (np.arange(len(order)) == starts[group])]] = True
+
+    out = []
+    first = 0
+    for abstract, sentences in zip(abstracts, papers):
+        span = slice(first, first + len(sentences))
+        first += len(sentences)
+        if tokens[span].sum() <= budget:
+            out.append(abstract)
+            continue
+        text = " ".join(s for s, k in zip(sentences, keep[span]) if k)
+        out.append(truncate_to_tokens(text, budget) if text_tokens(text) > budget else text)
+    return out
+
+
+def compress_entries(entries: list[dict], budget: int = DEFAULT_ABSTRACT_TOKENS) -> tuple[int, int, int]:
+    """Rewrite the abstract field of each entry's payload line in place.
+
+    Sentences are picked from the entry's full "abstract" when it has one, not
+    from the word-truncated copy in its line. Returns (abstracts shortened,
+    abstract tokens before, after), counted on the payload lines.
+    """
+    prefixes, abstracts = zip(*(split_line(e["line"]) for e in entries)) if entries else ((), ())
+    # Escaped as payload_line does, so the line keeps exactly four separators.
+    full = [(e.get("abstract") or old).replace("|", "/") for e, old in zip(entries, abstracts)]
+    compressed = compress_abstracts(full, budget)
+    shortened = before = after = 0
+    for entry, prefix, old, source, new in zip(entries, prefixes, abstracts, full, compressed):
+        if new == source:
+            new = old  # within budget: keep the line's own formatting
+        before += text_tokens(old)
+        after += text_tokens(new)
+        if new != old:
+            entry["line"] = f"{prefix} | {new}"
+            shortened += 1
+    return shortened, before, after
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Preview extractive abstract compression on recent weeks.")
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument("--weeks", type=int, default=4, help="Number of recent weeks to compress")
+    parser.add_argument("--tokens", type=int, default=DEFAULT_ABSTRACT_TOKENS, help="Per-paper abstract token budget")
+    parser.add_argument("--show", type=int, default=3, help="Print N compressed abstracts next to the originals")
+    args = parser.parse_args()
+
+    week_dirs = load_weeks(Path(args.resource_dir) / "by_publication_week", args.weeks)
+    if not week_dirs:
+        print("No week folders found.", file=sys.stderr)
+        sys.exit(1)
+    entries = load_payload_entries(week_dirs)
+    originals = [e["line"] for e in entries]
+    start = time.perf_counter()
+    shortened, before, after = compress_entries(entries, args.tokens)
+    elapsed = time.perf_counter() - start
+    print(f"{len(entries)} papers, {shortened} abstracts compressed in {elapsed:.2f}s")
+    print(f"Abstract tokens: {before:,} → {after:,} (payload lines {sum(map(estimate_tokens, originals)):,} → "
+          f"{sum(estimate_tokens(e['line']) for e in entries):,})")
+    changed = [(old, e["line"]) for old, e in zip(originals, entries) if old != e["line"]]
+    for old, new in changed[: args.show]:
+        print(f"\n- {split_line(old)[1]}\n+ {split_line(new)[1]}")
+
+
+if __name__ == "__main__":
+    main()
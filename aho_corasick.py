@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Aho-Corasick multi-pattern matcher over any sequence of hashable symbols.
+
+Patterns are sequences (strings for character matching, lists of words for
+phrase matching). Every occurrence of every pattern in a text is found in one
+left-to-right pass, independent of how many patterns there are.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Hashable, Iterable, Iterator, Sequence
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[Sequence[Hashable]]) -> None:
+        self.goto: list[dict[Hashable, int]] = [{}]
+        self.fail: list[int] = [0]
+        # Tuples rather than lists: tuples of ints are untracked by the garbage
+        # collector, so large automata (tens of thousands of titles) add no GC pauses.
+        self.out: list[tuple[int, ...]] = [()]
+        self.lengths: list[int] = []
+        for pattern_id, pattern in enumerate(patterns):
+            self.lengths.append(len(pattern))
+            if not pattern:
+                continue
+            state = 0
+            for symbol in pattern:
+                nxt = self.goto[state].get(symbol)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][symbol] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (pattern_id,)
+        self._link()
+
+    def _link(self) -> None:
+        """Breadth-first failure links; each state inherits the outputs of its failure state."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and symbol not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(symbol, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter_matches(self, text: Sequence[Hashable]) -> Iterator[tuple[int, int, int]]:
+        """Yield (start, end, pattern_id) for every occurrence, ordered by end position."""
+        goto, fail, out, lengths = self.goto, self.fail, self.out, self.lengths
+        state = 0
+        for i, symbol in enumerate(text):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            for pattern_id in out[state]:
+                yield i + 1 - lengths[pattern_id], i + 1, pattern_id
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Benchmark paper_corpus.load_papers on a synthetic window of week folders.
+
+Run from the repo root:
+    python benchmarks/bench_load_papers.py --weeks 52 --per-week 400
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import paper_corpus as corpus  # noqa: E402
+from bench_organize import make_record  # noqa: E402
+
+
+def build_weeks(root: Path, weeks: int, per_week: int) -> list[Path]:
+    rng = random.Random(0)
+    start = date(2024, 1, 1)
+    week_dirs = []
+    for w in range(weeks):
+        folder = root / (start + timedelta(weeks=w)).isoformat()
+        folder.mkdir(parents=True)
+        for i in range(per_week):
+            record = make_record(w * per_week + i, rng)
+            (folder / f"{i}.json").write_text(json.dumps(record, indent=2), encoding="utf-8")
+        week_dirs.append(folder)
+    return week_dirs
+
+
+def legacy_load(week_dirs: list[Path]) -> list[dict]:
+    """The pre-threading loader: sequential read_text + json.loads."""
+    week_papers = []
+    for week_dir in week_dirs:
+        papers = []
+        for p in sorted(week_dir.glob("*.json")):
+            paper = json.loads(p.read_text(encoding="utf-8"))
+            if (paper.get("abstract") or "").strip():
+                papers.append(paper)
+        week_papers.append(papers)
+    return corpus.cap_weeks(week_papers)
+
+
+def drop_page_cache() -> bool:
+    """Evict file pages so reads hit the disk (Linux, root only)."""
+    try:
+        subprocess.run(["sync"], check=False)
+        Path("/proc/sys/vm/drop_caches").write_text("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def timed(label: str, fn, cold: bool = False) -> float:
+    if cold and not drop_page_cache():
+        label += " (cache not dropped)"
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed:8.2f}s  ({len(result)} papers)")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--per-week", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=corpus.LOAD_WORKERS)
+    parser.add_argument("--cold", action="store_true", help="Drop the page cache before each run (Linux, root).")
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_load_papers_"))
+    try:
+        print(f"Building {args.weeks} weeks x {args.per_week} records in {work} ...")
+        week_dirs = build_weeks(work, args.weeks, args.per_week)
+
+        if not args.cold:
+            legacy_load(week_dirs)  # warm the page cache so every run starts equal
+        base = timed("legacy: sequential json.loads", lambda: legacy_load(week_dirs), args.cold)
+        decoder = "orjson" if corpus.orjson is not None else "json"
+        timed(f"load_papers: 1 worker, {decoder}", lambda: corpus.load_papers(week_dirs, workers=1), args.cold)
+        fast = timed(
+            f"load_papers: {args.workers} workers, {decoder}",
+            lambda: corpus.load_papers(week_dirs, workers=args.workers),
+            args.cold,
+        )
+        print(f"{'  speed-up vs legacy':<45} {base / fast:8.1f}x")
+
+        timed("payload entries: build week caches", lambda: corpus.load_payload_entries(week_dirs), args.cold)
+        cached = timed("payload entries: all weeks cached", lambda: corpus.load_payload_entries(week_dirs), args.cold)
+        print(f"{'  speed-up vs legacy':<45} {base / cached:8.1f}x")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
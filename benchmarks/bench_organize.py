@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Benchmark publication-date extraction and reorganization on a synthetic tree.
+
+Run from the repo root:
+    python benchmarks/bench_organize.py --files 100000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import organize_by_publication_date as obp  # noqa: E402
+
+
+def make_record(i: int, rng: random.Random) -> dict:
+    published = (date(2024, 1, 1) + timedelta(days=rng.randrange(730))).isoformat()
+    words = " ".join(rng.choice(["beamforming", "mmWave", "RIS", "channel", "estimation", "ISAC"]) for _ in range(250))
+    return {
+        "doi": f"10.1109/bench.{i}",
+        "title": f"Benchmark paper {i} on {words[:80]}",
+        "openalex_id": f"https://openalex.org/W{i}",
+        "openalex_type": "article",
+        "publication_date": published,
+        "cited_by_count": rng.randrange(50),
+        "primary_location": {"source": {"id": "https://openalex.org/S63459445", "display_name": "TWC"}},
+        "venue_id": "ieee_twc",
+        "venue_name": "IEEE Transactions on Wireless Communications",
+        "published": published,
+        "url": f"https://doi.org/10.1109/bench.{i}",
+        "abstract": words,
+        "authors": [f"Author {j}" for j in range(6)],
+        "authorships": [{"author": f"Author {j}", "institutions": ["Uni"]} for j in range(6)],
+        "keywords": ["wireless"],
+        "source_url": "openalex",
+        "fetched_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+def build_tree(root: Path, n: int) -> None:
+    rng = random.Random(0)
+    for i in range(n):
+        folder = root / f"batch_{i // 1000:04d}"
+        if i % 1000 == 0:
+            folder.mkdir(parents=True)
+        (folder / f"{i}.json").write_text(json.dumps(make_record(i, rng), indent=2), encoding="utf-8")
+
+
+def timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed:8.2f}s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_organize_"))
+    try:
+        src = work / "by_date"
+        print(f"Building {args.files} synthetic records in {src} ...")
+        build_tree(src, args.files)
+        paths = list(obp.iter_json_files(src))
+
+        full = timed("extract: full json.loads", lambda: [obp.load_json(p) for p in paths])
+        head = timed("extract: head bytes (fallback to full)", lambda: [obp.load_record_fields(p) for p in paths])
+        print(f"{'  speed-up':<45} {full / head:8.1f}x")
+
+        original = obp.load_record_fields
+        obp.load_record_fields = obp.load_json
+        try:
+            timed(
+                "organize week/copy, full parse, 1 process",
+                lambda: obp.organize(src, work / "out_full", "week", "monday", move=False, dry_run=False),
+            )
+        finally:
+            obp.load_record_fields = original
+        timed(
+            "organize week/copy, head parse, 1 process",
+            lambda: obp.organize(src, work / "out_head", "week", "monday", move=False, dry_run=False),
+        )
+        timed(
+            f"organize week/hardlink, head parse, {args.workers} procs",
+            lambda: obp.organize(
+                src, work / "out_link", "week", "monday", move=False, dry_run=False, link="hard", workers=args.workers
+            ),
+        )
+        timed(
+            "re-bucket week sunday/hardlink, head parse",
+            lambda: obp.organize(work / "out_link", work / "out_sunday", "week", "sunday", move=False, dry_run=False, link="hard"),
+        )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -276,6 +276,8 @@ def _run_cmds_generator(cmds: list[list[str]]):
                 stderr=subprocess.STDOUT,
                 text=True,
                 cwd=str(REPO_DIR),
+                # Child prints (e.g. report streaming progress) reach the SSE feed line by line.
+                env={**os.environ, "PYTHONUNBUFFERED": "1"},
             )
             assert proc.stdout is not None
             for line in proc.stdout:
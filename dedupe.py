@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Near-duplicate groups (preprint vs article, conference vs journal) via MinHash LSH.
+
+Each paper's title + abstract is cut into word 3-gram shingles and reduced to a
+128-value MinHash signature. Signatures are split into 32 bands of 4 rows; a
+paper is only compared with papers sharing at least one band bucket (indexed
+SQLite lookups, so a query stays sub-linear in corpus size), and a candidate
+counts as a duplicate when the estimated Jaccard similarity reaches
+DEFAULT_THRESHOLD. Groups are stored in index.sqlite next to `papers` and are
+maintained by ingest_openalex.py as records are written.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import re
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+DEFAULT_THRESHOLD = 0.6
+# Universal hashing h(x) = (a*x + b) mod p over 32-bit shingle hashes; p > 2^32
+# and a, b < 2^32 keep a*x + b inside uint64.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 2**32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, size=NUM_PERM, dtype=np.uint64)
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> set[str]:
+    words = WORD_RE.findall(text.lower())
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(text: str) -> np.ndarray | None:
+    """128 MinHash values (uint32) for text, or None when it has no words."""
+    grams = shingles(text)
+    if not grams:
+        return None
+    x = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    hashed = (_A[:, None] * x[None, :] + _B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> list[int]:
+    """One signed 64-bit bucket id per band."""
+    rows = signature.reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for row in rows
+    ]
+
+
+def paper_text(paper: dict) -> str:
+    return f"{paper.get('title') or ''} {paper.get('abstract') or ''}"
+
+
+class DedupeIndex:
+    """MinHash signatures, LSH band buckets and duplicate groups in an open SQLite connection.
+
+    The caller owns the connection and its commits (ingest commits in batches).
+    """
+
+    def __init__(self, conn, threshold: float = DEFAULT_THRESHOLD) -> None:
+        self.conn = conn
+        self.threshold = threshold
+        ensure_dedupe_tables(conn)
+
+    def candidates(self, signature: np.ndarray) -> set[str]:
+        found: set[str] = set()
+        for band, bucket in enumerate(band_buckets(signature)):
+            found.update(
+                doi for (doi,) in self.conn.execute(
+                    "SELECT doi FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                )
+            )
+        return found
+
+    def matches(self, signature: np.ndarray) -> list[tuple[str, str, float]]:
+        """(doi, group_doi, estimated Jaccard) of indexed papers at or above the threshold."""
+        out = []
+        for doi in self.candidates(signature):
+            row = self.conn.execute(
+                "SELECT signature, group_doi FROM minhash_signatures WHERE doi = ?", (doi,)
+            ).fetchone()
+            if row is None:
+                continue
+            similarity = float(np.mean(np.frombuffer(row[0], dtype=np.uint32) == signature))
+            if similarity >= self.threshold:
+                out.append((doi, row[1], similarity))
+        return out
+
+    def add(self, doi: str, text: str) -> str | None:
+        """Index a paper and return its group (the group's first DOI); None if text is empty."""
+        existing = self.conn.execute("SELECT group_doi FROM minhash_signatures WHERE doi = ?", (doi,)).fetchone()
+        if existing is not None:
+            return existing[0]
+        signature = minhash(text)
+        if signature is None:
+            return None
+        return self.add_signature(doi, signature)
+
+    def add_signature(self, doi: str, signature: np.ndarray) -> str:
+        """Index a precomputed signature (e.g. from another index.sqlite) and return its group."""
+        groups = sorted({group for _, group, _ in self.matches(signature)})
+        group = groups[0] if groups else doi
+        if len(groups) > 1:
+            # The new paper bridges several groups: merge them into the smallest id.
+            placeholders = ",".join("?" for _ in groups[1:])
+            self.conn.execute(
+                f"UPDATE minhash_signatures SET group_doi = ? WHERE group_doi IN ({placeholders})",
+                [group, *groups[1:]],
+            )
+        self.conn.execute(
+            "INSERT INTO minhash_signatures (doi, signature, group_doi) VALUES (?, ?, ?)",
+            (doi, signature.tobytes(), group),
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO lsh_buckets (band, bucket, doi) VALUES (?, ?, ?)",
+            [(band, bucket, doi) for band, bucket in enumerate(band_buckets(signature))],
+        )
+        return group
+
+
+def ensure_dedupe_tables(conn) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS minhash_signatures (
+            doi TEXT PRIMARY KEY,
+            signature BLOB NOT NULL,
+            group_doi TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_minhash_group ON minhash_signatures(group_doi)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            doi TEXT NOT NULL,
+            PRIMARY KEY (band, bucket, doi)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def groups_for(conn, dois: list[str]) -> dict[str, str]:
+    """DOI → group DOI for the indexed DOIs among dois."""
+    wanted = list(dict.fromkeys(dois))
+    groups: dict[str, str] = {}
+    for start in range(0, len(wanted), 500):
+        chunk = wanted[start:start + 500]
+        placeholders = ",".join("?" for _ in chunk)
+        groups.update(
+            conn.execute(
+                f"SELECT doi, group_doi FROM minhash_signatures WHERE doi IN ({placeholders})", chunk
+            )
+        )
+    return groups
+
+
+def collapse_duplicates(entries: list[dict], db_path: Path) -> tuple[list[dict], int]:
+    """Keep one paper per duplicate group (most cited, then latest); return (entries, dropped).
+
+    Entries keep their order. Without a dedupe index the entries are returned unchanged.
+    """
+    if not db_path.exists():
+        return entries, 0
+    from ingest_openalex import connect_index
+
+    conn = connect_index(db_path)
+    try:
+        has_index = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'minhash_signatures'"
+        ).fetchone()
+        groups = groups_for(conn, [e.get("doi") or "" for e in entries]) if has_index else {}
+    finally:
+        conn.close()
+    if not groups:
+        return entries, 0
+
+    def rank(i: int) -> tuple[int, str]:
+        return entries[i].get("cited_by_count") or 0, entries[i].get("published") or ""
+
+    best: dict[str, int] = {}
+    for i, entry in enumerate(entries):
+        doi = entry.get("doi") or ""
+        group = groups.get(doi, doi or f"#{i}")
+        if group not in best or rank(i) > rank(best[group]):
+            best[group] = i
+    keep = set(best.values())
+    return [e for i, e in enumerate(entries) if i in keep], len(entries) - len(keep)
+
+
+def main() -> None:
+    from ingest_openalex import connect_index
+    from paper_corpus import read_paper
+
+    parser = argparse.ArgumentParser(description="Index papers for near-duplicate detection (MinHash LSH).")
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Estimated Jaccard for a duplicate")
+    parser.add_argument("--show", type=int, default=10, help="Print the N largest duplicate groups")
+    args = parser.parse_args()
+
+    resource_dir = Path(args.resource_dir)
+    weeks_dir = resource_dir / "by_publication_week"
+    if not weeks_dir.exists():
+        print(f"Missing folder: {weeks_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    conn = connect_index(resource_dir / "index.sqlite")
+    try:
+        index = DedupeIndex(conn, args.threshold)
+        known = {doi for (doi,) in conn.execute("SELECT doi FROM minhash_signatures")}
+        added = 0
+        for path in sorted(weeks_dir.glob("*/*.json")):
+            paper = read_paper(path)
+            if paper is None or not paper.get("doi") or paper["doi"] in known:
+                continue
+            index.add(paper["doi"], paper_text(paper))
+            known.add(paper["doi"])
+            added += 1
+            if added % 1000 == 0:
+                conn.commit()
+                print(f"  indexed {added}", flush=True)
+        conn.commit()
+
+        rows = conn.execute(
+            "SELECT group_doi, COUNT(*) AS n FROM minhash_signatures GROUP BY group_doi HAVING n > 1 ORDER BY n DESC"
+        ).fetchall()
+        print(f"Indexed: {added} new, {len(known)} total")
+        print(f"Duplicate groups: {len(rows)} covering {sum(n for _, n in rows)} papers")
+        for group, _ in rows[: args.show]:
+            members = [doi for (doi,) in conn.execute("SELECT doi FROM minhash_signatures WHERE group_doi = ?", (group,))]
+            print(f"  {', '.join(members)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
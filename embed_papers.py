@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Incrementally embed paper titles and abstracts with SiliconFlow embeddings.
+
+Vectors are L2-normalized and stored as a float16 matrix in
+resource/embeddings/<model>.f16, read back with np.memmap (no parsing, no
+copy). resource/embeddings/embeddings.sqlite maps (model, DOI) to a matrix row
+and remembers the content hash the row was computed from, so a paper is only
+re-embedded when its title or abstract changes.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from ingest_openalex import file_lock
+from paper_corpus import load_env_file, load_weeks, read_paper
+
+DEFAULT_MODEL = "BAAI/bge-m3"
+DEFAULT_BATCH_SIZE = 32
+# Title + abstract are cut to this many words before embedding.
+EMBED_MAX_WORDS = 512
+
+
+def embedding_text(paper: dict, max_words: int = EMBED_MAX_WORDS) -> str:
+    title = (paper.get("title") or "").strip()
+    abstract = " ".join((paper.get("abstract") or "").split()[:max_words])
+    return f"{title}\n\n{abstract}".strip()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def model_slug(model: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", model)
+
+
+class EmbeddingStore:
+    """Append-only float16 matrix per model plus a SQLite DOI→row index."""
+
+    def __init__(self, root: Path, model: str) -> None:
+        self.root = root
+        self.model = model
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.matrix_path = root / f"{model_slug(model)}.f16"
+        self.conn = sqlite3.connect(root / "embeddings.sqlite")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_models (
+                model TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                n_rows INTEGER NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_rows (
+                model TEXT NOT NULL,
+                doi TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (model, doi)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+        self.dim, self.n_rows = 0, 0
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Re-read dim and the committed row count, which other processes may have grown."""
+        found = self.conn.execute("SELECT dim FROM embedding_models WHERE model = ?", (self.model,)).fetchone()
+        self.dim = found[0] if found else self.dim
+        (self.n_rows,) = self.conn.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM embedding_rows WHERE model = ?", (self.model,)
+        ).fetchone()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def hashes(self) -> dict[str, str]:
+        return dict(
+            self.conn.execute("SELECT doi, content_hash FROM embedding_rows WHERE model = ?", (self.model,))
+        )
+
+    def rows_for(self, dois: Iterable[str]) -> dict[str, int]:
+        wanted = list(dict.fromkeys(dois))
+        rows: dict[str, int] = {}
+        for start in range(0, len(wanted), 500):
+            chunk = wanted[start:start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            rows.update(
+                self.conn.execute(
+                    f"SELECT doi, row FROM embedding_rows WHERE model = ? AND doi IN ({placeholders})",
+                    [self.model, *chunk],
+                )
+            )
+        return rows
+
+    def write(self, dois: list[str], hashes: list[str], vectors: np.ndarray) -> None:
+        """Store vectors: changed DOIs overwrite their row, new DOIs are appended.
+
+        Writers hold a lock on the matrix file and re-read the committed row
+        count under it, so concurrent runs append after each other's rows.
+        """
+        vectors = np.asarray(vectors, dtype=np.float16)
+        with file_lock(self.matrix_path.with_name(self.matrix_path.name + ".lock")):
+            self.refresh()
+            if not self.dim:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dim {vectors.shape[1]} does not match stored dim {self.dim} for {self.model}"
+                )
+
+            existing = self.rows_for(dois)
+            updates = [(existing[d], i) for i, d in enumerate(dois) if d in existing]
+            appends = [i for i, d in enumerate(dois) if d not in existing]
+
+            if updates:
+                matrix = np.memmap(self.matrix_path, dtype=np.float16, mode="r+", shape=(self.n_rows, self.dim))
+                matrix[[row for row, _ in updates]] = vectors[[i for _, i in updates]]
+                matrix.flush()
+                del matrix
+            if appends:
+                with self.matrix_path.open("ab") as f:
+                    # Drop rows appended by a run that died before committing the index.
+                    f.truncate(self.n_rows * self.dim * 2)
+                    f.write(vectors[appends].tobytes())
+
+            rows = {d: existing[d] for d in dois if d in existing}
+            for offset, i in enumerate(appends):
+                rows[dois[i]] = self.n_rows + offset
+            self.n_rows += len(appends)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embedding_rows (model, doi, row, content_hash) VALUES (?, ?, ?, ?)",
+                [(self.model, d, rows[d], h) for d, h in zip(dois, hashes)],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO embedding_models (model, dim, n_rows) VALUES (?, ?, ?)",
+                (self.model, self.dim, self.n_rows),
+            )
+            self.conn.commit()
+
+    def matrix(self) -> np.ndarray:
+        """Read-only memory map of every stored vector (rows × dim, float16)."""
+        self.refresh()
+        if not self.n_rows:
+            return np.zeros((0, self.dim), dtype=np.float16)
+        return np.memmap(self.matrix_path, dtype=np.float16, mode="r", shape=(self.n_rows, self.dim))
+
+    def vectors_for(self, dois: list[str]) -> tuple[np.ndarray, list[str]]:
+        """Return (float32 vectors, DOIs found) in the order of dois, skipping unembedded ones."""
+        rows = self.rows_for(dois)
+        found = [d for d in dois if d in rows]
+        if not found:
+            return np.zeros((0, self.dim), dtype=np.float32), []
+        return np.asarray(self.matrix()[[rows[d] for d in found]], dtype=np.float32), found
+
+
+def iter_week_papers(week_dirs: list[Path]) -> Iterator[dict]:
+    for week_dir in week_dirs:
+        for path in sorted(week_dir.glob("*.json")):
+            paper = read_paper(path)
+            if paper is not None and paper.get("doi"):
+                yield paper
+
+
+def embed_texts(api, model: str, texts: list[str]) -> np.ndarray:
+    """Call create_embeddings for texts and return L2-normalized float32 vectors."""
+    response = api.create_embeddings(model=model, input_text=texts)
+    items = sorted(response.get("data") or [], key=lambda item: item.get("index", 0))
+    if len(items) != len(texts):
+        raise ValueError(f"Expected {len(texts)} embeddings, got {len(items)}")
+    vectors = np.asarray([item["embedding"] for item in items], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def embed_papers(
+    store: EmbeddingStore,
+    papers: Iterable[dict],
+    api,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Embed papers whose text hash differs from the stored one; return counters."""
+    known = store.hashes()
+    stats = {"scanned": 0, "unchanged": 0, "embedded": 0}
+    pending: list[tuple[str, str, str]] = []
+
+    def flush() -> None:
+        if not pending:
+            return
+        if not dry_run:
+            vectors = embed_texts(api, store.model, [text for _, _, text in pending])
+            store.write([d for d, _, _ in pending], [h for _, h, _ in pending], vectors)
+        stats["embedded"] += len(pending)
+        pending.clear()
+
+    seen: set[str] = set()
+    for paper in papers:
+        doi = paper["doi"]
+        if doi in seen:
+            continue
+        seen.add(doi)
+        stats["scanned"] += 1
+        text = embedding_text(paper)
+        digest = content_hash(text)
+        if known.get(doi) == digest:
+            stats["unchanged"] += 1
+            continue
+        pending.append((doi, digest, text))
+        if len(pending) >= batch_size:
+            flush()
+            print(f"  embedded {stats['embedded']}", flush=True)
+    flush()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embed paper titles and abstracts into a float16 memmap store.")
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument("--weeks", type=int, default=0, help="Only scan the last N weeks (default: all).")
+    parser.add_argument("--model", default=os.getenv("SILICONFLOW_EMBEDDING_MODEL") or DEFAULT_MODEL)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Texts per embeddings request")
+    parser.add_argument("--dry-run", action="store_true", help="Count papers needing embeddings without calling the API.")
+    args = parser.parse_args()
+
+    load_env_file(Path("private.env"))
+    resource_dir = Path(args.resource_dir)
+    weeks_dir = resource_dir / "by_publication_week"
+    if args.weeks:
+        week_dirs = load_weeks(weeks_dir, args.weeks)
+    else:
+        week_dirs = sorted(d for d in weeks_dir.iterdir() if d.is_dir()) if weeks_dir.exists() else []
+    if not week_dirs:
+        print("No week folders found.", file=sys.stderr)
+        sys.exit(1)
+
+    api = None
+    if not args.dry_run:
+        from siliconflow_api import SiliconFlowAPI
+
+        api = SiliconFlowAPI()
+
+    store = EmbeddingStore(resource_dir / "embeddings", args.model)
+    try:
+        stats = embed_papers(store, iter_week_papers(week_dirs), api, args.batch_size, args.dry_run)
+        print(f"Model: {args.model}")
+        print(f"Scanned: {stats['scanned']}")
+        print(f"Unchanged: {stats['unchanged']}")
+        print(f"{'Would embed' if args.dry_run else 'Embedded'}: {stats['embedded']}")
+        print(f"Stored vectors: {store.n_rows} x {store.dim} → {store.matrix_path}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,103 +3,120 @@ from __future__ import annotations
 
 import argparse
 import json
+import math
 import os
 import re
-import statistics
 import sys
-from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+from functools import partial
 from pathlib import Path
+from typing import Callable
 
+from abstract_compressor import DEFAULT_ABSTRACT_TOKENS, compress_entries
+from dedupe import collapse_duplicates
+from embed_papers import DEFAULT_MODEL as DEFAULT_EMBEDDING_MODEL, EmbeddingStore, embed_papers
+from ingest_openalex import write_text_atomic
+from llm_cache import LLMCache, chat_completion, partial_meta_path
+from paper_corpus import (
+    cap_weeks,
+    load_env_file,
+    load_payload_entries,
+    load_topic_registry,
+    load_week_entry_lists,
+    load_weeks,
+    payload_entry,
+    read_paper,
+)
+from payload_planner import estimate_tokens, plan_payload, split_line
+from relevance import RelevanceCache, RelevanceScorer
+from section_digest import (
+    LOCAL_SECTIONS,
+    TOPICS_SECTION,
+    Topic,
+    assemble_report,
+    assign_topics,
+    fill_placeholders,
+    parse_numbered_names,
+    parse_topic_plan,
+    strip_heading,
+    template_sections,
+    topic_block,
+    topic_stats,
+)
+from topic_clusters import (
+    build_cluster_summary,
+    cluster_stats,
+    minibatch_kmeans,
+    render_trend_signals,
+    render_venue_breakdown,
+    replace_section,
+    venue_label,
+)
+from wiki_links import WikiLinker
 
-def load_weeks(weeks_dir: Path, n: int) -> list[Path]:
-    """Return week directories whose start date falls within the last n weeks."""
-    if not weeks_dir.exists():
-        return []
-    cutoff = (date.today() - timedelta(weeks=n)).isoformat()
-    dirs = sorted(
-        d for d in weeks_dir.iterdir()
-        if d.is_dir() and d.name >= cutoff
-    )
-    return dirs
+SYSTEM_PROMPT = (
+    "You are a research analyst specialising in wireless communications. "
+    "You analyse paper metadata and produce structured research digests. "
+    "Be factual and ground every claim in the provided paper abstracts."
+)
+# Answer length for one map-step shard summary.
+MAP_MAX_TOKENS = 2048
+# --sections: answer lengths of the topic-selection call and of each section call.
+PLAN_MAX_TOKENS = 1024
+SECTION_MAX_TOKENS = 1536
+
+PARTIAL_SUFFIX = ".partial"
+REPORT_NAME = "wireless-digest"
 
+# Default prompt budget in estimated tokens; leaves room for the 8192-token
+# answer inside a 128k context.
+DEFAULT_TOKEN_BUDGET = 110_000
 
-def load_papers(
-    week_dirs: list[Path],
-    cap_multiplier: float = 3.0,
-    cap_count: int = 500,
+def query_entries(
+    resource_dir: Path,
+    query: str,
+    top_k: int = 150,
+    candidates: int = 600,
+    api=None,
+    max_words: int = 300,
+    use_cache: bool = True,
 ) -> list[dict]:
-    """Load all papers from week dirs; cap anomalous weeks by citation rank."""
-    week_papers: list[list[dict]] = []
-    for week_dir in week_dirs:
-        papers = []
-        for p in sorted(week_dir.glob("*.json")):
-            paper = json.loads(p.read_text(encoding="utf-8"))
-            if (paper.get("abstract") or "").strip():
-                papers.append(paper)
-        week_papers.append(papers)
-
-    counts = [len(w) for w in week_papers]
-    # Use the lower median (median of the lower half) so anomalous weeks don't
-    # inflate the reference baseline. For small lists this equates to min().
-    sorted_counts = sorted(counts)
-    lower_half = sorted_counts[: max(1, len(sorted_counts) // 2)]
-    baseline = statistics.median(lower_half) if len(counts) >= 2 else float("inf")
-    threshold = baseline * cap_multiplier
-
-    result: list[dict] = []
-    for papers in week_papers:
-        if len(papers) > threshold:
-            papers = sorted(
-                papers,
-                key=lambda p: p.get("cited_by_count") or 0,
-                reverse=True,
-            )[:cap_count]
-        result.extend(papers)
-    return result
-
-
-def truncate_abstract(abstract: str, max_words: int = 300) -> str:
-    """Return first max_words words of abstract, with ellipsis if truncated."""
-    words = abstract.split()
-    if len(words) <= max_words:
-        return abstract
-    return " ".join(words[:max_words]) + "..."
-
-
-def build_payload(papers: list[dict]) -> str:
-    """Build compact pipe-delimited payload for the LLM prompt."""
-    lines: list[str] = []
-    for p in papers:
-        title = (p.get("title") or "").replace("|", "/")
-        venue = p.get("venue_id") or "unknown"
-        week = (p.get("published") or "")[:7]  # YYYY-MM
-        citations = p.get("cited_by_count") or 0
-        abstract = truncate_abstract(
-            (p.get("abstract") or "").replace("|", "/")
-        )
-        lines.append(f"{title} | {venue} | {week} | {citations} | {abstract}")
-    return "\n".join(lines)
+    """Payload entries for the corpus papers most relevant to query, in week order.
 
+    The retrieval score is stored as "relevance", so the token budget drops the
+    weakest matches first.
+    """
+    from retrieve import retrieve
 
-def inject_wiki_links(markdown: str) -> str:
-    """Wrap topic headings and any remaining quoted paper titles in Obsidian [[wiki-links]]."""
-    # Wrap topic headings: ### N. Topic → ### N. [[Topic]]
-    result = re.sub(r"(### \d+\.\s+)(?!\[\[)(.+)", r"\1[[\2]]", markdown)
-    # Fallback: convert any remaining "Quoted Title" → [[Quoted Title]]
-    # (catches paper titles the LLM didn't auto-link)
-    result = re.sub(r'"([^"\n]{10,})"', r'[[\1]]', result)
-    return result
+    entries = []
+    for paper, week, file_name, score in retrieve(
+        resource_dir, query, top_k, candidates, api=api, use_cache=use_cache
+    ):
+        entry = payload_entry(paper, file_name, max_words)
+        entry["week"] = week
+        entry["relevance"] = score
+        entries.append(entry)
+    entries.sort(key=lambda e: (e["week"], e["file"]))
+    return entries
 
 
-def load_topic_registry(path: Path) -> list[str]:
-    """Return saved topic names from topic_registry.json, or [] if absent/corrupt."""
-    if not path.exists():
-        return []
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        return data.get("topics") or []
-    except Exception:
-        return []
+def query_slug(query: str, max_length: int = 60) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:max_length].rstrip("-") or "query"
+
+
+def wrap_topic_headings(markdown: str) -> str:
+    """### N. Topic → ### N. [[Topic]] (headings already linked are left alone)."""
+    return re.sub(r"(### \d+\.\s+)(?!\[\[)(.+)", r"\1[[\2]]", markdown)
+
+
+def resolve_wiki_links(markdown: str, linker: WikiLinker) -> tuple[str, list[str]]:
+    """Wrap topic headings, then link only text that matches a known paper title or topic.
+
+    Returns (markdown, cited titles that match no paper); see wiki_links.py.
+    """
+    return linker.link(wrap_topic_headings(markdown))
 
 
 def extract_topics_from_markdown(markdown: str) -> list[str]:
@@ -116,32 +133,104 @@ def update_topic_registry(path: Path, new_topics: list[str]) -> None:
     path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
 
 
-def write_report(content: str, output_dir: Path, date_str: str) -> Path:
-    """Write the report Markdown to output_dir/YYYY-MM-DD-wireless-digest.md."""
+def write_report(content: str, output_dir: Path, date_str: str, name: str = REPORT_NAME) -> Path:
+    """Write the report Markdown to output_dir/YYYY-MM-DD-<name>.md (default: wireless-digest)."""
     output_dir.mkdir(parents=True, exist_ok=True)
-    path = output_dir / f"{date_str}-wireless-digest.md"
-    path.write_text(content, encoding="utf-8")
+    path = output_dir / f"{date_str}-{name}.md"
+    write_text_atomic(path, content)
     return path
 
 
-def call_llm(payload: str, template: str, weeks: int, api_key: str, preferred_topics: list[str] | None = None) -> str:
-    """Call SiliconFlow GLM-5 with the paper payload and return Markdown."""
-    from siliconflow_api import build_openai_client
+def find_partial(output_dir: Path, date_str: str, name: str = REPORT_NAME, resume: bool = False) -> Path:
+    """Return today's partial path; with resume, the newest leftover partial when today has none."""
+    today = output_dir / f"{date_str}-{name}.md{PARTIAL_SUFFIX}"
+    if not resume or today.exists() or not output_dir.exists():
+        return today
+    leftovers = sorted(output_dir.glob(f"*-{name}.md{PARTIAL_SUFFIX}"))
+    return leftovers[-1] if leftovers else today
 
-    client = build_openai_client(api_key=api_key)
 
-    system = (
-        "You are a research analyst specialising in wireless communications. "
-        "You analyse paper metadata and produce structured research digests. "
-        "Be factual and ground every claim in the provided paper abstracts."
-    )
+def discard_partial(partial_path: Path) -> None:
+    partial_path.unlink(missing_ok=True)
+    partial_meta_path(partial_path).unlink(missing_ok=True)
 
-    user = (
-        f"Here are papers from the past {weeks} weeks across IEEE wireless communications venues.\n"
-        "Format per line: title | venue_id | year-month | citation_count | abstract_snippet\n\n"
-        "--- PAPERS ---\n"
-        f"{payload}\n"
-        "--- END PAPERS ---\n\n"
+
+@dataclass(frozen=True)
+class ReportSpec:
+    """One report of a --specs run; unset fields come from the command line."""
+
+    name: str
+    weeks: int
+    template: Path
+    token_budget: int
+    keywords: Path | None = None
+    min_relevance: float | None = None
+    venues: tuple[str, ...] = ()
+    model: str | None = None
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.venues) or self.min_relevance is not None
+
+
+def check_spec_types(path: Path, i: int, item: dict) -> None:
+    """Reject JSON values of the wrong type before they reach ReportSpec."""
+    def bad(key: str, expected: str) -> ValueError:
+        return ValueError(f"{path}: spec {i} field {key} must be {expected}, got {item[key]!r}")
+
+    for key in ("weeks", "token_budget"):
+        if key in item and (isinstance(item[key], bool) or not isinstance(item[key], int)):
+            raise bad(key, "an integer")
+    value = item.get("min_relevance")
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        raise bad("min_relevance", "a number")
+    value = item.get("venues")
+    if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+        raise bad("venues", "a list of venue ids")
+    for key in ("name", "template", "keywords", "model"):
+        if item.get(key) is not None and not isinstance(item[key], str):
+            raise bad(key, "a string")
+
+
+def load_report_specs(path: Path, defaults: ReportSpec) -> list[ReportSpec]:
+    """Parse a JSON list of report specs (see templates/report_specs.example.json).
+
+    Raises ValueError for unknown fields, bad values or repeated names.
+    """
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(raw, list) or not raw:
+        raise ValueError(f"{path}: expected a non-empty JSON list of report specs")
+    known = {f.name for f in fields(ReportSpec)}
+    specs: list[ReportSpec] = []
+    for i, item in enumerate(raw, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"{path}: spec {i} is not an object")
+        unknown = set(item) - known
+        if unknown:
+            raise ValueError(f"{path}: spec {i} has unknown field(s) {', '.join(sorted(unknown))}")
+        check_spec_types(path, i, item)
+        values = dict(item)
+        for key in ("template", "keywords"):
+            if values.get(key) is not None:
+                values[key] = Path(values[key])
+        if "venues" in values:
+            values["venues"] = tuple(values["venues"] or ())
+        spec = replace(defaults, **values)
+        if not re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9._-]*", spec.name or ""):
+            raise ValueError(f"{path}: spec {i} needs a file-name-safe name, got {spec.name!r}")
+        if spec.weeks < 1:
+            raise ValueError(f"{path}: spec {spec.name} must cover at least one week")
+        if spec.min_relevance is not None and spec.keywords is None:
+            raise ValueError(f"{path}: spec {spec.name} sets min_relevance without a keywords file")
+        if any(s.name == spec.name for s in specs):
+            raise ValueError(f"{path}: report name {spec.name} is used twice")
+        specs.append(spec)
+    return specs
+
+
+def digest_instructions(template: str, preferred_topics: list[str] | None = None) -> str:
+    """The template and writing guidelines shared by single-call and reduce prompts."""
+    return (
         "Produce a research digest following this exact template structure:\n\n"
         f"{template}\n\n"
         "Guidelines:\n"
@@ -163,41 +252,758 @@ def call_llm(payload: str, template: str, weeks: int, api_key: str, preferred_to
         )
     )
 
-    model = os.getenv("SILICONFLOW_MODEL") or "Pro/moonshotai/Kimi-K2.5"
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        max_tokens=8192,
+
+def build_messages(
+    payload: str,
+    template: str,
+    weeks: int,
+    preferred_topics: list[str] | None = None,
+    focus: str | None = None,
+) -> list[dict]:
+    """Return the chat messages for a digest request over payload.
+
+    With focus (a retrieval query) the papers are described as the archive's
+    best matches for it rather than the last `weeks` weeks.
+    """
+    if focus:
+        intro = (
+            f'Here are the papers most relevant to "{focus}", retrieved from the full archive of '
+            "IEEE wireless communications venues.\n"
+        )
+    else:
+        intro = f"Here are papers from the past {weeks} weeks across IEEE wireless communications venues.\n"
+    user = (
+        intro
+        + "Format per line: title | venue_id | year-month | citation_count | abstract_snippet\n\n"
+        "--- PAPERS ---\n"
+        f"{payload}\n"
+        "--- END PAPERS ---\n\n"
+        + digest_instructions(template, preferred_topics)
+        + (f"\n- Keep every section focused on: {focus}; trend signals compare older vs newer papers" if focus else "")
     )
-    content = response.choices[0].message.content
-    if content is None:
-        raise ValueError(f"LLM returned no content (finish_reason={response.choices[0].finish_reason})")
-    return content
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
 
 
-def load_env_file(path: Path) -> None:
-    """Load key=value pairs from a .env file into os.environ."""
-    if not path.exists():
-        return
-    for line in path.read_text(encoding="utf-8").splitlines():
-        stripped = line.strip()
-        if not stripped or stripped.startswith("#") or "=" not in stripped:
-            continue
-        key, value = stripped.split("=", 1)
-        key = key.strip()
-        value = value.strip().strip("\"' ")
-        if key and key not in os.environ:
-            os.environ[key] = value
+SHARD_SUMMARY_FORMAT = (
+    "For each topic output:\n"
+    "### <Topic name>\n"
+    "- Papers: <count> | Venues: <venue_id list with counts>\n"
+    "- Core problem / key methods / representative results / challenges: one line each, grounded in the abstracts\n"
+    "- Representative papers: up to 3 exact titles with citation counts\n"
+    "Finish with '### Most cited' listing the 3 most cited papers (exact title, venue_id, citations).\n"
+    "Be terse; plain Markdown only; no introduction or conclusion."
+)
+
+
+def build_map_messages(payload: str, shard_label: str) -> list[dict]:
+    """Messages asking for a compact topic summary of one shard of papers."""
+    user = (
+        f"Here are papers from {shard_label}.\n"
+        "Format per line: title | venue_id | year-month | citation_count | abstract_snippet\n\n"
+        "--- PAPERS ---\n"
+        f"{payload}\n"
+        "--- END PAPERS ---\n\n"
+        "Cluster these papers into 3-8 research topics. " + SHARD_SUMMARY_FORMAT
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def build_combine_messages(shard_summaries: list[tuple[str, str]]) -> list[dict]:
+    """Messages merging several shard summaries into one, for reduce prompts over the budget."""
+    summaries = "\n\n".join(f"=== {label} ===\n{summary}" for label, summary in shard_summaries)
+    user = (
+        "Here are topic summaries of consecutive shards of papers.\n\n"
+        f"--- SHARD SUMMARIES ---\n{summaries}\n--- END SHARD SUMMARIES ---\n\n"
+        "Merge them into one summary of 3-10 research topics. Topics that appear in several shards are the "
+        "same topic: merge them and add their counts. " + SHARD_SUMMARY_FORMAT
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def build_reduce_messages(
+    shard_summaries: list[tuple[str, str]],
+    template: str,
+    weeks: int,
+    stats: str,
+    preferred_topics: list[str] | None = None,
+) -> list[dict]:
+    """Messages merging per-shard summaries into the report template."""
+    summaries = "\n\n".join(f"=== {label} ===\n{summary}" for label, summary in shard_summaries)
+    user = (
+        f"Papers from the past {weeks} weeks across IEEE wireless communications venues were summarised "
+        "in shards. Topics that appear in several shards are the same topic: merge them and add their counts.\n\n"
+        f"--- CORPUS STATISTICS ---\n{stats}\n--- END STATISTICS ---\n\n"
+        f"--- SHARD SUMMARIES ---\n{summaries}\n--- END SHARD SUMMARIES ---\n\n"
+        + digest_instructions(template, preferred_topics)
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def call_llm(
+    payload: str,
+    template: str,
+    weeks: int,
+    api_key: str,
+    preferred_topics: list[str] | None = None,
+    cache: LLMCache | None = None,
+    partial_path: Path | None = None,
+    resume: bool = False,
+    focus: str | None = None,
+) -> str:
+    """Call SiliconFlow GLM-5 with the paper payload and return Markdown."""
+    from siliconflow_api import build_openai_client
+
+    client = build_openai_client(api_key=api_key)
+    messages = build_messages(payload, template, weeks, preferred_topics, focus)
+    return chat_completion(client, messages, cache=cache, partial_path=partial_path, resume=resume)
+
+
+def shard_entries(entries: list[dict], shard_by: str) -> list[tuple[str, list[dict]]]:
+    """Group payload entries by week folder or venue, preserving entry order."""
+    shards: dict[str, list[dict]] = {}
+    for entry in entries:
+        if shard_by == "week":
+            key = entry.get("week") or (entry.get("published") or "")[:10] or "unknown"
+        else:
+            key = entry.get("venue_id") or "unknown"
+        shards.setdefault(key, []).append(entry)
+    label = "week of" if shard_by == "week" else "venue"
+    return [(f"{label} {key}", shard) for key, shard in sorted(shards.items())]
+
+
+def corpus_stats(entries: list[dict]) -> str:
+    """Exact paper counts per week and venue, so the reduce step need not re-count."""
+    by_week: dict[str, int] = {}
+    by_venue: dict[str, int] = {}
+    for entry in entries:
+        week = entry.get("week") or (entry.get("published") or "")[:7]
+        by_week[week] = by_week.get(week, 0) + 1
+        venue = entry.get("venue_id") or "unknown"
+        by_venue[venue] = by_venue.get(venue, 0) + 1
+    return (
+        f"Total papers: {len(entries)}\n"
+        "Papers per week: " + ", ".join(f"{k}: {v}" for k, v in sorted(by_week.items())) + "\n"
+        "Papers per venue: " + ", ".join(f"{k}: {v}" for k, v in sorted(by_venue.items(), key=lambda kv: -kv[1]))
+    )
+
+
+def call_llm_map_reduce(
+    entries: list[dict],
+    template: str,
+    weeks: int,
+    api_key: str,
+    preferred_topics: list[str] | None = None,
+    shard_by: str = "week",
+    concurrency: int = 4,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    cache: LLMCache | None = None,
+    partial_path: Path | None = None,
+    resume: bool = False,
+    shard_budget: int | None = None,
+) -> str:
+    """Summarise shards with concurrent chat calls, then merge them into the template.
+
+    Each shard prompt is fitted to shard_budget tokens (default token_budget:
+    every call gets the whole per-call budget). When the shard summaries do not
+    fit one reduce prompt within token_budget, consecutive summaries are merged
+    in a tree by combine calls until they do.
+    """
+    from siliconflow_api import build_openai_client
+
+    client = build_openai_client(api_key=api_key)
+    shards = shard_entries(entries, shard_by)
+    if shard_budget is None:
+        shard_budget = token_budget
+
+    jobs = []
+    print(f"Shard budget: ~{shard_budget:,} tokens" if shard_budget else "Shard budget: unlimited")
+    for label, shard in shards:
+        overhead = sum(estimate_tokens(m["content"]) for m in build_map_messages("", label))
+        plan = plan_payload(shard, shard_budget, overhead)
+        print(f"  Shard {label}: {len(plan.lines)} papers, ~{plan.total_tokens:,} tokens")
+        if plan.lines:
+            jobs.append((label, build_map_messages("\n".join(plan.lines), label)))
+
+    print(f"Map: {len(jobs)} shard calls, concurrency {concurrency}...")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [
+            (label, pool.submit(chat_completion, client, messages, MAP_MAX_TOKENS, cache=cache))
+            for label, messages in jobs
+        ]
+        summaries = [(label, future.result()) for label, future in futures]
+
+        stats = corpus_stats(entries)
+        while True:
+            messages = build_reduce_messages(summaries, template, weeks, stats, preferred_topics)
+            reduce_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+            if not token_budget or reduce_tokens <= token_budget:
+                break
+            overhead = reduce_tokens - sum(estimate_tokens(summary) for _, summary in summaries)
+            groups = group_summaries(summaries, token_budget, max(1, token_budget - overhead))
+            if len(groups) == len(summaries):
+                raise ValueError(
+                    f"Reduce prompt needs ~{reduce_tokens:,} tokens and its summaries cannot be merged "
+                    f"within --token-budget {token_budget:,}"
+                )
+            print(f"Combine: {len(summaries)} summaries → {len(groups)} (reduce prompt ~{reduce_tokens:,} tokens)...")
+            futures = [
+                (
+                    group[0][0] if len(group) == 1 else f"{group[0][0]} to {group[-1][0]}",
+                    None if len(group) == 1
+                    else pool.submit(chat_completion, client, build_combine_messages(group), MAP_MAX_TOKENS, cache=cache),
+                    group,
+                )
+                for group in groups
+            ]
+            summaries = [
+                (label, group[0][1] if future is None else future.result()) for label, future, group in futures
+            ]
+
+    print(f"Reduce: merging {len(summaries)} shard summaries (~{reduce_tokens:,} tokens)...")
+    return chat_completion(client, messages, cache=cache, partial_path=partial_path, resume=resume)
+
+
+def group_summaries(
+    summaries: list[tuple[str, str]], combine_budget: int, reduce_room: int
+) -> list[list[tuple[str, str]]]:
+    """Split summaries into runs of consecutive shards for combine calls.
+
+    Each group's combine prompt fits combine_budget tokens. Runs are also kept
+    short enough that the merged results (at most MAP_MAX_TOKENS each) approach
+    reduce_room, the space the reduce prompt leaves for summaries, in one pass.
+    """
+    overhead = sum(estimate_tokens(m["content"]) for m in build_combine_messages([]))
+    target = max(2, math.ceil(len(summaries) / max(1, reduce_room // MAP_MAX_TOKENS)))
+    groups: list[list[tuple[str, str]]] = []
+    used = 0
+    for label, summary in summaries:
+        tokens = estimate_tokens(f"=== {label} ===\n{summary}")
+        if groups and len(groups[-1]) < target and used + tokens <= combine_budget - overhead:
+            groups[-1].append((label, summary))
+            used += tokens
+        else:
+            groups.append([(label, summary)])
+            used = tokens
+    return groups
+
+
+def build_cluster_messages(
+    summary: str,
+    template: str,
+    weeks: int,
+    total_papers: int,
+    n_topics: int,
+    preferred_topics: list[str] | None = None,
+) -> list[dict]:
+    """Messages asking the LLM to name precomputed clusters and write the narrative."""
+    user = (
+        f"{total_papers} papers from the past {weeks} weeks across IEEE wireless communications venues "
+        f"were clustered locally into {n_topics} topics. Counts below are exact; do not re-estimate them.\n\n"
+        f"--- CLUSTERS ---\n{summary}\n--- END CLUSTERS ---\n\n"
+        + digest_instructions(template, preferred_topics).replace(
+            "- Identify 8-12 distinct research topics clustered from the papers above\n",
+            f"- Write exactly {n_topics} topic subsections, '### 1.' to '### {n_topics}.', one per cluster in the order given; "
+            "give each a concise topic name\n"
+            "- Use the cluster paper counts and venues verbatim; the Venue Breakdown table and Trend Signals "
+            "are regenerated from exact counts after you answer\n",
+        )
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def cluster_entries(entries: list[dict], resource_dir: Path, k: int, api=None, seed: int = 0):
+    """Cluster entries by stored embeddings, embedding missing papers first when api is given.
+
+    Returns (ClusterStats, clustered entries); papers without a vector are left out.
+    """
+    weeks_dir = resource_dir / "by_publication_week"
+    model = os.getenv("SILICONFLOW_EMBEDDING_MODEL") or DEFAULT_EMBEDDING_MODEL
+    store = EmbeddingStore(resource_dir / "embeddings", model)
+    try:
+        dois = [e["doi"] for e in entries if e.get("doi")]
+        if api is not None:
+            have = store.rows_for(dois)
+            missing = [e for e in entries if e.get("doi") and e["doi"] not in have and e.get("week")]
+            if missing:
+                print(f"  Embedding {len(missing)} papers without vectors...", flush=True)
+                papers = (read_paper(weeks_dir / e["week"] / e["file"]) for e in missing)
+                embed_papers(store, (p for p in papers if p and p.get("doi")), api)
+        vectors, found = store.vectors_for(dois)
+    finally:
+        store.close()
+
+    by_doi = {e["doi"]: e for e in entries if e.get("doi")}
+    clustered = [by_doi[d] for d in found]
+    if len(clustered) < len(entries):
+        print(f"  {len(entries) - len(clustered)} papers have no embedding and are left out of clusters")
+    if not clustered:
+        raise ValueError("No embedded papers in the window; run embed_papers.py first.")
+    centroids, labels = minibatch_kmeans(vectors, k, seed=seed)
+    stats = cluster_stats(
+        vectors,
+        centroids,
+        labels,
+        [e.get("venue_id") or "unknown" for e in clustered],
+        [e.get("week") or (e.get("published") or "")[:10] for e in clustered],
+    )
+    return stats, clustered
+
+
+def apply_cluster_tables(markdown: str, stats) -> str:
+    """Overwrite Venue Breakdown and Trend Signals with tables built from exact cluster counts."""
+    headings = re.findall(r"^### \d+\.\s+(.+?)\s*$", markdown, re.M)
+    names = [h.strip("[] ") for h in headings[: len(stats.order)]]
+    names += [f"Cluster {i}" for i in range(len(names) + 1, len(stats.order) + 1)]
+    markdown = replace_section(markdown, "Trend Signals", render_trend_signals(names, stats))
+    return replace_section(markdown, "Venue Breakdown", render_venue_breakdown(names, stats))
+
+
+def build_topic_plan_messages(payload: str, weeks: int, preferred_topics: list[str] | None = None) -> list[dict]:
+    """Messages asking only for topic names and matching keyword phrases (phase 1 of --sections)."""
+    user = (
+        f"Here are papers from the past {weeks} weeks across IEEE wireless communications venues.\n"
+        "Format per line: title | venue_id | year-month | citation_count\n\n"
+        "--- PAPERS ---\n"
+        f"{payload}\n"
+        "--- END PAPERS ---\n\n"
+        "Identify 8-12 distinct research topics that together cover most of these papers. "
+        "Output one line per topic and nothing else:\n"
+        "Topic name | keyword phrase; keyword phrase; ...\n"
+        "Give 5-10 short phrases per topic, written as they appear in the titles "
+        "(e.g. reconfigurable intelligent surface; RIS; passive beamforming)."
+        + (
+            f"\nPrefer these previously used topic names when appropriate: {', '.join(preferred_topics[-50:])}"
+            if preferred_topics
+            else ""
+        )
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def build_cluster_naming_messages(summary: str, n_topics: int, preferred_topics: list[str] | None = None) -> list[dict]:
+    """Messages asking only for a name per precomputed cluster (phase 1 of --sections --cluster)."""
+    user = (
+        f"Papers were clustered locally into {n_topics} research topics.\n\n"
+        f"--- CLUSTERS ---\n{summary}\n--- END CLUSTERS ---\n\n"
+        f"Name each cluster with a concise research-topic name. Output exactly {n_topics} lines, "
+        f"'1. <name>' to '{n_topics}. <name>' in the cluster order given, and nothing else."
+        + (
+            f"\nPrefer these previously used topic names when appropriate: {', '.join(preferred_topics[-50:])}"
+            if preferred_topics
+            else ""
+        )
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def build_topic_section_messages(payload: str, block: str, weeks: int) -> list[dict]:
+    """Messages for one '### N. Topic' section, seeing only that topic's papers."""
+    user = (
+        f"Here are the papers on one research topic from the past {weeks} weeks across IEEE wireless "
+        "communications venues.\n"
+        "Format per line: title | venue_id | year-month | citation_count | abstract_snippet\n\n"
+        "--- PAPERS ---\n"
+        f"{payload}\n"
+        "--- END PAPERS ---\n\n"
+        "Write only this report section, following its structure exactly:\n\n"
+        f"{block}\n\n"
+        "Guidelines:\n"
+        "- Keep the heading, paper count and venues exactly as given\n"
+        "- Cite specific evidence (methods, numbers) from the abstracts\n"
+        "- Representative papers: exact titles in [[Paper Title]] format (no quotes)\n"
+        "- Wrap key technical terms in [[wiki-links]], e.g. [[ISAC]], [[RIS]]\n"
+        "- Replace all {{PLACEHOLDERS}}; output plain Markdown only, no other sections"
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def build_overview_section_messages(heading: str, body: str, overview: str, weeks: int) -> list[dict]:
+    """Messages for one report-wide section (Summary, Research Gaps, ...) from the topic overview."""
+    user = (
+        f"A research digest of the past {weeks} weeks across IEEE wireless communications venues covers "
+        "these topics (exact counts):\n\n"
+        f"--- OVERVIEW ---\n{overview}\n--- END OVERVIEW ---\n\n"
+        f"Write only the body of its '## {heading}' section, following this structure:\n\n"
+        f"{body}\n\n"
+        "Guidelines:\n"
+        "- Keep numbers that are already filled in; ground everything else in the overview\n"
+        "- Follow notes in *(...)* but do not copy them\n"
+        "- Paper titles in [[Paper Title]] format (no quotes); key technical terms in [[wiki-links]]\n"
+        "- Replace all {{PLACEHOLDERS}}; output plain Markdown only, without the section heading"
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def topic_overview(entries: list[dict], topics: list[Topic], stats, top_cited: int = 15) -> str:
+    """Topic list with exact counts and top titles, plus the window's most cited papers."""
+    blocks = []
+    for n, (topic, c) in enumerate(zip(topics, stats.order), start=1):
+        first, second = int(stats.first_half[c]), int(stats.second_half[c])
+        members = sorted(topic.members, key=lambda i: entries[i].get("cited_by_count") or 0, reverse=True)
+        titles = "; ".join(entries[i].get("title") or "" for i in members[:3])
+        blocks.append(
+            f"{n}. {topic.name}: {len(topic.members)} papers "
+            f"(first half {first}, second half {second}); top papers: {titles}"
+        )
+    cited = sorted(entries, key=lambda e: e.get("cited_by_count") or 0, reverse=True)[:top_cited]
+    return (
+        "\n".join(blocks)
+        + "\n\nMost cited papers (title | venue_id | year-month | citation_count | abstract_snippet):\n"
+        + "\n".join(e["line"] for e in cited)
+    )
+
+
+def call_llm_sections(
+    entries: list[dict],
+    template: str,
+    weeks: int,
+    api_key: str,
+    preferred_topics: list[str] | None = None,
+    concurrency: int = 4,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    cache: LLMCache | None = None,
+    clusters=None,
+) -> str:
+    """Pick topics with one short call, then write every template section concurrently.
+
+    Phase 1 is a topic/keyword call whose topics are matched to papers
+    locally (section_digest.py). With clusters, the (ClusterStats, clustered
+    entries) from cluster_entries, a call that only names the clusters is
+    used instead. In phase 2, each topic section sees only its own papers.
+    The other sections see a topic overview with exact counts. Trend Signals
+    and Venue Breakdown are rendered from the counts without a call, so total
+    latency is close to that of the slowest section.
+    """
+    from siliconflow_api import build_openai_client
+
+    client = build_openai_client(api_key=api_key)
+    if clusters is not None:
+        stats, entries = clusters
+        summary = build_cluster_summary(stats, entries)
+        messages = build_cluster_naming_messages(summary, len(stats.order), preferred_topics)
+        text = chat_completion(client, messages, PLAN_MAX_TOKENS, cache=cache)
+        names = parse_numbered_names(text, len(stats.order))
+        labels = stats.labels.tolist()
+        topics = [
+            Topic(name, (), [i for i, label in enumerate(labels) if label == c])
+            for name, c in zip(names, stats.order)
+        ]
+    else:
+        titles = [dict(e, line=split_line(e["line"])[0]) for e in entries]
+        plan = plan_payload(
+            titles, token_budget, sum(estimate_tokens(m["content"]) for m in build_topic_plan_messages("", weeks))
+        )
+        messages = build_topic_plan_messages("\n".join(plan.lines), weeks, preferred_topics)
+        text = chat_completion(client, messages, PLAN_MAX_TOKENS, cache=cache)
+        topics = assign_topics(entries, parse_topic_plan(text))
+        if not topics:
+            raise ValueError(f"No paper matches the selected topics; topic call returned:\n{text[:500]}")
+    stats, assigned = topic_stats(entries, topics)
+    print(f"  Topics: {len(topics)} covering {len(assigned)} of {len(entries)} papers")
+
+    weeks_seen = sorted(e.get("week") or (e.get("published") or "")[:10] for e in entries)
+    values = {
+        "DATE_RANGE": f"{weeks_seen[0]} → {weeks_seen[-1]}" if weeks_seen else "",
+        "TOTAL_PAPERS": str(len(entries)),
+        "NUM_WEEKS": str(weeks),
+        "NUM_VENUES": str(len({e.get("venue_id") or "unknown" for e in entries})),
+    }
+    block = topic_block(template)
+    jobs: list[tuple[str, int, list[dict]]] = []
+    for n, topic in enumerate(topics, start=1):
+        venues = ", ".join(
+            f"{venue_label(v)} ({k})" for v, k in zip(stats.venues, stats.venue_counts[n - 1].tolist()) if k
+        )
+        section = fill_placeholders(
+            re.sub(r"^### \d+\.", f"### {n}.", block, flags=re.M),
+            {"TOPIC_NAME": topic.name, "COUNT": str(len(topic.members)), "VENUES": venues},
+        )
+        papers = [entries[i] for i in topic.members]
+        overhead = sum(estimate_tokens(m["content"]) for m in build_topic_section_messages("", section, weeks))
+        plan = plan_payload(papers, token_budget, overhead)
+        messages = build_topic_section_messages("\n".join(plan.lines), section, weeks)
+        jobs.append((f"### {n}. {topic.name}", SECTION_MAX_TOKENS, messages))
+    overview = topic_overview(entries, topics, stats)
+    for heading, body in template_sections(template)[1]:
+        if heading != TOPICS_SECTION and heading not in LOCAL_SECTIONS:
+            messages = build_overview_section_messages(heading, fill_placeholders(body, values), overview, weeks)
+            jobs.append((heading, SECTION_MAX_TOKENS, messages))
+
+    print(f"Writing {len(jobs)} sections, concurrency {concurrency}...")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [
+            (label, pool.submit(chat_completion, client, messages, max_tokens, cache=cache))
+            for label, max_tokens, messages in jobs
+        ]
+        texts = {label: future.result() for label, future in futures}
+
+    names = [t.name for t in topics]
+    bodies = {
+        TOPICS_SECTION: "\n\n---\n\n".join(
+            f"### {n}. {name}\n{strip_heading(texts[f'### {n}. {name}'], '###')}"
+            for n, name in enumerate(names, start=1)
+        ),
+        "Trend Signals": render_trend_signals(names, stats),
+        "Venue Breakdown": render_venue_breakdown(names, stats),
+    }
+    for heading, _ in template_sections(template)[1]:
+        if heading in texts:
+            bodies[heading] = strip_heading(texts[heading], f"## {heading}")
+    return assemble_report(template, bodies, values)
+
+
+def report_unmatched_titles(unmatched: list[str], label: str = "") -> None:
+    if unmatched:
+        shown = "; ".join(f'"{t}"' for t in unmatched[:5]) + ("; ..." if len(unmatched) > 5 else "")
+        print(f"  {label}{len(unmatched)} cited title(s) match no paper in the window: {shown}")
+
+
+def spec_entries(
+    spec: ReportSpec,
+    week_lists: list[list[dict]],
+    relevance: Callable[[list[dict]], dict[str, float]] | None = None,
+    dedupe_db: Path | None = None,
+    abstract_tokens: int | None = None,
+) -> list[dict]:
+    """Select one spec's payload entries from week lists shared by every spec.
+
+    Entries are copied first, so relevance scores and compressed lines never
+    leak between specs. The steps match a single run: venue filter, week cap,
+    relevance threshold, near-duplicate collapse, abstract compression.
+    """
+    weeks = [
+        [dict(e) for e in entries if not spec.venues or e.get("venue_id") in spec.venues]
+        for entries in week_lists
+    ]
+    entries = cap_weeks(weeks, relevance=relevance)
+    if spec.min_relevance is not None:
+        entries = [e for e in entries if e["relevance"] >= spec.min_relevance]
+    if dedupe_db is not None:
+        entries, _ = collapse_duplicates(entries, dedupe_db)
+    if abstract_tokens:
+        compress_entries(entries, abstract_tokens)
+    return entries
+
+
+def generate_spec_reports(
+    specs: list[ReportSpec],
+    resource_dir: Path,
+    report_dir: Path,
+    api_key: str,
+    preferred_topics: list[str] | None = None,
+    concurrency: int = 4,
+    cache: LLMCache | None = None,
+    use_payload_cache: bool = True,
+    keep_duplicates: bool = False,
+    abstract_tokens: int | None = None,
+    date_str: str | None = None,
+) -> tuple[list[tuple[ReportSpec, Path]], list[tuple[ReportSpec, Exception]]]:
+    """Write one report per spec from a single load of the union of their weeks.
+
+    Week folders and payload caches are read once. Each keyword file is parsed
+    once, and all specs share the relevance score cache. The LLM calls run
+    concurrently and are not streamed. After a failure, a rerun reuses the
+    cached responses of the reports that succeeded. Unfiltered specs (no
+    venues or min_relevance) feed the topic registry.
+
+    Returns (written reports, failures).
+    """
+    from siliconflow_api import build_openai_client
+
+    date_str = date_str or datetime.now().strftime("%Y-%m-%d")
+    weeks_dir = resource_dir / "by_publication_week"
+    week_dirs = load_weeks(weeks_dir, max(spec.weeks for spec in specs))
+    by_week = dict(zip((d.name for d in week_dirs), load_week_entry_lists(week_dirs, use_cache=use_payload_cache)))
+    print(f"  Loaded {sum(map(len, by_week.values()))} papers from {len(week_dirs)} weeks for {len(specs)} reports")
+
+    templates: dict[Path, str] = {}
+    scorers: dict[Path, RelevanceScorer] = {}
+    relevance_cache = RelevanceCache(resource_dir / "index.sqlite") if any(s.keywords for s in specs) else None
+    jobs: list[tuple[ReportSpec, list[dict]]] = []
+    failures: list[tuple[ReportSpec, Exception]] = []
+    try:
+        for spec in specs:
+            if spec.template not in templates:
+                templates[spec.template] = spec.template.read_text(encoding="utf-8")
+            relevance = None
+            if spec.keywords is not None:
+                if spec.keywords not in scorers:
+                    scorers[spec.keywords] = RelevanceScorer.from_file(spec.keywords)
+                relevance = partial(scorers[spec.keywords].score_items, cache=relevance_cache)
+            entries = spec_entries(
+                spec,
+                [by_week[d.name] for d in load_weeks(weeks_dir, spec.weeks)],
+                relevance,
+                None if keep_duplicates else resource_dir / "index.sqlite",
+                abstract_tokens,
+            )
+            template = templates[spec.template]
+            prompt_tokens = sum(
+                estimate_tokens(m["content"]) for m in build_messages("", template, spec.weeks, preferred_topics)
+            )
+            plan = plan_payload(entries, spec.token_budget, prompt_tokens)
+            print(f"  {spec.name}: {len(entries)} papers, {len(plan.lines)} in the prompt (~{plan.total_tokens:,} tokens)")
+            if not plan.lines:
+                failures.append((spec, ValueError("no papers selected, or token budget too small")))
+                continue
+            jobs.append((spec, build_messages("\n".join(plan.lines), template, spec.weeks, preferred_topics)))
+    finally:
+        if relevance_cache is not None:
+            relevance_cache.close()
+
+    print(f"Calling the LLM for {len(jobs)} reports, concurrency {concurrency}...")
+    client = build_openai_client(api_key=api_key)
+    written: list[tuple[ReportSpec, Path]] = []
+    registry_path = resource_dir / "topic_registry.json"
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [
+            (spec, pool.submit(chat_completion, client, messages, model=spec.model, cache=cache))
+            for spec, messages in jobs
+        ]
+        # Built while the calls are in flight: one automaton over every title in the union of weeks.
+        linker = WikiLinker((e.get("title") or "" for week in by_week.values() for e in week), preferred_topics or ())
+        for spec, future in futures:
+            try:
+                markdown, unmatched = resolve_wiki_links(future.result(), linker)
+            except Exception as exc:
+                failures.append((spec, exc))
+                continue
+            report_unmatched_titles(unmatched, f"{spec.name}: ")
+            if not spec.filtered:
+                update_topic_registry(registry_path, extract_topics_from_markdown(markdown))
+            written.append((spec, write_report(markdown, report_dir, date_str, spec.name)))
+    return written, failures
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Generate wireless research digest.")
     parser.add_argument("--weeks", type=int, default=4, help="Number of recent weeks to analyse")
     parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument(
+        "--no-payload-cache",
+        action="store_true",
+        help="Rebuild payload lines for every week instead of using <week>.payload.cache files.",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=DEFAULT_TOKEN_BUDGET,
+        help=f"Max estimated prompt tokens; abstracts shrink, then low-priority papers drop (default: {DEFAULT_TOKEN_BUDGET}, 0 = unlimited).",
+    )
+    parser.add_argument(
+        "--map-reduce",
+        choices=["week", "venue"],
+        help="Summarise papers per week or per venue in parallel calls, then merge them into the report.",
+    )
+    parser.add_argument(
+        "--shard-budget",
+        type=int,
+        help="Max estimated prompt tokens per --map-reduce shard call (default: --token-budget).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Max concurrent LLM calls in --map-reduce, --specs and --sections modes",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing responses cached in <resource-dir>/llm_cache.",
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Wait for the whole completion instead of streaming it into <report>.partial.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue a failed streamed report from its .partial file instead of regenerating it.",
+    )
+    parser.add_argument(
+        "--cluster",
+        type=int,
+        metavar="K",
+        help="Cluster papers into K topics locally from embeddings (see embed_papers.py); "
+        "the LLM only names them and writes the narrative.",
+    )
+    parser.add_argument(
+        "--keywords",
+        help="Personal keyword file (see relevance.py); matching papers are kept first when weeks are capped "
+        "or the token budget drops papers. Defaults to RELEVANCE_KEYWORDS from private.env.",
+    )
+    parser.add_argument(
+        "--query",
+        help="Digest the papers most relevant to this query from the whole corpus (BM25 + rerank, see retrieve.py) "
+        "instead of the last --weeks weeks.",
+    )
+    parser.add_argument("--top-k", type=int, default=150, help="Papers kept for --query (default: 150)")
+    parser.add_argument("--candidates", type=int, default=600, help="BM25 shortlist reranked for --query")
+    parser.add_argument("--no-rerank", action="store_true", help="Rank --query results by BM25 only.")
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="Keep every version of near-duplicate papers (preprint + article) instead of one per group.",
+    )
+    parser.add_argument(
+        "--compress-abstracts",
+        action="store_true",
+        help="Keep each abstract's most informative sentences (results, numbers) instead of its first words; "
+        "see abstract_compressor.py.",
+    )
+    parser.add_argument(
+        "--abstract-tokens",
+        type=int,
+        default=DEFAULT_ABSTRACT_TOKENS,
+        help=f"Per-paper abstract token budget for --compress-abstracts (default: {DEFAULT_ABSTRACT_TOKENS})",
+    )
+    parser.add_argument(
+        "--specs",
+        help="JSON list of reports to write in one run (name, weeks, template, keywords, min_relevance, "
+        "venues, model; see templates/report_specs.example.json). Weeks are loaded once and the LLM calls "
+        "run concurrently (--concurrency).",
+    )
+    parser.add_argument(
+        "--sections",
+        action="store_true",
+        help="Pick the topics with one short call (or --cluster), then write every report section in "
+        "concurrent calls (--concurrency) that see only their own papers.",
+    )
     args = parser.parse_args()
+    if args.sections and (args.map_reduce or args.query or args.specs or args.resume):
+        parser.error("--sections cannot be combined with --map-reduce, --query, --specs or --resume")
+    if args.specs and (args.query or args.map_reduce or args.cluster or args.resume):
+        parser.error("--specs cannot be combined with --query, --map-reduce, --cluster or --resume")
+    if args.query and (args.map_reduce or args.cluster):
+        parser.error("--query cannot be combined with --map-reduce or --cluster")
 
     load_env_file(Path("openalex.env"))
     load_env_file(Path("private.env"))
@@ -216,22 +1022,106 @@ def main() -> None:
     if preferred_topics:
         print(f"  Using {len(preferred_topics)} preferred topic names from registry")
 
-    print(f"Loading last {args.weeks} weeks from {weeks_dir}...")
-    week_dirs = load_weeks(weeks_dir, args.weeks)
-    if not week_dirs:
-        print("No week folders found.", file=sys.stderr)
-        sys.exit(1)
+    if args.specs:
+        keywords = args.keywords or os.getenv("RELEVANCE_KEYWORDS")
+        defaults = ReportSpec(
+            REPORT_NAME,
+            args.weeks,
+            Path("templates/report_template.md"),
+            args.token_budget,
+            keywords=Path(keywords) if keywords else None,
+        )
+        try:
+            specs = load_report_specs(Path(args.specs), defaults)
+        except (OSError, ValueError) as exc:
+            print(f"Invalid --specs file: {exc}", file=sys.stderr)
+            sys.exit(1)
+        missing = sorted({str(s.template) for s in specs if not s.template.exists()})
+        if missing:
+            print(f"Template not found: {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Generating {len(specs)} reports: {', '.join(s.name for s in specs)}")
+        cache = None if args.no_cache else LLMCache(resource_dir / "llm_cache")
+        written, failures = generate_spec_reports(
+            specs,
+            resource_dir,
+            report_dir,
+            api_key,
+            preferred_topics,
+            concurrency=args.concurrency,
+            cache=cache,
+            use_payload_cache=not args.no_payload_cache,
+            keep_duplicates=args.keep_duplicates,
+            abstract_tokens=args.abstract_tokens if args.compress_abstracts else None,
+        )
+        if cache is not None and cache.hits:
+            print(f"  LLM cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+        for _, path in written:
+            print(f"Report written → {path}")
+        for spec, exc in failures:
+            print(f"Report {spec.name} failed: {exc}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        return
 
-    date_range = f"{week_dirs[0].name} → {week_dirs[-1].name}"
-    print(f"  Weeks: {date_range}")
+    report_name = REPORT_NAME
+    if args.query:
+        api = None
+        if not args.no_rerank:
+            from siliconflow_api import SiliconFlowAPI
 
-    papers = load_papers(week_dirs)
-    print(f"  {len(papers)} papers loaded")
-    if not papers:
-        print("No papers found in the selected weeks.", file=sys.stderr)
-        sys.exit(1)
+            api = SiliconFlowAPI(api_key=api_key)
+        print(f'Retrieving the {args.top_k} papers most relevant to "{args.query}"...')
+        entries = query_entries(
+            resource_dir, args.query, args.top_k, args.candidates, api, use_cache=not args.no_cache
+        )
+        if not entries:
+            print("No papers match the query.", file=sys.stderr)
+            sys.exit(1)
+        print(f"  {len(entries)} papers retrieved ({entries[0]['week']} → {entries[-1]['week']})")
+        report_name = f"query-{query_slug(args.query)}"
+    else:
+        print(f"Loading last {args.weeks} weeks from {weeks_dir}...")
+        week_dirs = load_weeks(weeks_dir, args.weeks)
+        if not week_dirs:
+            print("No week folders found.", file=sys.stderr)
+            sys.exit(1)
+
+        date_range = f"{week_dirs[0].name} → {week_dirs[-1].name}"
+        print(f"  Weeks: {date_range}")
+
+        relevance = None
+        relevance_cache = None
+        keywords_path = args.keywords or os.getenv("RELEVANCE_KEYWORDS")
+        if keywords_path:
+            scorer = RelevanceScorer.from_file(Path(keywords_path))
+            relevance_cache = RelevanceCache(resource_dir / "index.sqlite")
+            relevance = partial(scorer.score_items, cache=relevance_cache)
+            print(f"  Relevance keywords: {keywords_path} ({len(scorer.concepts)} concepts, set {scorer.keyset})")
 
-    payload = build_payload(papers)
+        try:
+            entries = load_payload_entries(week_dirs, use_cache=not args.no_payload_cache, relevance=relevance)
+        finally:
+            if relevance_cache is not None:
+                relevance_cache.close()
+        print(f"  {len(entries)} papers loaded")
+        if relevance is not None:
+            print(f"  {sum(1 for e in entries if e['relevance'] > 0)} papers match the relevance keywords")
+        if not entries:
+            print("No papers found in the selected weeks.", file=sys.stderr)
+            sys.exit(1)
+
+    if not args.keep_duplicates:
+        entries, dropped = collapse_duplicates(entries, resource_dir / "index.sqlite")
+        if dropped:
+            print(f"  {dropped} near-duplicate papers dropped (one kept per group, see dedupe.py)")
+
+    if args.compress_abstracts:
+        shortened, before, after = compress_entries(entries, args.abstract_tokens)
+        print(
+            f"  Abstracts compressed: {shortened} of {len(entries)} to ≤ {args.abstract_tokens} tokens "
+            f"({before:,} → {after:,} tokens)"
+        )
 
     template_path = Path("templates/report_template.md")
     if not template_path.exists():
@@ -239,18 +1129,120 @@ def main() -> None:
         sys.exit(1)
     template = template_path.read_text(encoding="utf-8")
 
-    print("Calling SiliconFlow Kimi-K2.5...")
-    markdown = call_llm(payload, template, args.weeks, api_key, preferred_topics)
+    cache = None if args.no_cache else LLMCache(resource_dir / "llm_cache")
+    date_str = datetime.now().strftime("%Y-%m-%d")
+    # --sections never streams, so it leaves any partial from an earlier run alone.
+    partial_path = (
+        None if args.no_stream or args.sections else find_partial(report_dir, date_str, report_name, args.resume)
+    )
+
+    clusters = None
+    try:
+        if args.sections:
+            clustered = None
+            if args.cluster:
+                from siliconflow_api import SiliconFlowAPI
+
+                print(f"Clustering into {args.cluster} topics...")
+                clustered = cluster_entries(entries, resource_dir, args.cluster, api=SiliconFlowAPI(api_key=api_key))
+            else:
+                print("Selecting topics...")
+            markdown = call_llm_sections(
+                entries,
+                template,
+                args.weeks,
+                api_key,
+                preferred_topics,
+                concurrency=args.concurrency,
+                token_budget=args.token_budget,
+                cache=cache,
+                clusters=clustered,
+            )
+        elif args.cluster:
+            from siliconflow_api import SiliconFlowAPI, build_openai_client
+
+            print(f"Clustering into {args.cluster} topics...")
+            clusters, clustered = cluster_entries(
+                entries, resource_dir, args.cluster, api=SiliconFlowAPI(api_key=api_key)
+            )
+            summary = build_cluster_summary(clusters, clustered)
+            messages = build_cluster_messages(
+                summary, template, args.weeks, len(clustered), len(clusters.order), preferred_topics
+            )
+            print(f"  Prompt: ~{sum(estimate_tokens(m['content']) for m in messages):,} tokens")
+            print("Calling SiliconFlow Kimi-K2.5...")
+            markdown = chat_completion(
+                build_openai_client(api_key=api_key),
+                messages,
+                cache=cache,
+                partial_path=partial_path,
+                resume=args.resume,
+            )
+        elif args.map_reduce:
+            print(f"Map-reduce by {args.map_reduce}...")
+            markdown = call_llm_map_reduce(
+                entries,
+                template,
+                args.weeks,
+                api_key,
+                preferred_topics,
+                shard_by=args.map_reduce,
+                concurrency=args.concurrency,
+                token_budget=args.token_budget,
+                cache=cache,
+                partial_path=partial_path,
+                resume=args.resume,
+                shard_budget=args.shard_budget,
+            )
+        else:
+            prompt_tokens = sum(
+                estimate_tokens(m["content"])
+                for m in build_messages("", template, args.weeks, preferred_topics, args.query)
+            )
+            plan = plan_payload(entries, args.token_budget, prompt_tokens)
+            print(plan.describe())
+            if not plan.lines:
+                print("Token budget too small for any paper.", file=sys.stderr)
+                sys.exit(1)
+            payload = "\n".join(plan.lines)
 
-    markdown = inject_wiki_links(markdown)
+            print("Calling SiliconFlow Kimi-K2.5...")
+            markdown = call_llm(
+                payload,
+                template,
+                args.weeks,
+                api_key,
+                preferred_topics,
+                cache=cache,
+                partial_path=partial_path,
+                resume=args.resume,
+                focus=args.query,
+            )
+    except Exception as exc:
+        if partial_path is not None and partial_path.exists():
+            print(f"LLM call failed: {exc}", file=sys.stderr)
+            print(f"Partial output kept in {partial_path}; rerun with --resume to continue it.", file=sys.stderr)
+            sys.exit(1)
+        raise
+    if cache is not None and cache.hits:
+        print(f"  LLM cache: {cache.hits} hit(s), {cache.misses} miss(es)")
 
-    new_topics = extract_topics_from_markdown(markdown)
+    if clusters is not None:
+        markdown = apply_cluster_tables(markdown, clusters)
+
+    linker = WikiLinker([e.get("title") or "" for e in entries], preferred_topics)
+    markdown, unmatched = resolve_wiki_links(markdown, linker)
+    report_unmatched_titles(unmatched)
+
+    # Query digests use narrow topic names; only weekly digests feed the registry.
+    new_topics = [] if args.query else extract_topics_from_markdown(markdown)
     if new_topics:
         update_topic_registry(registry_path, new_topics)
         print(f"  Topic registry updated ({len(new_topics)} topics found)")
 
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    out_path = write_report(markdown, report_dir, date_str)
+    out_path = write_report(markdown, report_dir, date_str, report_name)
+    if partial_path is not None:
+        discard_partial(partial_path)
     print(f"Report written → {out_path}")
 
 
@@ -5,16 +5,25 @@ import argparse
 import json
 import os
 import sys
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import date, datetime, timezone, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from urllib.parse import quote
 from urllib.request import Request, urlopen
 import time
 import ssl
 import sqlite3
 
+from dedupe import DedupeIndex, paper_text
+
+# Seconds a writer waits on a locked index.sqlite before giving up.
+SQLITE_BUSY_TIMEOUT = 60.0
+# Commit the index every N inserted rows so concurrent ingest workers are not
+# blocked behind one venue's whole write transaction.
+COMMIT_EVERY = 100
+
 
 @dataclass
 class Source:
@@ -212,19 +221,152 @@ def openalex_works(
     return works
 
 
-def load_last_run(path: Path) -> Optional[str]:
+def read_last_run(path: Path) -> Tuple[Optional[str], Dict[str, str]]:
+    """(global last_run_date, per-venue dates) from last_run.json; (None, {}) if absent or corrupt."""
     if not path.exists():
-        return None
+        return None, {}
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
-        return data.get("last_run_date")
     except Exception:
-        return None
+        return None, {}
+    if not isinstance(data, dict):
+        return None, {}
+    venues = data.get("venues") if isinstance(data.get("venues"), dict) else {}
+    return data.get("last_run_date") or None, {k: v for k, v in venues.items() if v}
+
+
+def load_last_run(path: Path, venue_id: Optional[str] = None) -> Optional[str]:
+    """Date venue_id was last ingested in full, falling back to the global last_run_date."""
+    last_run_date, venues = read_last_run(path)
+    return venues.get(venue_id) or last_run_date
+
+
+def _try_lock(handle) -> bool:
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
 
+def _unlock(handle) -> None:
+    if os.name == "nt":
+        import msvcrt
 
-def save_last_run(path: Path, date_str: str) -> None:
-    payload = {"last_run_date": date_str, "updated_at": datetime.now(timezone.utc).isoformat()}
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None, poll: float = 0.1) -> Iterator[bool]:
+    """Hold an exclusive advisory lock on path across processes.
+
+    Yields True once the lock is held, or False if it could not be taken within
+    timeout seconds (None waits forever, 0 tries once). The lock is released
+    automatically if the holding process dies.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, "a+")
+    acquired = False
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            acquired = _try_lock(handle)
+            if acquired or (deadline is not None and time.monotonic() >= deadline):
+                break
+            time.sleep(poll)
+        yield acquired
+    finally:
+        if acquired:
+            _unlock(handle)
+        handle.close()
+
+
+def venue_lock_path(resource_dir: Path, venue_id: str) -> Path:
+    return resource_dir / "locks" / f"{sanitize_filename(venue_id)}.lock"
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    """Write text via a temp file and os.replace so readers never see a partial file."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def last_run_lock_path(path: Path) -> Path:
+    return path.with_name(path.name + ".lock")
+
+
+def write_last_run(path: Path, last_run_date: Optional[str], venues: Dict[str, str]) -> None:
+    """Write last_run.json atomically; callers hold last_run_lock_path(path)."""
+    payload: dict = {"updated_at": datetime.now(timezone.utc).isoformat()}
+    if last_run_date:
+        payload = {"last_run_date": last_run_date, **payload}
+    if venues:
+        payload["venues"] = venues
+    write_text_atomic(path, json.dumps(payload, indent=2))
+
+
+def save_last_run(
+    path: Path, date_str: str, venue_ids: Optional[List[str]] = None, advance_global: bool = True
+) -> None:
+    """Update last_run.json under a lock, merging per-venue dates from concurrent workers.
+
+    The global last_run_date is the fallback for venues without a date of their
+    own, so it only advances (advance_global) after a run that completed every venue.
+    """
+    with file_lock(last_run_lock_path(path)):
+        last_run_date, venues = read_last_run(path)
+        for venue_id in venue_ids or []:
+            venues[venue_id] = date_str
+        write_last_run(path, date_str if advance_global else last_run_date, venues)
+
+
+def connect_index(db_path: Path) -> sqlite3.Connection:
+    """Open index.sqlite for concurrent writers (WAL journal, busy timeout)."""
+    conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT)
+    conn.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT * 1000)}")
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError:
+        # Another process is mid-switch; it will leave the database in WAL mode.
+        pass
+    return conn
+
+
+def ensure_papers_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS papers (
+            doi TEXT PRIMARY KEY,
+            title TEXT,
+            venue_id TEXT,
+            venue_name TEXT,
+            published TEXT,
+            url TEXT,
+            source_url TEXT,
+            fetched_at TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_venue ON papers(venue_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_published ON papers(published)")
 
 
 def ingest_source(
@@ -244,28 +386,14 @@ def ingest_source(
     by_week_dir.mkdir(parents=True, exist_ok=True)
 
     db_path = resource_dir / "index.sqlite"
-    conn = sqlite3.connect(db_path)
+    conn = connect_index(db_path)
     added = 0
     seen = 0
     skipped_no_doi = 0
     skipped_no_abstract = 0
     try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS papers (
-                doi TEXT PRIMARY KEY,
-                title TEXT,
-                venue_id TEXT,
-                venue_name TEXT,
-                published TEXT,
-                url TEXT,
-                source_url TEXT,
-                fetched_at TEXT
-            )
-            """
-        )
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_venue ON papers(venue_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_published ON papers(published)")
+        ensure_papers_table(conn)
+        duplicates = DedupeIndex(conn)
 
         for work in works:
             doi = normalize_doi(work.get("doi"))
@@ -350,7 +478,7 @@ def ingest_source(
             filename = f"{sanitize_filename(doi)}.json"
             out_path = by_week_dir / publication_week_start / filename
             out_path.parent.mkdir(parents=True, exist_ok=True)
-            out_path.write_text(json.dumps(record, indent=2, ensure_ascii=False), encoding="utf-8")
+            write_text_atomic(out_path, json.dumps(record, indent=2, ensure_ascii=False))
 
             conn.execute(
                 """
@@ -369,7 +497,10 @@ def ingest_source(
                     record["fetched_at"],
                 ),
             )
+            duplicates.add(record["doi"], paper_text(record))
             added += 1
+            if added % COMMIT_EVERY == 0:
+                conn.commit()
         conn.commit()
     finally:
         conn.close()
@@ -402,6 +533,12 @@ def main() -> None:
         choices=["monday", "sunday"],
         help="Week convention used for resource/by_publication_week folder naming.",
     )
+    parser.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=0.0,
+        help="Seconds to wait for a venue locked by another ingest process before skipping it (default: 0).",
+    )
     args = parser.parse_args()
 
     load_env_file(Path("openalex.env"))
@@ -433,8 +570,6 @@ def main() -> None:
     until_date = args.until
     if args.lookback_days is not None:
         since_date = (datetime.now(timezone.utc).date() - timedelta(days=args.lookback_days)).isoformat()
-    if not since_date:
-        since_date = load_last_run(state_path)
 
     parsed_since = parse_iso_date(since_date) if since_date else None
     parsed_until = parse_iso_date(until_date) if until_date else None
@@ -452,6 +587,8 @@ def main() -> None:
     total_seen = 0
     total_skipped = 0
     total_skipped_no_abstract = 0
+    completed_venues: List[str] = []
+    incomplete = bool(only_set or exclude_set)
 
     for source in sources:
         if not source.openalex_source_ids:
@@ -461,27 +598,38 @@ def main() -> None:
             continue
         if exclude_set and source.venue_id in exclude_set:
             continue
-        try:
-            added, seen, skipped, skipped_no_abstract = ingest_source(
-                source,
-                resource_dir,
-                since_date,
-                until_date,
-                api_key,
-                email,
-                args.week_start_day,
-            )
-            total_added += added
-            total_seen += seen
-            total_skipped += skipped
-            total_skipped_no_abstract += skipped_no_abstract
-            print(f"{source.venue_id}: +{added} new, {seen} existing, {skipped} skipped (no DOI), {skipped_no_abstract} skipped (no abstract)")
-        except Exception as exc:
-            print(f"{source.venue_id}: error {exc}", file=sys.stderr)
+        with file_lock(venue_lock_path(resource_dir, source.venue_id), timeout=args.lock_timeout) as locked:
+            if not locked:
+                print(f"{source.venue_id}: skipped (locked by another ingest process)", file=sys.stderr)
+                incomplete = True
+                continue
+            # Read under the venue lock so a worker that just finished this venue is seen.
+            source_since = since_date or load_last_run(state_path, source.venue_id)
+            try:
+                added, seen, skipped, skipped_no_abstract = ingest_source(
+                    source,
+                    resource_dir,
+                    source_since,
+                    until_date,
+                    api_key,
+                    email,
+                    args.week_start_day,
+                )
+                total_added += added
+                total_seen += seen
+                total_skipped += skipped
+                total_skipped_no_abstract += skipped_no_abstract
+                completed_venues.append(source.venue_id)
+                print(f"{source.venue_id}: +{added} new, {seen} existing, {skipped} skipped (no DOI), {skipped_no_abstract} skipped (no abstract)")
+            except Exception as exc:
+                print(f"{source.venue_id}: error {exc}", file=sys.stderr)
+                incomplete = True
 
     print(f"Total: +{total_added} new, {total_seen} existing, {total_skipped} skipped (no DOI), {total_skipped_no_abstract} skipped (no abstract)")
     if args.until is None:
-        save_last_run(state_path, datetime.now(timezone.utc).date().isoformat())
+        save_last_run(
+            state_path, datetime.now(timezone.utc).date().isoformat(), completed_venues, advance_global=not incomplete
+        )
     else:
         print("Skipped updating last_run.json because --until was specified (targeted backfill).")
 
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""Label every indexed paper with one research topic, once, in index.sqlite.
+
+Only DOIs without a row in `paper_topics` are labeled. When a local classifier
+has been trained (topic_classifier.py), its confident predictions are stored
+directly and only the rest are sent to the LLM, many papers per prompt. Papers
+without an abstract are skipped. Large backfills can go through the SiliconFlow
+batch endpoints instead (--batch-api, then --collect once the batch finishes).
+Because labels live next to `papers`, week-by-topic and venue-by-topic counts
+for any window are a single GROUP BY (--trends).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from ingest_openalex import connect_index, parse_iso_date, sanitize_filename, week_start_for, write_text_atomic
+from llm_cache import DEFAULT_CHAT_MODEL, LLMCache, chat_completion
+from paper_corpus import load_env_file, load_topic_registry, read_paper
+from topic_classifier import (
+    CLASSIFIER_FILE,
+    DEFAULT_THRESHOLD,
+    LOCAL_MODEL,
+    TopicClassifier,
+    llm_labeled_papers,
+    route_predictions,
+    train_incremental,
+)
+from topic_clusters import venue_label
+
+DEFAULT_PAPERS_PER_PROMPT = 40
+LABEL_MAX_WORDS = 80
+LABEL_MAX_TOKENS = 4096
+PENDING_BATCHES_FILE = "label_batches.json"
+
+LABEL_SYSTEM_PROMPT = (
+    "You are a wireless communications research analyst. "
+    "You assign each paper exactly one short research-topic label."
+)
+
+# SQLite expressions for the start of a paper's publication week.
+WEEK_START_SQL = {
+    "monday": "date(p.published, '-6 days', 'weekday 1')",
+    "sunday": "date(p.published, '-6 days', 'weekday 0')",
+}
+
+
+def ensure_topics_table(conn) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS paper_topics (
+            doi TEXT PRIMARY KEY,
+            topic TEXT NOT NULL,
+            model TEXT,
+            labeled_at TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_paper_topics_topic ON paper_topics(topic)")
+    conn.commit()
+
+
+def unlabeled_papers(conn, since: str | None = None, limit: int | None = None, exclude: set[str] | None = None) -> list[dict]:
+    """Indexed papers with no topic label yet, newest first."""
+    sql = (
+        "SELECT p.doi, p.title, p.published FROM papers p "
+        "LEFT JOIN paper_topics t ON t.doi = p.doi WHERE t.doi IS NULL"
+    )
+    params: list = []
+    if since:
+        sql += " AND p.published >= ?"
+        params.append(since)
+    sql += " ORDER BY p.published DESC"
+    papers = []
+    for doi, title, published in conn.execute(sql, params):
+        if exclude and doi in exclude:
+            continue
+        papers.append({"doi": doi, "title": title or "", "published": published or ""})
+        if limit and len(papers) >= limit:
+            break
+    return papers
+
+
+def attach_abstracts(papers: list[dict], weeks_dir: Path, week_start_day: str = "monday") -> list[dict]:
+    """Fill paper["abstract"] from its week record file; return the papers that have one.
+
+    Papers whose record is missing or has no abstract are dropped, as read_paper
+    drops them from reports: a title alone is too little to label.
+    """
+    found = []
+    for paper in papers:
+        day = parse_iso_date(paper["published"])
+        if day is None:
+            continue
+        path = weeks_dir / week_start_for(day, week_start_day).isoformat() / f"{sanitize_filename(paper['doi'])}.json"
+        record = read_paper(path) if path.exists() else None
+        if record is not None:
+            paper["abstract"] = record["abstract"]
+            found.append(paper)
+    return found
+
+
+def build_label_messages(papers: list[dict], topics: list[str] | None = None) -> list[dict]:
+    lines = []
+    for i, paper in enumerate(papers, start=1):
+        abstract = " ".join((paper.get("abstract") or "").split()[:LABEL_MAX_WORDS])
+        title = " ".join(paper["title"].split())
+        lines.append(f"{i} | {title} | {abstract}" if abstract else f"{i} | {title}")
+    vocabulary = ""
+    if topics:
+        vocabulary = (
+            "Reuse one of these existing topic names whenever it fits:\n"
+            + "\n".join(f"- {t}" for t in topics)
+            + "\n\n"
+        )
+    user = (
+        "Assign each paper below exactly one research topic (2-6 words, e.g. 'RIS-Assisted Beamforming').\n"
+        + vocabulary
+        + 'Reply with one JSON object per line, {"id": <paper id>, "topic": "<topic>"}, '
+        "covering every paper id and nothing else.\n\n"
+        "Papers (id | title | abstract):\n"
+        + "\n".join(lines)
+    )
+    return [
+        {"role": "system", "content": LABEL_SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def parse_labels(text: str, n: int) -> dict[int, str]:
+    """Map prompt ids (1..n) to topics from the model's JSON lines; malformed lines are skipped."""
+    labels: dict[int, str] = {}
+    for blob in re.findall(r"\{[^{}]*\}", text):
+        try:
+            item = json.loads(blob)
+            idx = int(item["id"])
+            topic = " ".join(str(item["topic"]).split())
+        except (ValueError, KeyError, TypeError):
+            continue
+        if 1 <= idx <= n and topic:
+            labels[idx] = topic
+    return labels
+
+
+def store_labels(conn, labels: list[tuple[str, str]], model: str) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    conn.executemany(
+        "INSERT OR REPLACE INTO paper_topics (doi, topic, model, labeled_at) VALUES (?, ?, ?, ?)",
+        [(doi, topic, model, now) for doi, topic in labels],
+    )
+    conn.commit()
+
+
+def chunked(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), max(1, size))]
+
+
+def label_with_chat(
+    conn,
+    papers: list[dict],
+    client,
+    model: str,
+    topics: list[str] | None = None,
+    papers_per_prompt: int = DEFAULT_PAPERS_PER_PROMPT,
+    concurrency: int = 4,
+    cache: LLMCache | None = None,
+) -> dict[str, int]:
+    """Label papers with concurrent multi-paper prompts; ids missing from a reply stay unlabeled."""
+    stats = {"prompts": 0, "labeled": 0, "missing": 0}
+    chunks = chunked(papers, papers_per_prompt)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(
+                chat_completion, client, build_label_messages(chunk, topics), LABEL_MAX_TOKENS, model=model, cache=cache
+            ): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            labels = parse_labels(future.result(), len(chunk))
+            store_labels(conn, [(chunk[i - 1]["doi"], topic) for i, topic in labels.items()], model)
+            stats["prompts"] += 1
+            stats["labeled"] += len(labels)
+            stats["missing"] += len(chunk) - len(labels)
+            print(f"  labeled {stats['labeled']} / {len(papers)}", flush=True)
+    return stats
+
+
+# --- SiliconFlow batch API ---
+
+def load_pending(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def pending_dois(pending: dict) -> set[str]:
+    return {doi for batch in pending.values() for dois in batch.get("requests", {}).values() for doi in dois}
+
+
+def write_batch_requests(
+    path: Path,
+    papers: list[dict],
+    model: str,
+    topics: list[str] | None = None,
+    papers_per_prompt: int = DEFAULT_PAPERS_PER_PROMPT,
+) -> dict[str, list[str]]:
+    """Write a chat-completions batch input JSONL; return {custom_id: DOIs in that prompt}."""
+    requests: dict[str, list[str]] = {}
+    with path.open("w", encoding="utf-8") as f:
+        for i, chunk in enumerate(chunked(papers, papers_per_prompt)):
+            custom_id = f"labels-{i}"
+            body = {"model": model, "messages": build_label_messages(chunk, topics), "max_tokens": LABEL_MAX_TOKENS}
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}, ensure_ascii=False) + "\n")
+            requests[custom_id] = [p["doi"] for p in chunk]
+    return requests
+
+
+def submit_batch(
+    api,
+    papers: list[dict],
+    model: str,
+    pending_path: Path,
+    topics: list[str] | None = None,
+    papers_per_prompt: int = DEFAULT_PAPERS_PER_PROMPT,
+) -> str:
+    """Upload the labeling prompts as one batch job and remember which DOIs it covers."""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "label_requests.jsonl"
+        requests = write_batch_requests(input_path, papers, model, topics, papers_per_prompt)
+        uploaded = api.upload_batch_file(file_path=input_path)
+    batch = api.create_batch(
+        input_file_id=uploaded.get("id") or uploaded["data"]["id"],
+        metadata={"purpose": "paper-topic-labels"},
+    )
+    batch_id = batch.get("id") or batch["data"]["id"]
+    pending = load_pending(pending_path)
+    pending[batch_id] = {
+        "model": model,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "requests": requests,
+    }
+    write_text_atomic(pending_path, json.dumps(pending, indent=2))
+    return batch_id
+
+
+def batch_output_text(line: dict) -> str:
+    body = (line.get("response") or {}).get("body") or {}
+    choices = body.get("choices") or [{}]
+    return (choices[0].get("message") or {}).get("content") or ""
+
+
+def collect_batches(conn, api, pending_path: Path) -> dict[str, int]:
+    """Store labels from finished batches; unfinished ones stay pending."""
+    stats = {"completed": 0, "waiting": 0, "failed": 0, "labeled": 0}
+    pending = load_pending(pending_path)
+    for batch_id in list(pending):
+        info = pending[batch_id]
+        batch = api.get_batch(batch_id=batch_id)
+        status = batch.get("status")
+        if status in {"failed", "expired", "cancelled"}:
+            print(f"  Batch {batch_id} {status}; its papers will be picked up by the next run", file=sys.stderr)
+            stats["failed"] += 1
+            del pending[batch_id]
+            continue
+        if status != "completed" or not batch.get("output_file_id"):
+            stats["waiting"] += 1
+            continue
+        output = api.get_file_content(file_id=batch["output_file_id"])
+        for raw in output.splitlines():
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            dois = info["requests"].get(line.get("custom_id"), [])
+            labels = parse_labels(batch_output_text(line), len(dois))
+            store_labels(conn, [(dois[i - 1], topic) for i, topic in labels.items()], info["model"])
+            stats["labeled"] += len(labels)
+        stats["completed"] += 1
+        del pending[batch_id]
+    write_text_atomic(pending_path, json.dumps(pending, indent=2))
+    return stats
+
+
+# --- trend queries ---
+
+@dataclass
+class TopicMatrix:
+    keys: list[str]           # weeks or venue ids, column order
+    topics: list[str]         # most papers first
+    counts: list[list[int]]   # counts[topic][key]
+
+    def totals(self) -> list[int]:
+        return [sum(row) for row in self.counts]
+
+
+def topic_matrix(
+    conn,
+    by: str = "week",
+    since: str | None = None,
+    until: str | None = None,
+    week_start_day: str = "monday",
+) -> TopicMatrix:
+    """Count labeled papers per (week or venue, topic) with one GROUP BY over the index."""
+    key_sql = WEEK_START_SQL[week_start_day] if by == "week" else "p.venue_id"
+    sql = (
+        f"SELECT {key_sql} AS k, t.topic, COUNT(*) FROM paper_topics t "
+        "JOIN papers p ON p.doi = t.doi WHERE k IS NOT NULL"
+    )
+    params: list = []
+    if since:
+        sql += " AND p.published >= ?"
+        params.append(since)
+    if until:
+        sql += " AND p.published < ?"
+        params.append(until)
+    sql += " GROUP BY k, t.topic"
+
+    cells: dict[tuple[str, str], int] = {}
+    topic_totals: dict[str, int] = {}
+    keys: set[str] = set()
+    for key, topic, n in conn.execute(sql, params):
+        cells[(topic, key)] = n
+        topic_totals[topic] = topic_totals.get(topic, 0) + n
+        keys.add(key)
+    key_order = sorted(keys)
+    topics = sorted(topic_totals, key=lambda t: (-topic_totals[t], t))
+    counts = [[cells.get((topic, key), 0) for key in key_order] for topic in topics]
+    return TopicMatrix(keys=key_order, topics=topics, counts=counts)
+
+
+def render_matrix(matrix: TopicMatrix, by: str = "week", max_topics: int | None = None) -> str:
+    """Markdown table: one row per topic, one column per week or venue, plus a total."""
+    labels = [k if by == "week" else venue_label(k) for k in matrix.keys]
+    header = "| Topic | " + " | ".join(labels) + " | Total |"
+    divider = "|-------|" + "|".join("-" * max(3, len(label) + 2) for label in labels) + "|-------|"
+    rows = []
+    for topic, row, total in list(zip(matrix.topics, matrix.counts, matrix.totals()))[:max_topics]:
+        rows.append(f"| {topic} | " + " | ".join(str(n) for n in row) + f" | {total} |")
+    return "\n".join([header, divider, *rows])
+
+
+def update_classifier(conn, resource_dir: Path, week_start_day: str = "monday") -> int:
+    """Fold LLM labels newer than the classifier's watermark into it; 0 if no classifier exists."""
+    model_path = resource_dir / CLASSIFIER_FILE
+    if not model_path.exists():
+        return 0
+    model = TopicClassifier.load(model_path)
+    papers = llm_labeled_papers(conn, model.trained_until)
+    attach_abstracts(papers, resource_dir / "by_publication_week", week_start_day)  # titles alone still train
+    added = train_incremental(model, papers)
+    if added:
+        model.save(model_path)
+    return added
+
+
+def window_start(weeks: int, week_start_day: str = "monday", today: date | None = None) -> str:
+    """First day of the window covering the current week and the weeks - 1 before it."""
+    this_week = week_start_for(today or date.today(), week_start_day)
+    return (this_week - timedelta(weeks=max(1, weeks) - 1)).isoformat()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Label indexed papers with research topics in index.sqlite.")
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument("--since", help="Only label papers published on or after this date (YYYY-MM-DD).")
+    parser.add_argument("--limit", type=int, help="Label at most N papers this run.")
+    parser.add_argument("--model", default=os.getenv("SILICONFLOW_LABEL_MODEL") or os.getenv("SILICONFLOW_MODEL") or DEFAULT_CHAT_MODEL)
+    parser.add_argument("--papers-per-prompt", type=int, default=DEFAULT_PAPERS_PER_PROMPT, help="Papers labeled by one LLM call")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent LLM calls")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM instead of reusing cached replies.")
+    parser.add_argument("--batch-api", action="store_true", help="Submit unlabeled papers as a SiliconFlow batch job (for backfills).")
+    parser.add_argument("--collect", action="store_true", help="Store labels from finished batch jobs.")
+    parser.add_argument(
+        "--no-local",
+        action="store_true",
+        help=f"Send every paper to the LLM even when {CLASSIFIER_FILE} exists.",
+    )
+    parser.add_argument(
+        "--local-threshold",
+        type=float,
+        help="Classifier confidence needed to skip the LLM (default: the threshold topic_classifier.py --evaluate "
+        f"stored with the model, else {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument("--trends", choices=["week", "venue"], help="Print a topic-by-week or topic-by-venue count table and exit.")
+    parser.add_argument("--weeks", type=int, default=8, help="Window for --trends (default: 8 weeks).")
+    parser.add_argument("--top", type=int, default=15, help="Topics shown by --trends")
+    parser.add_argument(
+        "--week-start-day",
+        default="monday",
+        choices=["monday", "sunday"],
+        help="Week convention of resource/by_publication_week (see ingest_openalex.py).",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Count unlabeled papers without calling the LLM.")
+    args = parser.parse_args()
+
+    resource_dir = Path(args.resource_dir)
+    db_path = resource_dir / "index.sqlite"
+    if not db_path.exists():
+        print(f"Missing index: {db_path}", file=sys.stderr)
+        sys.exit(1)
+    conn = connect_index(db_path)
+    try:
+        ensure_topics_table(conn)
+
+        if args.trends:
+            since = window_start(args.weeks, args.week_start_day)
+            matrix = topic_matrix(conn, by=args.trends, since=since, week_start_day=args.week_start_day)
+            if not matrix.topics:
+                print(f"No labeled papers since {since}; run label_papers.py first.")
+                return
+            print(render_matrix(matrix, by=args.trends, max_topics=args.top))
+            return
+
+        load_env_file(Path("private.env"))
+        pending_path = resource_dir / PENDING_BATCHES_FILE
+        api = None
+        if not args.dry_run and (args.batch_api or args.collect):
+            from siliconflow_api import SiliconFlowAPI
+
+            api = SiliconFlowAPI()
+
+        if args.collect:
+            stats = collect_batches(conn, api, pending_path)
+            print(f"Batches completed: {stats['completed']}, waiting: {stats['waiting']}, failed: {stats['failed']}")
+            print(f"Labeled: {stats['labeled']}")
+            added = update_classifier(conn, resource_dir, args.week_start_day)
+            if added:
+                print(f"Local classifier updated with {added} labels")
+            return
+
+        unlabeled = unlabeled_papers(conn, args.since, exclude=pending_dois(load_pending(pending_path)))
+        # Abstract-less papers are filtered before --limit so they cannot fill every run's quota.
+        papers = attach_abstracts(unlabeled, resource_dir / "by_publication_week", args.week_start_day)
+        skipped = len(unlabeled) - len(papers)
+        papers = papers[: args.limit] if args.limit else papers
+        print(f"Unlabeled papers: {len(papers)}" + (f" ({skipped} without an abstract skipped)" if skipped else ""))
+        if args.dry_run or not papers:
+            return
+        model_path = resource_dir / CLASSIFIER_FILE
+        if not args.no_local and model_path.exists():
+            model = TopicClassifier.load(model_path)
+            threshold = model.threshold if args.local_threshold is None else args.local_threshold
+            confident, papers = route_predictions(model, papers, threshold)
+            store_labels(conn, confident, LOCAL_MODEL)
+            print(f"Labeled locally: {len(confident)} (confidence >= {threshold:g}); left for the LLM: {len(papers)}")
+            if not papers:
+                return
+        topics = load_topic_registry(resource_dir / "topic_registry.json")
+
+        if args.batch_api:
+            batch_id = submit_batch(api, papers, args.model, pending_path, topics, args.papers_per_prompt)
+            print(f"Submitted batch {batch_id}; run label_papers.py --collect once it completes.")
+            return
+
+        from siliconflow_api import build_openai_client
+
+        client = build_openai_client()
+        cache = None if args.no_cache else LLMCache(resource_dir / "llm_cache")
+        stats = label_with_chat(conn, papers, client, args.model, topics, args.papers_per_prompt, args.concurrency, cache)
+        print(f"Prompts: {stats['prompts']}")
+        print(f"Labeled: {stats['labeled']}")
+        if stats["missing"]:
+            print(f"Left unlabeled (missing from replies): {stats['missing']}")
+        added = update_classifier(conn, resource_dir, args.week_start_day)
+        if added:
+            print(f"Local classifier updated with {added} labels")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
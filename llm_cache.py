@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Content-addressed disk cache for chat-completion responses.
+
+Entries are keyed by a SHA-256 of the model, messages and request parameters,
+stored one JSON file per response under <root>/<key[:2]>/<key>.json, and
+evicted by age (TTL, from the stored creation time) and by total size (least
+recently used first, by file mtime, which every hit refreshes).
+
+chat_completion() runs one chat call through the cache; with a partial path it
+streams the answer to disk and can resume a cut-off stream.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+DEFAULT_CACHE_DIR = "resource/llm_cache"
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# put() rescans the cache tree after this many writes, or as soon as the
+# tracked size exceeds max_bytes; other processes' writes are seen on rescans.
+EVICT_SCAN_EVERY = 100
+DEFAULT_CHAT_MODEL = "Pro/moonshotai/Kimi-K2.5"
+
+# Seconds between streaming progress lines on stdout.
+PROGRESS_EVERY_SECONDS = 2.0
+CONTINUE_PROMPT = (
+    "Your previous answer was cut off. Continue exactly where it stopped: do not repeat any text "
+    "already written and add no preamble."
+)
+
+
+def cache_key(model: str, messages: list[dict], **params: Any) -> str:
+    """Stable SHA-256 over the request; parameter order does not matter."""
+    blob = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Disk cache of chat completion text, safe for concurrent threads and processes."""
+
+    def __init__(
+        self,
+        root: Path | str | None = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.root = Path(root or os.getenv("LLM_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None  # from the last scan plus this process's writes since
+        self._puts_since_scan = 0
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        path = self.path_for(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            created = data.get("created") or path.stat().st_mtime
+            if self.ttl_seconds and time.time() - created > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            os.utime(path)  # mark as recently used for size-based eviction
+        except (OSError, ValueError):
+            return None
+        return data.get("content")
+
+    def put(self, key: str, content: str, meta: dict | None = None) -> None:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {"key": key, "created": time.time(), "meta": meta or {}, "content": content}
+        fd, tmp = tempfile.mkstemp(prefix=f".{key[:8]}.", suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        size = path.stat().st_size
+        with self._lock:
+            self._puts_since_scan += 1
+            if self._total_bytes is not None:
+                self._total_bytes += size
+            scan = (
+                self._total_bytes is None
+                or self._puts_since_scan >= EVICT_SCAN_EVERY
+                or bool(self.max_bytes and self._total_bytes > self.max_bytes)
+            )
+        if scan:
+            self.evict()
+
+    def get_or_create(
+        self,
+        model: str,
+        messages: list[dict],
+        create: Callable[[], str],
+        **params: Any,
+    ) -> str:
+        """Return the cached completion for this request, calling create() on a miss."""
+        key = cache_key(model, messages, **params)
+        content = self.get(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if content is not None:
+            return content
+        content = create()
+        self.put(key, content, {"model": model, **params})
+        return content
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used until under max_bytes.
+
+        An entry unused for longer than the TTL is expired whatever its creation
+        time, so the scan needs only stat(); get() checks the creation time.
+        """
+        if not self.root.exists():
+            return 0
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if self.ttl_seconds and now - st.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if self.max_bytes and total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                path.unlink(missing_ok=True)
+                removed += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        with self._lock:
+            self._total_bytes = total
+            self._puts_since_scan = 0
+        return removed
+
+
+def partial_meta_path(partial_path: Path) -> Path:
+    return partial_path.with_name(partial_path.name + ".json")
+
+
+def stream_completion(
+    client,
+    model: str,
+    messages: list[dict],
+    max_tokens: int,
+    partial_path: Path,
+    resume: bool = False,
+) -> str:
+    """Stream a completion into partial_path, printing progress; return the full text.
+
+    With resume, text left in partial_path by a failed run of the same prompt
+    is kept and the model is asked to continue from where it stopped. A stream
+    cut off by max_tokens (finish_reason "length") raises ValueError and keeps
+    the partial, so it is neither cached nor written as a finished report.
+    """
+    meta_path = partial_meta_path(partial_path)
+    key = cache_key(model, messages, max_tokens=max_tokens)
+    prefix = ""
+    if resume and partial_path.exists() and meta_path.exists():
+        try:
+            same_prompt = json.loads(meta_path.read_text(encoding="utf-8")).get("key") == key
+        except ValueError:
+            same_prompt = False
+        if same_prompt:
+            prefix = partial_path.read_text(encoding="utf-8")
+        else:
+            print(f"  {partial_path.name} was written for a different prompt; starting over.", flush=True)
+
+    request = messages
+    if prefix:
+        print(f"  Resuming after {len(prefix):,} characters from {partial_path}", flush=True)
+        request = messages + [
+            {"role": "assistant", "content": prefix},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+
+    partial_path.parent.mkdir(parents=True, exist_ok=True)
+    meta_path.write_text(json.dumps({"key": key, "model": model}), encoding="utf-8")
+    parts = [prefix]
+    chunks = 0
+    finish_reason = None
+    start = last_report = time.monotonic()
+    with partial_path.open("a" if prefix else "w", encoding="utf-8") as out:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=request,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for event in stream:
+            if not event.choices:
+                continue
+            choice = event.choices[0]
+            delta = choice.delta.content if choice.delta is not None else None
+            if delta:
+                out.write(delta)
+                out.flush()
+                parts.append(delta)
+                chunks += 1
+            finish_reason = choice.finish_reason or finish_reason
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_EVERY_SECONDS:
+                elapsed = now - start
+                print(f"  … {chunks} tokens, {chunks / elapsed:.1f} tok/s, {elapsed:.0f}s elapsed", flush=True)
+                last_report = now
+
+    elapsed = time.monotonic() - start
+    print(
+        f"  Stream finished: {chunks} tokens in {elapsed:.0f}s"
+        f" ({chunks / elapsed if elapsed else 0:.1f} tok/s, finish_reason={finish_reason})",
+        flush=True,
+    )
+    content = "".join(parts)
+    if not content:
+        raise ValueError(f"LLM returned no content (finish_reason={finish_reason})")
+    if finish_reason == "length":
+        raise ValueError(f"LLM output is incomplete: stopped at max_tokens={max_tokens}")
+    return content
+
+
+def chat_completion(
+    client,
+    messages: list[dict],
+    max_tokens: int = 8192,
+    model: str | None = None,
+    cache: "LLMCache | None" = None,
+    partial_path: Path | None = None,
+    resume: bool = False,
+) -> str:
+    """Run one chat completion and return its text, reusing cache hits when given a cache.
+
+    With partial_path the completion is streamed into that file as it arrives.
+    """
+    model = model or os.getenv("SILICONFLOW_MODEL") or DEFAULT_CHAT_MODEL
+
+    def create() -> str:
+        if partial_path is not None:
+            return stream_completion(client, model, messages, max_tokens, partial_path, resume)
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+        )
+        content = response.choices[0].message.content
+        if content is None:
+            raise ValueError(f"LLM returned no content (finish_reason={response.choices[0].finish_reason})")
+        return content
+
+    if cache is None:
+        return create()
+    return cache.get_or_create(model, messages, create, max_tokens=max_tokens)
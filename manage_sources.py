@@ -7,6 +7,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
+from venue_catalog import DEFAULT_CATALOG_PATH, format_entry, open_catalog, search
+
 
 @dataclass
 class Venue:
@@ -146,6 +148,22 @@ def cmd_set_openalex(venues: List[Venue], venue_id: str, source_id: str) -> None
         venue.openalex_source_ids.append(source_id)
 
 
+def cmd_search(venues: List[Venue], query: str, catalog_path: Path, limit: int) -> None:
+    if not catalog_path.exists():
+        raise FileNotFoundError(f"Venue catalog not found: {catalog_path} (run venue_catalog.py refresh)")
+    venue = find_venue(venues, query)
+    name = venue.name if venue else query
+    configured = set(venue.openalex_source_ids) if venue else set()
+    conn = open_catalog(catalog_path)
+    try:
+        entries = search(conn, name, limit=limit)
+    finally:
+        conn.close()
+    for entry in entries:
+        marker = "*" if entry.source_id in configured else " "
+        print(f"{marker} {format_entry(entry)}")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Manage sources.yaml (OpenAlex-only).")
     parser.add_argument("--file", default="sources.yaml", help="Path to sources.yaml")
@@ -170,10 +188,19 @@ def main() -> None:
     set_oa.add_argument("venue_id")
     set_oa.add_argument("openalex_source_id")
 
+    find = sub.add_parser("search", help="Search the offline venue catalog for OpenAlex source ids")
+    find.add_argument("query", help="Venue name, or a venue_id from sources.yaml to search by its name")
+    find.add_argument("--limit", type=int, default=10)
+    find.add_argument("--catalog", default=DEFAULT_CATALOG_PATH, help="Path to venue catalog SQLite file")
+
     args = parser.parse_args()
     path = Path(args.file)
     venues = load_sources(path)
 
+    if args.cmd == "search":
+        cmd_search(venues, args.query, Path(args.catalog), args.limit)
+        return
+
     if args.cmd == "list":
         cmd_list(venues)
         return
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from dedupe import DedupeIndex
+from ingest_openalex import (
+    connect_index,
+    ensure_papers_table,
+    file_lock,
+    last_run_lock_path,
+    read_last_run,
+    write_last_run,
+)
+from label_papers import ensure_topics_table
+
+
+@dataclass
+class MergeStats:
+    rows_seen: int = 0
+    rows_inserted: int = 0
+    rows_conflicted: int = 0
+    files_scanned: int = 0
+    files_linked: int = 0
+    files_copied: int = 0
+    files_moved: int = 0
+    files_skipped_exists: int = 0
+    signatures_added: int = 0
+    labels_merged: int = 0
+
+
+# On DOI conflict the destination row wins, but empty columns are filled in
+# from the incoming row and fetched_at keeps the earliest ingest timestamp, so
+# repeated merges converge to the same result regardless of shard order.
+MERGE_PAPERS_SQL = """
+    INSERT INTO papers
+    (doi, title, venue_id, venue_name, published, url, source_url, fetched_at)
+    SELECT doi, title, venue_id, venue_name, published, url, source_url, fetched_at
+    FROM shard.papers
+    WHERE doi IS NOT NULL AND doi != ''
+    ON CONFLICT(doi) DO UPDATE SET
+        title = COALESCE(NULLIF(papers.title, ''), excluded.title),
+        venue_id = COALESCE(NULLIF(papers.venue_id, ''), excluded.venue_id),
+        venue_name = COALESCE(NULLIF(papers.venue_name, ''), excluded.venue_name),
+        published = COALESCE(NULLIF(papers.published, ''), excluded.published),
+        url = COALESCE(NULLIF(papers.url, ''), excluded.url),
+        source_url = COALESCE(NULLIF(papers.source_url, ''), excluded.source_url),
+        fetched_at = CASE
+            WHEN papers.fetched_at IS NULL OR papers.fetched_at = '' THEN excluded.fetched_at
+            WHEN excluded.fetched_at IS NOT NULL AND excluded.fetched_at != ''
+                 AND excluded.fetched_at < papers.fetched_at THEN excluded.fetched_at
+            ELSE papers.fetched_at
+        END
+"""
+
+
+# Topic labels: the most recently labelled row wins, as with store_labels in a
+# single index; ties keep the destination row.
+MERGE_TOPICS_SQL = """
+    INSERT INTO paper_topics (doi, topic, model, labeled_at)
+    SELECT doi, topic, model, labeled_at
+    FROM shard.paper_topics
+    WHERE doi IS NOT NULL AND doi != ''
+    ON CONFLICT(doi) DO UPDATE SET
+        topic = excluded.topic,
+        model = excluded.model,
+        labeled_at = excluded.labeled_at
+    WHERE COALESCE(excluded.labeled_at, '') > COALESCE(paper_topics.labeled_at, '')
+"""
+
+
+def shard_has_table(conn, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM shard.sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def merge_signatures(conn) -> int:
+    """Add the shard's MinHash signatures the destination lacks; return how many.
+
+    Signatures are re-indexed rather than copied, so LSH buckets are rebuilt and
+    duplicate groups are recomputed across shards (a preprint ingested on one
+    machine joins the article ingested on another).
+    """
+    index = DedupeIndex(conn)
+    rows = conn.execute(
+        "SELECT doi, signature FROM shard.minhash_signatures s "
+        "WHERE NOT EXISTS (SELECT 1 FROM main.minhash_signatures m WHERE m.doi = s.doi)"
+    ).fetchall()
+    with conn:
+        for doi, signature in rows:
+            index.add_signature(doi, np.frombuffer(signature, dtype=np.uint32))
+    return len(rows)
+
+
+def merge_index(dest_db: Path, shard_db: Path, stats: MergeStats) -> None:
+    """Union shard papers, dedupe signatures and topic labels into dest_db.
+
+    Papers and labels are merged inside SQLite (no rows held in Python).
+    """
+    if not shard_db.exists():
+        return
+    conn = connect_index(dest_db)
+    try:
+        ensure_papers_table(conn)
+        conn.execute("ATTACH DATABASE ? AS shard", (str(shard_db),))
+        try:
+            if shard_has_table(conn, "papers"):
+                before = conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+                seen = conn.execute(
+                    "SELECT COUNT(*) FROM shard.papers WHERE doi IS NOT NULL AND doi != ''"
+                ).fetchone()[0]
+                with conn:
+                    conn.execute(MERGE_PAPERS_SQL)
+                after = conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+                stats.rows_seen += seen
+                stats.rows_inserted += after - before
+                stats.rows_conflicted += seen - (after - before)
+            if shard_has_table(conn, "minhash_signatures"):
+                stats.signatures_added += merge_signatures(conn)
+            if shard_has_table(conn, "paper_topics"):
+                ensure_topics_table(conn)
+                with conn:
+                    stats.labels_merged += conn.execute(MERGE_TOPICS_SQL).rowcount
+        finally:
+            conn.execute("DETACH DATABASE shard")
+    finally:
+        conn.close()
+
+
+def iter_week_records(weeks_dir: Path) -> Iterable[tuple[str, os.DirEntry]]:
+    """Yield (week_name, file_entry) pairs by streaming os.scandir over week folders."""
+    if not weeks_dir.exists():
+        return
+    with os.scandir(weeks_dir) as weeks:
+        for week in weeks:
+            if not week.is_dir():
+                continue
+            with os.scandir(week.path) as files:
+                for entry in files:
+                    if entry.is_file() and entry.name.endswith(".json"):
+                        yield week.name, entry
+
+
+def transfer_file(src: Path, dst: Path, mode: str) -> str:
+    """Place src at dst using mode link/move/copy; return the action actually taken."""
+    if mode == "move":
+        shutil.move(str(src), str(dst))
+        return "moved"
+    if mode == "link":
+        try:
+            os.link(src, dst)
+            return "linked"
+        except FileExistsError:
+            raise
+        except OSError:
+            # Cross-device or unsupported filesystem: fall back to a copy.
+            pass
+    shutil.copy2(src, dst)
+    return "copied"
+
+
+def merge_records(dest_weeks: Path, shard_weeks: Path, mode: str, dry_run: bool, stats: MergeStats) -> None:
+    for week_name, entry in iter_week_records(shard_weeks):
+        stats.files_scanned += 1
+        dst = dest_weeks / week_name / entry.name
+        if dst.exists():
+            stats.files_skipped_exists += 1
+            continue
+        if dry_run:
+            action = {"link": "linked", "move": "moved"}.get(mode, "copied")
+        else:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                action = transfer_file(Path(entry.path), dst, mode)
+            except FileExistsError:
+                stats.files_skipped_exists += 1
+                continue
+        setattr(stats, f"files_{action}", getattr(stats, f"files_{action}") + 1)
+
+
+def merge_last_run(dest_dir: Path, shard_dirs: List[Path]) -> Optional[str]:
+    """Keep the earliest date per venue and overall, so the next incremental ingest leaves no gaps.
+
+    Per-venue dates come from each file's venues map; a venue only some shards
+    ingested keeps the earliest date among those shards.
+    """
+    path = dest_dir / "last_run.json"
+    with file_lock(last_run_lock_path(path)):
+        dates: List[str] = []
+        venues: dict[str, str] = {}
+        for resource_dir in [dest_dir, *shard_dirs]:
+            last_run_date, shard_venues = read_last_run(resource_dir / "last_run.json")
+            if last_run_date:
+                dates.append(last_run_date)
+            for venue_id, date_str in shard_venues.items():
+                if venue_id not in venues or date_str < venues[venue_id]:
+                    venues[venue_id] = date_str
+        if not dates and not venues:
+            return None
+        merged = min(dates) if dates else None
+        write_last_run(path, merged, venues)
+    return merged
+
+
+def merge_topic_registry(dest_dir: Path, shard_dirs: List[Path]) -> int:
+    """Union topic names from every topic_registry.json (order-preserving)."""
+    topics: List[str] = []
+    found = False
+    for resource_dir in [dest_dir, *shard_dirs]:
+        path = resource_dir / "topic_registry.json"
+        if not path.exists():
+            continue
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        found = True
+        topics.extend(data.get("topics") or [])
+    if not found:
+        return 0
+    merged = list(dict.fromkeys(topics))
+    data = {"topics": merged, "updated": datetime.now().strftime("%Y-%m-%d")}
+    (dest_dir / "topic_registry.json").write_text(
+        json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    return len(merged)
+
+
+def merge_resources(
+    dest_dir: Path,
+    shard_dirs: List[Path],
+    mode: str = "link",
+    dry_run: bool = False,
+) -> MergeStats:
+    stats = MergeStats()
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    dest_resolved = dest_dir.resolve()
+    for shard_dir in shard_dirs:
+        if shard_dir.resolve() == dest_resolved:
+            continue
+        if not dry_run:
+            merge_index(dest_dir / "index.sqlite", shard_dir / "index.sqlite", stats)
+        merge_records(
+            dest_dir / "by_publication_week",
+            shard_dir / "by_publication_week",
+            mode,
+            dry_run,
+            stats,
+        )
+    if not dry_run:
+        merge_last_run(dest_dir, shard_dirs)
+        merge_topic_registry(dest_dir, shard_dirs)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Merge several ingest resource directories (e.g. per-machine venue shards) into one."
+    )
+    parser.add_argument("shards", nargs="+", help="Resource directories to merge from.")
+    parser.add_argument("--into", default="resource", help="Destination resource directory.")
+    parser.add_argument(
+        "--mode",
+        default="link",
+        choices=["link", "copy", "move"],
+        help="How week-folder records are transferred (link falls back to copy across devices).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show what would happen without writing files.",
+    )
+    args = parser.parse_args()
+
+    shard_dirs = [Path(p) for p in args.shards]
+    missing = [str(p) for p in shard_dirs if not p.is_dir()]
+    if missing:
+        print(f"Shard directory not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    dest_dir = Path(args.into)
+    stats = merge_resources(dest_dir, shard_dirs, mode=args.mode, dry_run=args.dry_run)
+
+    print(f"Mode: {args.mode}{' (dry-run)' if args.dry_run else ''}")
+    print(f"Into: {dest_dir}")
+    print("---")
+    print(f"Index rows seen: {stats.rows_seen}")
+    print(f"Index rows inserted: {stats.rows_inserted}")
+    print(f"Index rows merged (DOI conflict): {stats.rows_conflicted}")
+    print(f"Dedupe signatures added: {stats.signatures_added}")
+    print(f"Topic labels merged: {stats.labels_merged}")
+    print(f"Records scanned: {stats.files_scanned}")
+    print(f"Linked: {stats.files_linked}")
+    print(f"Copied: {stats.files_copied}")
+    print(f"Moved: {stats.files_moved}")
+    print(f"Skipped (exists): {stats.files_skipped_exists}")
+
+
+if __name__ == "__main__":
+    main()
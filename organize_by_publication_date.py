@@ -3,11 +3,26 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import re
 import shutil
-from dataclasses import dataclass
+import sqlite3
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, fields
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import AbstractSet, Iterable, List, Optional, Set, Tuple
+
+# Linux FICLONE ioctl: share extents between files on btrfs/XFS (copy-on-write).
+FICLONE = 0x40049409
+JOURNAL_FILENAME = ".organize_journal.sqlite"
+HEAD_BYTES = 1024
+TAIL_BYTES = 16
+# Top-level (two-space indented) keys as written by ingest_openalex.py.
+HEAD_FIELD_RE = re.compile(rb'^  "(doi|publication_date)": ("(?:[^"\\\n]|\\.)*")', re.MULTILINE)
+
+JournalEntry = Tuple[str, int, int, Optional[str], Optional[int], Optional[int]]
 
 
 @dataclass
@@ -19,14 +34,26 @@ class Stats:
     skipped_invalid_pubdate: int = 0
     skipped_invalid_json: int = 0
     skipped_exists: int = 0
+    linked: int = 0
+    skipped_unchanged: int = 0
+
+    def merge(self, other: "Stats") -> None:
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
 
 
 def iter_json_files(root: Path) -> Iterable[Path]:
+    """Stream *.json files under root with os.scandir (no up-front directory listing)."""
     if not root.exists():
         return
-    for path in root.rglob("*.json"):
-        if path.is_file():
-            yield path
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".json") and entry.is_file():
+                    yield Path(entry.path)
 
 
 def sanitize_filename(value: str) -> str:
@@ -70,6 +97,251 @@ def load_json(path: Path) -> Optional[dict]:
         return None
 
 
+def read_head_fields(path: Path, head_bytes: int = HEAD_BYTES) -> Optional[dict]:
+    """Return doi and publication_date from the first bytes of an ingest-written record.
+
+    ingest_openalex writes records with indent=2 and doi/publication_date ahead
+    of the long abstract and nested primary_location, so both top-level keys
+    normally sit in the first few hundred bytes. Returns None when they are not
+    both found as complete strings there (other layouts, null dates that need
+    the later "published" key, very long titles), or when the file does not end
+    with the top-level closing brace (truncated writes), so the caller falls
+    back to a full parse.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            head = os.read(fd, head_bytes)
+            if len(head) < head_bytes:
+                tail = head
+            else:
+                os.lseek(fd, -TAIL_BYTES, os.SEEK_END)
+                tail = os.read(fd, TAIL_BYTES)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    # indent=2 puts the top-level "}" alone on the last line; nested ones are indented.
+    if not tail.rstrip().endswith(b"\n}"):
+        return None
+    fields: dict = {}
+    for match in HEAD_FIELD_RE.finditer(head):
+        key = match.group(1).decode("ascii")
+        if key in fields:
+            continue
+        raw = match.group(2)
+        fields[key] = json.loads(raw) if b"\\" in raw else raw[1:-1].decode("utf-8")
+        if len(fields) == 2:
+            break
+    if not fields.get("doi") or not fields.get("publication_date", "").strip():
+        return None
+    return fields
+
+
+def load_record_fields(path: Path) -> Optional[dict]:
+    """Return the fields needed for placement, parsing the whole file only when needed."""
+    return read_head_fields(path) or load_json(path)
+
+
+def try_reflink(src_path: Path, dst_path: Path) -> bool:
+    """Clone src into a new dst via FICLONE; False where the platform/filesystem can't."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    with src_path.open("rb") as src, dst_path.open("xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            ok = True
+        except OSError:
+            ok = False
+    if not ok:
+        dst_path.unlink()
+    return ok
+
+
+def copy_exclusive(src_path: Path, dst_path: Path) -> None:
+    """Copy src to dst (with metadata), failing with FileExistsError if dst exists."""
+    with src_path.open("rb") as src, dst_path.open("xb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    shutil.copystat(src_path, dst_path)
+
+
+def place_file(src_path: Path, dst_path: Path, mode: str) -> str:
+    """Put src at dst using mode copy/move/hard/reflink; return the stats field to bump.
+
+    Link modes fall back to a copy across devices or on filesystems without
+    link support. Raises FileExistsError if dst already exists.
+    """
+    if mode == "move":
+        if dst_path.exists():
+            raise FileExistsError(dst_path)
+        shutil.move(str(src_path), str(dst_path))
+        return "moved"
+    if mode == "hard":
+        try:
+            os.link(src_path, dst_path)
+            return "linked"
+        except FileExistsError:
+            raise
+        except OSError:
+            pass
+    if mode == "reflink" and try_reflink(src_path, dst_path):
+        return "linked"
+    copy_exclusive(src_path, dst_path)
+    return "copied"
+
+
+def organize_file(
+    src_path: Path,
+    output_root: Path,
+    group_by: str,
+    week_start_day: str,
+    mode: str,
+    dry_run: bool,
+    stats: Stats,
+    replace: AbstractSet[str] = frozenset(),
+) -> Optional[Path]:
+    """Organize one file; return its destination if it was placed or already there.
+
+    An existing destination is kept unless its path is in replace (outputs
+    that Journal.verify found changed), in which case it is placed again.
+    """
+    stats.scanned += 1
+    record = load_record_fields(src_path)
+    if record is None:
+        stats.skipped_invalid_json += 1
+        return None
+
+    pub_date = parse_publication_date(record)
+    if pub_date is None:
+        raw = (record.get("publication_date") or record.get("published") or "").strip()
+        if raw:
+            stats.skipped_invalid_pubdate += 1
+        else:
+            stats.skipped_missing_pubdate += 1
+        return None
+
+    subfolder = target_subfolder(pub_date, group_by, week_start_day)
+    target_dir = output_root / subfolder
+    dst_path = target_dir / target_filename(src_path, record)
+    if dst_path.exists():
+        if str(dst_path) not in replace:
+            stats.skipped_exists += 1
+            return dst_path
+        if not dry_run:
+            dst_path.unlink()
+
+    if dry_run:
+        action = {"move": "moved", "copy": "copied"}.get(mode, "linked")
+    else:
+        target_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            action = place_file(src_path, dst_path, mode)
+        except FileExistsError:
+            # Another worker placed a record with the same DOI first.
+            stats.skipped_exists += 1
+            return dst_path
+    setattr(stats, action, getattr(stats, action) + 1)
+    return dst_path
+
+
+class Journal:
+    """Processed-file journal: (path, size, mtime_ns, destination and its stat) from earlier runs.
+
+    Inputs whose size and mtime are unchanged since they were journaled are
+    skipped with a single stat. The journal is reset when the grouping
+    settings differ from those it was written with.
+    """
+
+    def __init__(self, path: Path, settings: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(journal)")}
+        if columns and "destination_mtime_ns" not in columns:
+            self.conn.execute("DROP TABLE journal")  # older journal: rebuilt by one full pass
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS journal (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                destination TEXT,
+                destination_size INTEGER,
+                destination_mtime_ns INTEGER
+            )
+            """
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'settings'").fetchone()
+        if row is None or row[0] != settings:
+            self.conn.execute("DELETE FROM journal")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('settings', ?)", (settings,))
+        self.conn.commit()
+
+    def is_unchanged(self, path: str, size: int, mtime_ns: int) -> bool:
+        row = self.conn.execute("SELECT size, mtime_ns FROM journal WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def record_many(self, entries: List[JournalEntry]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO journal "
+                "(path, size, mtime_ns, destination, destination_size, destination_mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                entries,
+            )
+
+    def verify(self) -> List[str]:
+        """Drop entries whose destination is missing or changed; return those destinations.
+
+        A destination counts as changed when its size or mtime_ns differs from
+        the journal, so same-size edits are caught too. Pass the result to
+        organize(replace=...) so changed outputs are overwritten.
+        """
+        stale: List[Tuple[str, str]] = []
+        for path, destination, destination_size, destination_mtime_ns in self.conn.execute(
+            "SELECT path, destination, destination_size, destination_mtime_ns FROM journal "
+            "WHERE destination IS NOT NULL"
+        ):
+            try:
+                st = os.stat(destination)
+                if st.st_size == destination_size and st.st_mtime_ns == destination_mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+            stale.append((path, destination))
+        with self.conn:
+            self.conn.executemany("DELETE FROM journal WHERE path = ?", [(p,) for p, _ in stale])
+        return [d for _, d in stale]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def organize_batch(
+    items: List[Tuple[str, int, int]],
+    output_root: str,
+    group_by: str,
+    week_start_day: str,
+    mode: str,
+    dry_run: bool,
+    replace: AbstractSet[str] = frozenset(),
+) -> Tuple[Stats, List[JournalEntry]]:
+    """Organize a batch of (path, size, mtime_ns) items; return Stats and journal entries."""
+    stats = Stats()
+    entries: List[JournalEntry] = []
+    root = Path(output_root)
+    for path, size, mtime_ns in items:
+        dst_path = organize_file(Path(path), root, group_by, week_start_day, mode, dry_run, stats, replace)
+        if dst_path is None or dry_run:
+            entries.append((path, size, mtime_ns, None, None, None))
+        else:
+            dst_stat = dst_path.stat()
+            entries.append((path, size, mtime_ns, str(dst_path), dst_stat.st_size, dst_stat.st_mtime_ns))
+    return stats, entries
+
+
 def organize(
     input_root: Path,
     output_root: Path,
@@ -77,42 +349,70 @@ def organize(
     week_start_day: str,
     move: bool,
     dry_run: bool,
+    link: Optional[str] = None,
+    workers: int = 1,
+    batch_size: int = 256,
+    journal: Optional[Journal] = None,
+    replace: AbstractSet[str] = frozenset(),
 ) -> Stats:
+    """Organize input_root into output_root; destinations in replace are placed again."""
+    mode = "move" if move else (link or "copy")
     stats = Stats()
-    for src_path in iter_json_files(input_root):
-        stats.scanned += 1
-        record = load_json(src_path)
-        if record is None:
-            stats.skipped_invalid_json += 1
-            continue
+    # Moved inputs disappear, so there is nothing to skip on the next run.
+    use_journal = journal is not None and not dry_run and mode != "move"
 
-        pub_date = parse_publication_date(record)
-        if pub_date is None:
-            raw = (record.get("publication_date") or record.get("published") or "").strip()
-            if raw:
-                stats.skipped_invalid_pubdate += 1
-            else:
-                stats.skipped_missing_pubdate += 1
-            continue
+    def iter_items() -> Iterable[Tuple[str, int, int]]:
+        for src_path in iter_json_files(input_root):
+            path = os.path.abspath(src_path)
+            if not use_journal:
+                yield path, 0, 0
+                continue
+            st = os.stat(path)
+            if journal.is_unchanged(path, st.st_size, st.st_mtime_ns):
+                stats.scanned += 1
+                stats.skipped_unchanged += 1
+                continue
+            yield path, st.st_size, st.st_mtime_ns
 
-        subfolder = target_subfolder(pub_date, group_by, week_start_day)
-        target_dir = output_root / subfolder
-        dst_path = target_dir / target_filename(src_path, record)
-        if dst_path.exists():
-            stats.skipped_exists += 1
-            continue
+    def collect(result: Tuple[Stats, List[JournalEntry]]) -> None:
+        batch_stats, entries = result
+        stats.merge(batch_stats)
+        if use_journal:
+            journal.record_many(entries)
 
-        if not dry_run:
-            target_dir.mkdir(parents=True, exist_ok=True)
-            if move:
-                shutil.move(str(src_path), str(dst_path))
-            else:
-                shutil.copy2(src_path, dst_path)
+    args = (os.path.abspath(output_root), group_by, week_start_day, mode, dry_run, frozenset(replace))
+    if workers <= 1:
+        batch: List[Tuple[str, int, int]] = []
+        for item in iter_items():
+            batch.append(item)
+            if len(batch) >= batch_size:
+                collect(organize_batch(batch, *args))
+                batch = []
+        if batch:
+            collect(organize_batch(batch, *args))
+        return stats
 
-        if move:
-            stats.moved += 1
-        else:
-            stats.copied += 1
+    # Stream batches of scandir results to the pool, keeping only a bounded
+    # number in flight so memory stays flat on very large trees.
+    max_pending = workers * 4
+    pending: Set[Future] = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batch = []
+        for item in iter_items():
+            batch.append(item)
+            if len(batch) < batch_size:
+                continue
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+            pending.add(pool.submit(organize_batch, batch, *args))
+            batch = []
+        if batch:
+            pending.add(pool.submit(organize_batch, batch, *args))
+        done, _ = wait(pending)
+        for future in done:
+            collect(future.result())
     return stats
 
 
@@ -141,16 +441,44 @@ def main() -> None:
         choices=["monday", "sunday"],
         help="Week convention used for week folder naming.",
     )
-    parser.add_argument(
+    transfer = parser.add_mutually_exclusive_group()
+    transfer.add_argument(
         "--move",
         action="store_true",
         help="Move files instead of copying them.",
     )
+    transfer.add_argument(
+        "--link",
+        nargs="?",
+        const="hard",
+        choices=["hard", "reflink"],
+        help="Link instead of copying: hardlinks (default) or reflinks; falls back to copy when unsupported.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for parsing and placing files (default: 1).",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Show what would happen without writing files.",
     )
+    parser.add_argument(
+        "--journal",
+        help=f"Processed-file journal path (default: <output-root>/{JOURNAL_FILENAME}).",
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="Re-parse every input instead of skipping files unchanged since the last run.",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Before organizing, re-check journaled destinations and redo inputs whose output was deleted or changed.",
+    )
     args = parser.parse_args()
 
     input_root = Path(args.input_root)
@@ -164,6 +492,15 @@ def main() -> None:
     if not input_root.exists():
         raise FileNotFoundError(f"Input root not found: {input_root}")
 
+    journal = None
+    if not args.no_journal:
+        journal_path = Path(args.journal) if args.journal else output_root / JOURNAL_FILENAME
+        journal = Journal(journal_path, f"{args.group_by}|{args.week_start_day}|{output_root.resolve()}")
+
+    stale: List[str] = []
+    if journal is not None and args.verify:
+        stale = journal.verify()
+
     started = datetime.now().isoformat()
     stats = organize(
         input_root=input_root,
@@ -172,9 +509,20 @@ def main() -> None:
         week_start_day=args.week_start_day,
         move=args.move,
         dry_run=args.dry_run,
+        link=args.link,
+        workers=args.workers,
+        journal=journal,
+        replace=set(stale),
     )
+    if journal is not None:
+        journal.close()
 
-    mode = "move" if args.move else "copy"
+    if args.move:
+        mode = "move"
+    elif args.link:
+        mode = "hardlink" if args.link == "hard" else "reflink"
+    else:
+        mode = "copy"
     print(f"Started: {started}")
     print(f"Mode: {mode}{' (dry-run)' if args.dry_run else ''}")
     print(f"Grouping: {args.group_by}")
@@ -184,10 +532,16 @@ def main() -> None:
     print(f"Scanned: {stats.scanned}")
     print(f"Copied: {stats.copied}")
     print(f"Moved: {stats.moved}")
+    print(f"Linked: {stats.linked}")
     print(f"Skipped (exists): {stats.skipped_exists}")
+    print(f"Skipped (unchanged since last run): {stats.skipped_unchanged}")
     print(f"Skipped (missing pub date): {stats.skipped_missing_pubdate}")
     print(f"Skipped (invalid pub date): {stats.skipped_invalid_pubdate}")
     print(f"Skipped (invalid json): {stats.skipped_invalid_json}")
+    if args.verify:
+        print(f"Verify: {len(stale)} journaled destination(s) missing or changed")
+        for destination in stale[:20]:
+            print(f"  {destination}")
 
 
 if __name__ == "__main__":
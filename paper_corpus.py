@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Read week folders of paper records and their cached payload entries.
+
+Shared by generate_report.py and the modules that load papers from
+resource/by_publication_week (embedding, labelling, retrieval, relevance,
+dedupe, abstract compression).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+
+from ingest_openalex import write_text_atomic
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON decoding for load_papers
+    orjson = None
+
+# Bump when the payload line format or cached entry fields change.
+PAYLOAD_CACHE_VERSION = 2
+PAYLOAD_CACHE_SUFFIX = ".payload.cache"
+
+# File reads release the GIL, so a thread pool overlaps cold-cache I/O across week folders.
+LOAD_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def load_env_file(path: Path) -> None:
+    """Load key=value pairs from a .env file into os.environ."""
+    if not path.exists():
+        return
+    for line in path.read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+        key, value = stripped.split("=", 1)
+        key = key.strip()
+        value = value.strip().strip("\"' ")
+        if key and key not in os.environ:
+            os.environ[key] = value
+
+
+def load_topic_registry(path: Path) -> list[str]:
+    """Return saved topic names from topic_registry.json, or [] if absent/corrupt."""
+    if not path.exists():
+        return []
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data.get("topics") or []
+    except Exception:
+        return []
+
+
+def load_weeks(weeks_dir: Path, n: int) -> list[Path]:
+    """Return week directories whose start date falls within the last n weeks."""
+    if not weeks_dir.exists():
+        return []
+    cutoff = (date.today() - timedelta(weeks=n)).isoformat()
+    dirs = sorted(
+        d for d in weeks_dir.iterdir()
+        if d.is_dir() and d.name >= cutoff
+    )
+    return dirs
+
+
+def read_paper(path: Path) -> dict | None:
+    """Decode one record file; return None when it has no abstract."""
+    with open(path, "rb") as f:
+        data = f.read()
+    paper = orjson.loads(data) if orjson is not None else json.loads(data)
+    if (paper.get("abstract") or "").strip():
+        return paper
+    return None
+
+
+def cap_weeks(
+    week_papers: list[list[dict]],
+    cap_multiplier: float = 3.0,
+    cap_count: int = 500,
+    relevance: Callable[[list[dict]], dict[str, float]] | None = None,
+) -> list[dict]:
+    """Flatten per-week paper lists, capping anomalous weeks by citation rank.
+
+    With a relevance scorer (DOI → score, see relevance.py) every paper gets a
+    "relevance" field and capped weeks keep the most relevant papers first,
+    citations breaking ties.
+    """
+    if relevance is not None:
+        scores = relevance([p for papers in week_papers for p in papers])
+        for papers in week_papers:
+            for p in papers:
+                p["relevance"] = scores.get(p.get("doi") or "", 0.0)
+    counts = [len(w) for w in week_papers]
+    # Use the lower median (median of the lower half) so anomalous weeks don't
+    # inflate the reference baseline. For small lists this equates to min().
+    sorted_counts = sorted(counts)
+    lower_half = sorted_counts[: max(1, len(sorted_counts) // 2)]
+    baseline = statistics.median(lower_half) if len(counts) >= 2 else float("inf")
+    threshold = baseline * cap_multiplier
+
+    result: list[dict] = []
+    for papers in week_papers:
+        if len(papers) > threshold:
+            papers = sorted(
+                papers,
+                key=lambda p: (p.get("relevance") or 0.0, p.get("cited_by_count") or 0),
+                reverse=True,
+            )[:cap_count]
+        result.extend(papers)
+    return result
+
+
+def load_week_papers(week_dir: Path) -> list[dict]:
+    """Load the papers with abstracts from one week folder, in file-name order."""
+    papers = []
+    for p in sorted(week_dir.glob("*.json")):
+        paper = read_paper(p)
+        if paper is not None:
+            papers.append(paper)
+    return papers
+
+
+def load_papers(
+    week_dirs: list[Path],
+    cap_multiplier: float = 3.0,
+    cap_count: int = 500,
+    workers: int | None = None,
+    relevance: Callable[[list[dict]], dict[str, float]] | None = None,
+) -> list[dict]:
+    """Load all papers from week dirs; cap anomalous weeks by relevance, then citation rank.
+
+    Week folders are read concurrently on a thread pool (``workers``, default
+    LOAD_WORKERS) and decoded with orjson when installed; week and file order
+    are unchanged.
+    """
+    workers = LOAD_WORKERS if workers is None else workers
+    if workers > 1 and len(week_dirs) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(week_dirs))) as pool:
+            week_papers = list(pool.map(load_week_papers, week_dirs))
+    else:
+        week_papers = [load_week_papers(d) for d in week_dirs]
+    return cap_weeks(week_papers, cap_multiplier, cap_count, relevance)
+
+
+def truncate_abstract(abstract: str, max_words: int = 300) -> str:
+    """Return first max_words words of abstract, with ellipsis if truncated."""
+    words = abstract.split()
+    if len(words) <= max_words:
+        return abstract
+    return " ".join(words[:max_words]) + "..."
+
+
+def payload_line(p: dict, max_words: int = 300) -> str:
+    """Format one paper as a pipe-delimited payload line."""
+    title = (p.get("title") or "").replace("|", "/")
+    venue = p.get("venue_id") or "unknown"
+    week = (p.get("published") or "")[:7]  # YYYY-MM
+    citations = p.get("cited_by_count") or 0
+    abstract = truncate_abstract(
+        (p.get("abstract") or "").replace("|", "/"), max_words
+    )
+    return f"{title} | {venue} | {week} | {citations} | {abstract}"
+
+
+def build_payload(papers: list[dict], max_words: int = 300) -> str:
+    """Build compact pipe-delimited payload for the LLM prompt."""
+    return "\n".join(payload_line(p, max_words) for p in papers)
+
+
+def week_cache_path(week_dir: Path) -> Path:
+    """Cache file stored next to the week folder: <week>.payload.cache."""
+    return week_dir.with_name(week_dir.name + PAYLOAD_CACHE_SUFFIX)
+
+
+def week_fingerprint(week_dir: Path, max_words: int) -> tuple[str, list[str]]:
+    """Return (cache key, sorted JSON file names) for a week folder.
+
+    The key covers every file's name, size and mtime plus the truncation
+    settings, so adding, editing or removing a record invalidates the week.
+    """
+    files = []
+    with os.scandir(week_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                st = entry.stat()
+                files.append((entry.name, st.st_size, st.st_mtime_ns))
+    files.sort()
+    digest = hashlib.sha256(f"v{PAYLOAD_CACHE_VERSION}|words={max_words}".encode("utf-8"))
+    for name, size, mtime_ns in files:
+        digest.update(f"\n{name}|{size}|{mtime_ns}".encode("utf-8"))
+    return digest.hexdigest(), [name for name, _, _ in files]
+
+
+def payload_entry(paper: dict, file_name: str, max_words: int = 300) -> dict:
+    """Light per-paper fields kept in the week cache, plus the full abstract and its payload line."""
+    return {
+        "file": file_name,
+        "doi": paper.get("doi") or "",
+        "title": paper.get("title") or "",
+        "venue_id": paper.get("venue_id") or "",
+        "published": paper.get("published") or "",
+        "cited_by_count": paper.get("cited_by_count") or 0,
+        "abstract": paper.get("abstract") or "",
+        "line": payload_line(paper, max_words),
+    }
+
+
+def load_week_entries(week_dir: Path, max_words: int = 300, use_cache: bool = True) -> list[dict]:
+    """Return payload entries for one week, reusing <week>.payload.cache when still valid."""
+    key, names = week_fingerprint(week_dir, max_words)
+    cache_path = week_cache_path(week_dir)
+    if use_cache and cache_path.exists():
+        try:
+            raw = cache_path.read_bytes()
+            cached = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            if cached.get("key") == key:
+                return cached["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    entries = []
+    for name in names:
+        paper = read_paper(week_dir / name)
+        if paper is not None:
+            entries.append(payload_entry(paper, name, max_words))
+    if use_cache:
+        try:
+            write_text_atomic(
+                cache_path,
+                json.dumps({"version": PAYLOAD_CACHE_VERSION, "key": key, "entries": entries}, ensure_ascii=False),
+            )
+        except OSError:
+            pass  # read-only resource dir: the cache is only an optimisation
+    return entries
+
+
+def load_payload_entries(
+    week_dirs: list[Path],
+    cap_multiplier: float = 3.0,
+    cap_count: int = 500,
+    max_words: int = 300,
+    workers: int | None = None,
+    use_cache: bool = True,
+    relevance: Callable[[list[dict]], dict[str, float]] | None = None,
+) -> list[dict]:
+    """Like load_papers, but returns cached payload entries instead of full records."""
+    week_entries = load_week_entry_lists(week_dirs, max_words, workers, use_cache)
+    return cap_weeks(week_entries, cap_multiplier, cap_count, relevance)
+
+
+def load_week_entry_lists(
+    week_dirs: list[Path],
+    max_words: int = 300,
+    workers: int | None = None,
+    use_cache: bool = True,
+) -> list[list[dict]]:
+    """Uncapped payload entries per week folder, each tagged with its "week"."""
+    workers = LOAD_WORKERS if workers is None else workers
+
+    def load(week_dir: Path) -> list[dict]:
+        entries = load_week_entries(week_dir, max_words, use_cache)
+        for entry in entries:
+            entry["week"] = week_dir.name
+        return entries
+
+    if workers > 1 and len(week_dirs) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(week_dirs))) as pool:
+            return list(pool.map(load, week_dirs))
+    return [load(d) for d in week_dirs]
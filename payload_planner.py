@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Fit the report payload into a prompt token budget.
+
+Tokens are estimated locally (no tokenizer download or API call). When the
+payload is too large, abstracts are shortened in stages first; papers are
+dropped by priority only once the shortest stage still does not fit.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+from itertools import accumulate
+
+# Abstract word limits tried in order before any paper is dropped.
+ABSTRACT_STAGES = (300, 200, 120, 60, 30)
+
+# Each extra paper from an already-selected venue has its priority divided by
+# (1 + VENUE_REPEAT_PENALTY * ln(1 + papers_selected_from_that_venue)).
+VENUE_REPEAT_PENALTY = 0.25
+# Weight of the normalized personal relevance score against citations (0.7) + recency (0.3).
+RELEVANCE_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: ~4 letters per token, digits in triples, 1 per symbol."""
+    total = 0
+    for piece in _TOKEN_RE.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            total += max(1, math.ceil(len(piece) / 4))
+        elif first.isdigit():
+            total += max(1, math.ceil(len(piece) / 3))
+        else:
+            total += 1
+    return total
+
+
+@lru_cache(maxsize=200_000)
+def word_tokens(word: str) -> int:
+    return estimate_tokens(word)
+
+
+def line_profile(line: str) -> tuple[int, list[int]]:
+    """Return (prefix tokens, cumulative abstract-word tokens) for a payload line.
+
+    estimate_tokens is additive over whitespace-separated words, so the cost of
+    any abstract stage is read off the prefix sums without re-tokenizing.
+    """
+    prefix, abstract = split_line(line)
+    cumulative = list(accumulate(map(word_tokens, abstract.split()), initial=0))
+    return estimate_tokens(prefix) + (1 if abstract else 0), cumulative  # " | " separator
+
+
+def staged_tokens(profile: tuple[int, list[int]], max_words: int) -> int:
+    """Estimated tokens of shorten_line(line, max_words) from its line_profile."""
+    prefix_tokens, cumulative = profile
+    n_words = len(cumulative) - 1
+    if n_words <= max_words:
+        return prefix_tokens + cumulative[-1]
+    return prefix_tokens + cumulative[max_words] + 3  # "..."
+
+
+def split_line(line: str) -> tuple[str, str]:
+    """Split a payload line into its metadata prefix and abstract field."""
+    parts = line.split(" | ", 4)
+    if len(parts) < 5:
+        return line, ""
+    return " | ".join(parts[:4]), parts[4]
+
+
+def shorten_line(line: str, max_words: int) -> str:
+    """Re-truncate the abstract field of a payload line to max_words words."""
+    prefix, abstract = split_line(line)
+    words = abstract.split()
+    if len(words) <= max_words:
+        return line
+    return f"{prefix} | {' '.join(words[:max_words])}..."
+
+
+def priority_scores(entries: list[dict], today: date | None = None) -> list[float]:
+    """Score papers by citations (log-scaled) and recency, both normalized to [0, 1].
+
+    Entries carrying a "relevance" score (relevance.py) add it, normalized by
+    the largest absolute score and weighted by RELEVANCE_WEIGHT.
+    """
+    today = today or date.today()
+    citations = [math.log1p(max(0, e.get("cited_by_count") or 0)) for e in entries]
+    ages = []
+    for e in entries:
+        try:
+            ages.append((today - date.fromisoformat((e.get("published") or "")[:10])).days)
+        except ValueError:
+            ages.append(None)
+    known = [a for a in ages if a is not None]
+    min_age = min(known) if known else 0
+    age_span = (max(known) - min_age) if known else 0
+    max_cit = max(citations) if citations else 0.0
+
+    scores = []
+    for cit, age in zip(citations, ages):
+        cit_score = cit / max_cit if max_cit else 0.0
+        if age is None or not age_span:
+            recency = 0.5
+        else:
+            recency = 1.0 - (age - min_age) / age_span
+        scores.append(0.7 * cit_score + 0.3 * recency)
+
+    relevance = [e.get("relevance") or 0.0 for e in entries]
+    max_rel = max((abs(r) for r in relevance), default=0.0)
+    if max_rel:
+        # Clamped at 0 so the venue penalty (a division) cannot lift demoted papers.
+        scores = [max(0.0, s + RELEVANCE_WEIGHT * r / max_rel) for s, r in zip(scores, relevance)]
+    return scores
+
+
+def select_by_priority(
+    entries: list[dict],
+    line_tokens: list[int],
+    budget: int,
+    today: date | None = None,
+) -> list[int]:
+    """Greedy pick of entry indices that fit budget, spreading picks across venues."""
+    scores = priority_scores(entries, today)
+    # The venue penalty is shared by all of a venue's papers, so each venue keeps
+    # its own heap by base score and each pick compares only the venue heads.
+    queues: dict[str, list[tuple[float, int]]] = {}
+    for i, entry in enumerate(entries):
+        queues.setdefault(entry.get("venue_id") or "", []).append((-scores[i], i))
+    for queue in queues.values():
+        heapq.heapify(queue)
+    picked = {venue: 0 for venue in queues}
+
+    chosen: list[int] = []
+    used = 0
+    cheapest = min(line_tokens, default=0) + 1
+    while queues and budget - used >= cheapest:
+        venue = max(
+            queues,
+            key=lambda v: (-queues[v][0][0] / (1 + VENUE_REPEAT_PENALTY * math.log1p(picked[v])), -queues[v][0][1]),
+        )
+        _, i = heapq.heappop(queues[venue])
+        if not queues[venue]:
+            del queues[venue]
+        cost = line_tokens[i] + 1  # newline
+        if used + cost > budget:
+            continue
+        chosen.append(i)
+        used += cost
+        picked[venue] += 1
+    return sorted(chosen)
+
+
+@dataclass
+class PayloadPlan:
+    lines: list[str]
+    abstract_words: int
+    prompt_tokens: int
+    paper_tokens: int
+    budget: int
+    dropped: int = 0
+    stage_tokens: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.paper_tokens
+
+    def describe(self) -> str:
+        kept = len(self.lines)
+        budget = f"{self.budget:,}" if self.budget else "unlimited"
+        summary = (
+            f"  Token estimate: prompt {self.prompt_tokens:,} + papers {self.paper_tokens:,} "
+            f"= {self.total_tokens:,} (budget {budget})\n"
+            f"  Papers: {kept} kept, {self.dropped} dropped; abstracts ≤ {self.abstract_words} words"
+        )
+        if len(self.stage_tokens) > 1:
+            tried = ", ".join(f"{words}w→{tokens:,}" for words, tokens in self.stage_tokens.items())
+            summary += f"\n  Abstract stages tried: {tried}"
+        return summary
+
+
+def plan_payload(
+    entries: list[dict],
+    budget: int,
+    prompt_tokens: int,
+    stages: tuple[int, ...] = ABSTRACT_STAGES,
+    today: date | None = None,
+) -> PayloadPlan:
+    """Return the largest payload that fits budget (0 = unlimited) after prompt_tokens.
+
+    Abstract lengths shrink through stages (stages above the cached truncation
+    length are no-ops); if the shortest stage still overflows, the
+    lowest-priority papers are dropped.
+    """
+    lines = [e["line"] for e in entries]
+    available = budget - prompt_tokens if budget else 0
+    profiles = [line_profile(line) for line in lines]
+    stage_tokens: dict[int, int] = {}
+    for words in stages:
+        tokens = [staged_tokens(profile, words) + 1 for profile in profiles]  # + newline
+        stage_tokens[words] = sum(tokens)
+        if not budget or sum(tokens) <= available:
+            staged = [shorten_line(line, words) for line in lines]
+            return PayloadPlan(staged, words, prompt_tokens, sum(tokens), budget, 0, stage_tokens)
+
+    keep = select_by_priority(entries, [t - 1 for t in tokens], max(0, available), today)
+    kept_lines = [shorten_line(lines[i], stages[-1]) for i in keep]
+    return PayloadPlan(
+        kept_lines,
+        stages[-1],
+        prompt_tokens,
+        sum(tokens[i] for i in keep),
+        budget,
+        len(entries) - len(keep),
+        stage_tokens,
+    )
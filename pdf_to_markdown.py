@@ -18,6 +18,8 @@ from typing import Any
 
 from pypdf import PdfReader, PdfWriter
 
+from llm_cache import DEFAULT_CACHE_DIR, LLMCache
+
 PROMPT = "<image>\n<|grounding|>Convert the document to markdown."
 DEFAULT_OUTPUT_ROOT = "resource/pdf_markdown"
 DEFAULT_BASE_URL = "https://api.siliconflow.cn/v1"
@@ -38,6 +40,7 @@ class Config:
     base_url: str
     model: str
     api_key: str
+    use_cache: bool = True
 
 
 def now_iso() -> str:
@@ -107,6 +110,11 @@ def parse_args() -> argparse.Namespace:
         "--base-url",
         help=f"SiliconFlow base URL (default: {DEFAULT_BASE_URL}).",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Always call the OCR API instead of reusing cached chunk responses (LLM_CACHE_DIR, default: {DEFAULT_CACHE_DIR}).",
+    )
     return parser.parse_args()
 
 
@@ -173,6 +181,7 @@ def resolve_config(args: argparse.Namespace) -> Config:
         base_url=base_url,
         model=model,
         api_key=api_key,
+        use_cache=not getattr(args, "no_cache", False),
     )
 
 
@@ -448,34 +457,42 @@ def call_ocr_once(
     model: str,
     timeout_seconds: float,
     chunk_pdf: Path,
+    cache: LLMCache | None = None,
 ) -> str:
     b64 = base64.b64encode(chunk_pdf.read_bytes()).decode("utf-8")
-    response = client.chat.completions.create(
-        model=model,
-        temperature=0,
-        timeout=timeout_seconds,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:application/pdf;base64,{b64}",
-                        },
-                    },
-                    {
-                        "type": "text",
-                        "text": PROMPT,
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:application/pdf;base64,{b64}",
                     },
-                ],
-            }
-        ],
-    )
-    content = response.choices[0].message.content
-    if content is None:
-        raise RuntimeError("OCR response contained no content.")
-    return normalize_newlines(content)
+                },
+                {
+                    "type": "text",
+                    "text": PROMPT,
+                },
+            ],
+        }
+    ]
+
+    def create() -> str:
+        response = client.chat.completions.create(
+            model=model,
+            temperature=0,
+            timeout=timeout_seconds,
+            messages=messages,
+        )
+        content = response.choices[0].message.content
+        if content is None:
+            raise RuntimeError("OCR response contained no content.")
+        return normalize_newlines(content)
+
+    if cache is None:
+        return create()
+    return cache.get_or_create(model, messages, create, temperature=0)
 
 
 def call_ocr_with_retries(
@@ -485,6 +502,7 @@ def call_ocr_with_retries(
     timeout_seconds: float,
     chunk_pdf: Path,
     max_retries: int,
+    cache: LLMCache | None = None,
 ) -> tuple[str | None, int, str | None, str | None]:
     """Return (content, attempts, error_type, error_message)."""
     attempts = 0
@@ -497,6 +515,7 @@ def call_ocr_with_retries(
                 model=model,
                 timeout_seconds=timeout_seconds,
                 chunk_pdf=chunk_pdf,
+                cache=cache,
             )
             return content, attempts, None, None
         except Exception as exc:  # pragma: no cover - exercised via tests with fake client
@@ -655,6 +674,7 @@ def process(config: Config) -> int:
         save_manifest(manifest_path, manifest)
 
     client = build_client(api_key=config.api_key, base_url=config.base_url)
+    cache = LLMCache() if config.use_cache else None
     chunk_lookup = get_chunk_lookup(manifest)
     queue = queue_for_resume(manifest, chunks_md_dir)
 
@@ -684,6 +704,7 @@ def process(config: Config) -> int:
             timeout_seconds=config.timeout_seconds,
             chunk_pdf=pdf_path,
             max_retries=config.max_retries,
+            cache=cache,
         )
         chunk["attempts"] = int(chunk.get("attempts", 0)) + attempts
         chunk["duration_sec"] = round(time.monotonic() - begin, 3)
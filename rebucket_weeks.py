@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from ingest_openalex import parse_iso_date, sanitize_filename, week_start_for
+
+
+@dataclass
+class RebucketStats:
+    planned: int = 0
+    moved: int = 0
+    missing: int = 0
+    conflicts: int = 0
+    undated: int = 0
+
+
+def plan_moves(
+    db_path: Path,
+    from_day: str,
+    to_day: str,
+    stats: RebucketStats,
+) -> Iterator[Tuple[str, str]]:
+    """Yield (old, new) week-relative paths for every indexed paper whose week changes.
+
+    Week folders are derived from index.sqlite `published` dates, so no record
+    file is opened. Papers with unparseable dates were filed by ingest day and
+    cannot be located from the index; they are counted as undated.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        for doi, published in conn.execute("SELECT doi, published FROM papers"):
+            day = parse_iso_date(published)
+            if day is None:
+                stats.undated += 1
+                continue
+            old_week = week_start_for(day, from_day).isoformat()
+            new_week = week_start_for(day, to_day).isoformat()
+            if old_week == new_week:
+                continue
+            filename = f"{sanitize_filename(doi)}.json"
+            stats.planned += 1
+            yield f"{old_week}/{filename}", f"{new_week}/{filename}"
+    finally:
+        conn.close()
+
+
+def apply_moves(
+    weeks_dir: Path,
+    moves: Iterator[Tuple[str, str]],
+    manifest_path: Optional[Path],
+    stats: RebucketStats,
+    dry_run: bool = False,
+) -> None:
+    """Rename files for each planned move, logging completed ones to a JSONL manifest."""
+    made_dirs: set = set()
+    manifest = None
+    if manifest_path is not None and not dry_run:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = manifest_path.open("a", encoding="utf-8")
+    try:
+        for old_rel, new_rel in moves:
+            src = weeks_dir / old_rel
+            dst = weeks_dir / new_rel
+            if dry_run:
+                if src.exists():
+                    stats.moved += 1
+                else:
+                    stats.missing += 1
+                continue
+            if dst.exists():
+                stats.conflicts += 1
+                continue
+            if dst.parent not in made_dirs:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                made_dirs.add(dst.parent)
+            try:
+                os.rename(src, dst)
+            except FileNotFoundError:
+                # Indexed without an abstract (never written) or already moved.
+                stats.missing += 1
+                continue
+            stats.moved += 1
+            if manifest is not None:
+                manifest.write(json.dumps({"src": old_rel, "dst": new_rel}) + "\n")
+                if stats.moved % 1000 == 0:
+                    manifest.flush()
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+
+def remove_empty_week_dirs(weeks_dir: Path) -> int:
+    removed = 0
+    if not weeks_dir.exists():
+        return 0
+    for week in weeks_dir.iterdir():
+        if week.is_dir():
+            try:
+                week.rmdir()
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def read_manifest(manifest_path: Path) -> Tuple[dict, List[Tuple[str, str]]]:
+    header: dict = {}
+    moves: List[Tuple[str, str]] = []
+    for line in manifest_path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if "src" in entry:
+            moves.append((entry["src"], entry["dst"]))
+        else:
+            header = entry
+    return header, moves
+
+
+def rebucket(
+    resource_dir: Path,
+    from_day: str,
+    to_day: str,
+    manifest_path: Optional[Path],
+    dry_run: bool = False,
+) -> RebucketStats:
+    stats = RebucketStats()
+    weeks_dir = resource_dir / "by_publication_week"
+    if manifest_path is not None and not dry_run:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        header = {
+            "weeks_dir": str(weeks_dir),
+            "from": from_day,
+            "to": to_day,
+            "created": datetime.now().isoformat(),
+        }
+        manifest_path.write_text(json.dumps(header) + "\n", encoding="utf-8")
+    moves = plan_moves(resource_dir / "index.sqlite", from_day, to_day, stats)
+    apply_moves(weeks_dir, moves, manifest_path, stats, dry_run=dry_run)
+    if not dry_run:
+        remove_empty_week_dirs(weeks_dir)
+    return stats
+
+
+def rollback(resource_dir: Path, manifest_path: Path) -> RebucketStats:
+    """Undo a rebucket run by replaying its manifest in reverse."""
+    stats = RebucketStats()
+    _, moves = read_manifest(manifest_path)
+    reverse = ((new_rel, old_rel) for old_rel, new_rel in reversed(moves))
+    stats.planned = len(moves)
+    weeks_dir = resource_dir / "by_publication_week"
+    apply_moves(weeks_dir, reverse, None, stats)
+    remove_empty_week_dirs(weeks_dir)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-bucket by_publication_week folders to another week convention using index.sqlite."
+    )
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument(
+        "--from",
+        dest="from_day",
+        default="monday",
+        choices=["monday", "sunday"],
+        help="Week convention the folders currently use.",
+    )
+    parser.add_argument("--to", dest="to_day", choices=["monday", "sunday"], help="Target week convention.")
+    parser.add_argument("--manifest", help="Manifest path (default: resource/rebucket-<timestamp>.jsonl).")
+    parser.add_argument("--rollback", help="Undo the moves recorded in this manifest.")
+    parser.add_argument("--dry-run", action="store_true", help="Count moves without renaming files.")
+    args = parser.parse_args()
+
+    resource_dir = Path(args.resource_dir)
+
+    if args.rollback:
+        stats = rollback(resource_dir, Path(args.rollback))
+        print(f"Rolled back: {stats.moved} of {stats.planned} moves")
+        if stats.missing or stats.conflicts:
+            print(f"Not restored: {stats.missing} missing, {stats.conflicts} conflicts", file=sys.stderr)
+        return
+
+    if not args.to_day:
+        parser.error("--to is required unless --rollback is given")
+    if args.to_day == args.from_day:
+        print("Nothing to do: --from and --to are the same convention.")
+        return
+    if not (resource_dir / "index.sqlite").exists():
+        print(f"Missing index: {resource_dir / 'index.sqlite'}", file=sys.stderr)
+        sys.exit(1)
+
+    manifest_path = None
+    if not args.dry_run:
+        manifest_path = Path(args.manifest) if args.manifest else (
+            resource_dir / f"rebucket-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl"
+        )
+    stats = rebucket(resource_dir, args.from_day, args.to_day, manifest_path, dry_run=args.dry_run)
+
+    print(f"Re-bucket: {args.from_day} → {args.to_day}{' (dry-run)' if args.dry_run else ''}")
+    print(f"Planned: {stats.planned}")
+    print(f"Moved: {stats.moved}")
+    print(f"Skipped (not on disk): {stats.missing}")
+    print(f"Skipped (destination exists): {stats.conflicts}")
+    print(f"Skipped (no publication date in index): {stats.undated}")
+    if manifest_path is not None:
+        print(f"Manifest: {manifest_path} (undo with --rollback {manifest_path})")
+        print(f"Remember to run ingest_openalex.py with --week-start-day {args.to_day} from now on.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Personal relevance scores from a weighted keyword list.
+
+Keyword file format, one concept per line (blank lines and # comments ignored):
+
+    3: beam codebook | codebook design | beamforming codebook
+    2: uav | unmanned aerial vehicle | drone
+    -1: optical fiber
+
+The number is the concept weight (default 1, negative to demote); the phrases
+after it are synonyms. All phrases are compiled into one word-level
+Aho-Corasick automaton, so each paper is scored in a single pass over its
+title and abstract. Scores are cached in index.sqlite per (keyword-set hash,
+DOI) together with a hash of the scored text, so a weekly run only scores
+papers it has not seen with this list, and a paper whose title or abstract
+changed (or was scored from a truncated payload line) is scored again.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from aho_corasick import AhoCorasick
+from paper_corpus import load_payload_entries, load_weeks
+
+SCORER_VERSION = 1
+# A concept in the title counts as much as this many abstract mentions.
+TITLE_WEIGHT = 2.0
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_words(text: str) -> list[str]:
+    """Lowercase word tokens with a light plural fold (beams → beam, but not mass → mas)."""
+    words = WORD_RE.findall(text.lower())
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+
+
+@dataclass(frozen=True)
+class Concept:
+    weight: float
+    phrases: tuple[str, ...]
+
+
+def parse_keywords(text: str) -> list[Concept]:
+    concepts = []
+    for lineno, raw in enumerate(text.splitlines(), start=1):
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        weight = 1.0
+        match = re.match(r"^([+-]?\d+(?:\.\d+)?)\s*:\s*(.*)$", line)
+        if match:
+            weight, line = float(match.group(1)), match.group(2)
+        phrases = tuple(p.strip() for p in line.split("|") if normalize_words(p))
+        if not phrases:
+            raise ValueError(f"Keyword line {lineno} has no phrases: {raw!r}")
+        concepts.append(Concept(weight, phrases))
+    return concepts
+
+
+def load_keywords(path: Path) -> list[Concept]:
+    return parse_keywords(path.read_text(encoding="utf-8"))
+
+
+def relevance_fields(item: dict) -> tuple[str, str]:
+    """(title, abstract) of a full record or of a cached payload entry."""
+    abstract = item.get("abstract")
+    if abstract is None and "line" in item:
+        # payload_line: title | venue | YYYY-MM | citations | abstract
+        abstract = item["line"].split(" | ", 4)[-1]
+    return item.get("title") or "", abstract or ""
+
+
+def text_fingerprint(title: str, abstract: str) -> str:
+    return hashlib.sha256(f"{title}\n{abstract}".encode("utf-8")).hexdigest()[:16]
+
+
+class RelevanceScorer:
+    def __init__(self, concepts: list[Concept]) -> None:
+        self.concepts = concepts
+        patterns: list[list[str]] = []
+        self.pattern_concept: list[int] = []
+        for c, concept in enumerate(concepts):
+            for phrase in concept.phrases:
+                patterns.append(normalize_words(phrase))
+                self.pattern_concept.append(c)
+        self.automaton = AhoCorasick(patterns)
+        spec = [[c.weight, sorted(normalize_words(p) for p in c.phrases)] for c in concepts]
+        blob = json.dumps({"v": SCORER_VERSION, "title_weight": TITLE_WEIGHT, "concepts": spec}, sort_keys=True)
+        self.keyset = hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_file(cls, path: Path) -> "RelevanceScorer":
+        return cls(load_keywords(path))
+
+    def concept_counts(self, words: list[str]) -> dict[int, int]:
+        counts: dict[int, int] = {}
+        for _, _, pattern_id in self.automaton.iter_matches(words):
+            c = self.pattern_concept[pattern_id]
+            counts[c] = counts.get(c, 0) + 1
+        return counts
+
+    def score(self, title: str, abstract: str) -> float:
+        """Σ weight × (TITLE_WEIGHT if in title + log1p(abstract mentions)) over matched concepts."""
+        in_title = self.concept_counts(normalize_words(title))
+        in_abstract = self.concept_counts(normalize_words(abstract))
+        total = 0.0
+        for c in in_title.keys() | in_abstract.keys():
+            strength = (TITLE_WEIGHT if c in in_title else 0.0) + math.log1p(in_abstract.get(c, 0))
+            total += self.concepts[c].weight * strength
+        return round(total, 4)
+
+    def score_items(self, items: Iterable[dict], cache: "RelevanceCache | None" = None) -> dict[str, float]:
+        """DOI → score for items, scoring only DOIs the cache lacks for this keyword set and text."""
+        items = [item for item in items if item.get("doi")]
+        cached = cache.get(self.keyset, [item["doi"] for item in items]) if cache is not None else {}
+        scores: dict[str, float] = {}
+        fresh: dict[str, tuple[float, str]] = {}
+        for item in items:
+            doi = item["doi"]
+            if doi in scores:
+                continue
+            fields = relevance_fields(item)
+            fingerprint = text_fingerprint(*fields)
+            hit = cached.get(doi)
+            if hit is not None and hit[1] == fingerprint:
+                scores[doi] = hit[0]
+            else:
+                fresh[doi] = (self.score(*fields), fingerprint)
+                scores[doi] = fresh[doi][0]
+        if cache is not None and fresh:
+            cache.put(self.keyset, fresh)
+        return scores
+
+
+class RelevanceCache:
+    """relevance_scores table in index.sqlite, keyed by (keyset, doi) with the scored text's fingerprint."""
+
+    def __init__(self, db_path: Path) -> None:
+        from ingest_openalex import connect_index
+
+        self.conn = connect_index(db_path)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(relevance_scores)")}
+        if columns and "text_hash" not in columns:
+            # Scores from before text fingerprints may come from truncated abstracts.
+            self.conn.execute("DROP TABLE relevance_scores")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS relevance_scores (
+                keyset TEXT NOT NULL,
+                doi TEXT NOT NULL,
+                score REAL NOT NULL,
+                text_hash TEXT NOT NULL,
+                PRIMARY KEY (keyset, doi)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, keyset: str, dois: list[str]) -> dict[str, tuple[float, str]]:
+        """DOI → (score, text_hash) for the cached DOIs."""
+        wanted = list(dict.fromkeys(dois))
+        scores: dict[str, tuple[float, str]] = {}
+        for start in range(0, len(wanted), 500):
+            chunk = wanted[start:start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = self.conn.execute(
+                f"SELECT doi, score, text_hash FROM relevance_scores WHERE keyset = ? AND doi IN ({placeholders})",
+                [keyset, *chunk],
+            )
+            scores.update((doi, (score, text_hash)) for doi, score, text_hash in rows)
+        return scores
+
+    def put(self, keyset: str, scores: dict[str, tuple[float, str]]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO relevance_scores (keyset, doi, score, text_hash) VALUES (?, ?, ?, ?)",
+            [(keyset, doi, score, text_hash) for doi, (score, text_hash) in scores.items()],
+        )
+        self.conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the most relevant recent papers for a keyword list.")
+    parser.add_argument("keywords", help="Keyword file (see module docstring for the format)")
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument("--weeks", type=int, default=4, help="Number of recent weeks to score")
+    parser.add_argument("--top", type=int, default=20, help="Papers to list")
+    args = parser.parse_args()
+
+    resource_dir = Path(args.resource_dir)
+    week_dirs = load_weeks(resource_dir / "by_publication_week", args.weeks)
+    if not week_dirs:
+        print("No week folders found.", file=sys.stderr)
+        sys.exit(1)
+    scorer = RelevanceScorer.from_file(Path(args.keywords))
+    cache = RelevanceCache(resource_dir / "index.sqlite")
+    try:
+        entries = load_payload_entries(week_dirs)
+        scores = scorer.score_items(entries, cache)
+    finally:
+        cache.close()
+    ranked = sorted(entries, key=lambda e: scores.get(e["doi"], 0.0), reverse=True)
+    print(f"Keyword set {scorer.keyset}: {len(scorer.concepts)} concepts, {len(entries)} papers")
+    for entry in ranked[: args.top]:
+        print(f"{scores.get(entry['doi'], 0.0):7.2f}  {entry['venue_id']:<14} {entry['title']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,19 @@ from __future__ import annotations
 import argparse
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote
 from urllib.request import Request, urlopen
 import ssl
+import time
+
+from venue_catalog import DEFAULT_CATALOG_PATH, CatalogEntry, MARGIN_SCORE, is_confident, open_catalog, search
+
+# OpenAlex accepts at most 100 values in one OR'd filter.
+MAX_OR_FILTER_VALUES = 100
 
 
 @dataclass
@@ -123,26 +130,51 @@ def save_sources(path: Path, venues: List[Venue]) -> None:
     path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
-def fetch_json(url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 30) -> dict:
-    req = Request(
-        url,
-        headers={
-            "User-Agent": "wireless-research-intel/0.2 (openalex-resolve)",
-            "Accept": "application/json",
-            **(headers or {}),
-        },
-    )
-    context = ssl.create_default_context()
-    with urlopen(req, timeout=timeout, context=context) as resp:
-        return json.loads(resp.read().decode("utf-8", errors="ignore"))
+def fetch_json(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = 30,
+    retries: int = 3,
+    backoff: float = 1.5,
+) -> dict:
+    last_exc: Optional[Exception] = None
+    for attempt in range(retries):
+        try:
+            req = Request(
+                url,
+                headers={
+                    "User-Agent": "wireless-research-intel/0.2 (openalex-resolve)",
+                    "Accept": "application/json",
+                    **(headers or {}),
+                },
+            )
+            context = ssl.create_default_context()
+            with urlopen(req, timeout=timeout, context=context) as resp:
+                return json.loads(resp.read().decode("utf-8", errors="ignore"))
+        except Exception as exc:
+            last_exc = exc
+            if attempt < retries - 1:
+                time.sleep(backoff ** attempt)
+    if last_exc:
+        raise last_exc
+    raise RuntimeError("Failed to fetch JSON.")
 
 
-def resolve_source_id(name: str, api_key: Optional[str], email: Optional[str]) -> Optional[str]:
+def openalex_headers(api_key: Optional[str], email: Optional[str]) -> Dict[str, str]:
     headers = {}
     if api_key:
         headers["api-key"] = api_key
     if email:
         headers["From"] = email
+    return headers
+
+
+def short_source_id(value: str) -> str:
+    return value.rsplit("/", 1)[-1]
+
+
+def resolve_source_id(name: str, api_key: Optional[str], email: Optional[str]) -> Optional[str]:
+    headers = openalex_headers(api_key, email)
     url = f"https://api.openalex.org/sources?search={quote(name)}"
     data = fetch_json(url, headers=headers)
     results = data.get("results") or []
@@ -151,17 +183,13 @@ def resolve_source_id(name: str, api_key: Optional[str], email: Optional[str]) -
     openalex_id = results[0].get("id")
     if not openalex_id:
         return None
-    return openalex_id.rsplit("/", 1)[-1]
+    return short_source_id(openalex_id)
 
 
 def resolve_source_ids(
     name: str, api_key: Optional[str], email: Optional[str], limit: int
 ) -> List[str]:
-    headers = {}
-    if api_key:
-        headers["api-key"] = api_key
-    if email:
-        headers["From"] = email
+    headers = openalex_headers(api_key, email)
     url = f"https://api.openalex.org/sources?search={quote(name)}&per-page={max(1, limit)}"
     data = fetch_json(url, headers=headers)
     results = data.get("results") or []
@@ -173,37 +201,55 @@ def resolve_source_ids(
         score = item.get("works_count")
         if not isinstance(score, int):
             score = -1
-        scored.append((score, openalex_id.rsplit("/", 1)[-1]))
+        scored.append((score, short_source_id(openalex_id)))
     if any(score >= 0 for score, _ in scored):
         scored.sort(key=lambda x: x[0], reverse=True)
     return [sid for _, sid in scored[:limit]]
 
 
+def fetch_source_work_counts(
+    source_ids: List[str], api_key: Optional[str], email: Optional[str]
+) -> Dict[str, int]:
+    """Return {source_id: works count} using one group_by request per 100 IDs."""
+    headers = openalex_headers(api_key, email)
+    unique_ids = list(dict.fromkeys(source_ids))
+    counts: Dict[str, int] = {}
+    for start in range(0, len(unique_ids), MAX_OR_FILTER_VALUES):
+        chunk = unique_ids[start:start + MAX_OR_FILTER_VALUES]
+        url = (
+            "https://api.openalex.org/works?"
+            f"filter={quote('primary_location.source.id:' + '|'.join(chunk))}"
+            "&group_by=primary_location.source.id"
+            "&per-page=200"
+        )
+        data = fetch_json(url, headers=headers)
+        for group in data.get("group_by") or []:
+            key = group.get("key")
+            if key:
+                counts[short_source_id(key)] = group.get("count", 0)
+        for source_id in chunk:
+            counts.setdefault(source_id, 0)
+    return counts
+
+
 def validate_sources(venues: List[Venue], api_key: Optional[str], email: Optional[str]) -> None:
-    headers = {}
-    if api_key:
-        headers["api-key"] = api_key
-    if email:
-        headers["From"] = email
+    source_ids = [sid for venue in venues for sid in venue.openalex_source_ids]
+    counts: Dict[str, int] = {}
+    error: Optional[Exception] = None
+    if source_ids:
+        try:
+            counts = fetch_source_work_counts(source_ids, api_key, email)
+        except Exception as exc:
+            error = exc
     for venue in venues:
         if not venue.openalex_source_ids:
             print(f"{venue.venue_id}: missing openalex_source_ids")
             continue
-        total = 0
-        for source_id in venue.openalex_source_ids:
-            url = f"https://api.openalex.org/works?filter=primary_location.source.id:{source_id}&per-page=1"
-            try:
-                data = fetch_json(url, headers=headers)
-                total += data.get("meta", {}).get("count", 0)
-            except Exception as exc:
-                print(f"{venue.venue_id}: error {exc}")
-                total = -1
-                break
-        try:
-            if total >= 0:
-                print(f"{venue.venue_id}: count={total}")
-        except Exception as exc:
-            print(f"{venue.venue_id}: error {exc}")
+        if error is not None:
+            print(f"{venue.venue_id}: error {error}")
+            continue
+        total = sum(counts.get(source_id, 0) for source_id in venue.openalex_source_ids)
+        print(f"{venue.venue_id}: count={total}")
 
 
 def main() -> None:
@@ -216,6 +262,18 @@ def main() -> None:
         type=int,
         help="For conference venues, set top N OpenAlex source IDs from search results.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent OpenAlex lookups when resolving source IDs (default: 4).",
+    )
+    parser.add_argument(
+        "--catalog",
+        default=DEFAULT_CATALOG_PATH,
+        help="Offline venue catalog used instead of /sources?search= when present (see venue_catalog.py).",
+    )
+    parser.add_argument("--online", action="store_true", help="Ignore the offline catalog and query OpenAlex.")
     args = parser.parse_args()
 
     load_env_file(Path("openalex.env"))
@@ -226,19 +284,47 @@ def main() -> None:
     venues = load_sources(path)
     updated = 0
 
-    for venue in venues:
-        if venue.openalex_source_ids and not args.overwrite:
-            continue
-        if args.discover_conferences and venue.type == "conference":
-            ids = resolve_source_ids(venue.name, api_key, email, args.discover_conferences)
+    catalog_path = Path(args.catalog)
+    use_catalog = not args.online and catalog_path.exists()
+
+    def resolve_venue(venue: Venue) -> Tuple[List[str], List[CatalogEntry]]:
+        """Return (source IDs to assign, catalog alternatives when no match was confident)."""
+        limit = args.discover_conferences if args.discover_conferences and venue.type == "conference" else 0
+        if use_catalog:
+            # sqlite3 connections are per-thread, so each lookup opens its own.
+            conn = open_catalog(catalog_path)
+            try:
+                matches = search(conn, venue.name, limit=max(5, limit))
+            finally:
+                conn.close()
+            if not is_confident(matches):
+                return [], matches
+            return [e.source_id for e in matches[: max(1, limit)] if e.score >= MARGIN_SCORE], []
+        if limit:
+            return resolve_source_ids(venue.name, api_key, email, limit), []
+        source_id = resolve_source_id(venue.name, api_key, email)
+        return ([source_id] if source_id else []), []
+
+    pending = [v for v in venues if args.overwrite or not v.openalex_source_ids]
+    if use_catalog:
+        print(f"Resolving offline from {catalog_path}")
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [(venue, pool.submit(resolve_venue, venue)) for venue in pending]
+        for venue, future in futures:
+            try:
+                ids, alternatives = future.result()
+            except Exception as exc:
+                print(f"{venue.venue_id}: error {exc}")
+                continue
+            if alternatives:
+                print(f"{venue.venue_id}: no confident catalog match for {venue.name!r}; left unset. Candidates:")
+                for e in alternatives:
+                    print(f"  {e.source_id}  {e.score:.2f}  {e.display_name} ({e.type}, {e.works_count} works)")
+            elif use_catalog and not ids:
+                print(f"{venue.venue_id}: no catalog match for {venue.name!r}")
             if ids:
                 venue.openalex_source_ids = ids
                 updated += 1
-            continue
-        source_id = resolve_source_id(venue.name, api_key, email)
-        if source_id:
-            venue.openalex_source_ids = [source_id]
-            updated += 1
 
     save_sources(path, venues)
     print(f"Updated {updated} venues.")
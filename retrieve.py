@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""Two-stage retrieval over the whole corpus: local BM25, then batched rerank.
+
+The BM25 index lives in resource/bm25/: postings.npz holds term-sorted
+(doc, tf) arrays with a per-term offset table, docs.json the DOI, week and file
+of every indexed paper plus each week folder's fingerprint. Only week folders
+whose fingerprint changed are re-tokenized on update. The BM25 shortlist is
+sent to SiliconFlowAPI.create_rerank() in bounded batches and the per-batch
+scores are merged; rerank scores are cached in index.sqlite per (model, query,
+DOI).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from ingest_openalex import connect_index, write_text_atomic
+from paper_corpus import load_env_file, read_paper, truncate_abstract, week_fingerprint
+from relevance import normalize_words
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Title terms are indexed this many times so title matches outrank abstract ones.
+TITLE_REPEAT = 2
+DEFAULT_RERANK_MODEL = "BAAI/bge-reranker-v2-m3"
+DEFAULT_RERANK_BATCH = 32
+RERANK_MAX_WORDS = 300
+
+
+def document_terms(paper: dict) -> Counter:
+    keywords = " ".join(paper.get("keywords") or [])
+    counts = Counter(normalize_words(f"{paper.get('abstract') or ''} {keywords}"))
+    for word in normalize_words(paper.get("title") or ""):
+        counts[word] += TITLE_REPEAT
+    return counts
+
+
+def rerank_text(paper: dict) -> str:
+    return f"{paper.get('title') or ''}\n{truncate_abstract(paper.get('abstract') or '', RERANK_MAX_WORDS)}"
+
+
+@dataclass
+class Hit:
+    doc: int
+    doi: str
+    week: str
+    file: str
+    score: float
+
+
+class BM25Index:
+    """Term-major postings over every paper in the week folders."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.docs: list[dict] = []          # {"doi", "week", "file"}
+        self.weeks: dict[str, str] = {}     # week folder → fingerprint
+        self.vocab: dict[str, int] = {}
+        self.term_ptr = np.zeros(1, dtype=np.int64)
+        self.post_doc = np.zeros(0, dtype=np.int32)
+        self.post_tf = np.zeros(0, dtype=np.float32)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        meta_path = root / "docs.json"
+        postings_path = root / "postings.npz"
+        if meta_path.exists() and postings_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self.docs, self.weeks = meta["docs"], meta["weeks"]
+            self.vocab = {term: i for i, term in enumerate(meta["vocab"])}
+            with np.load(postings_path) as data:
+                self.term_ptr = data["term_ptr"]
+                self.post_doc = data["post_doc"]
+                self.post_tf = data["post_tf"]
+                self.doc_len = data["doc_len"]
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def update(self, week_dirs: list[Path]) -> dict[str, int]:
+        """Re-index week folders whose fingerprint changed and drop folders that are gone."""
+        current = {d.name: (d, week_fingerprint(d, 0)[0]) for d in week_dirs}
+        stale = {w for w, key in self.weeks.items() if current.get(w, (None, None))[1] != key}
+        fresh = sorted(w for w, (_, key) in current.items() if self.weeks.get(w) != key)
+        stats = {"weeks_reindexed": len(fresh), "weeks_removed": len(stale - set(fresh)), "papers_added": 0}
+        if not stale and not fresh:
+            return stats
+
+        # Old postings back to (doc, term, tf) triples, minus the stale weeks.
+        keep = np.asarray([d["week"] not in stale for d in self.docs], dtype=bool)
+        new_id = np.cumsum(keep) - 1
+        terms = np.repeat(np.arange(len(self.term_ptr) - 1, dtype=np.int32), np.diff(self.term_ptr))
+        alive = keep[self.post_doc] if len(self.post_doc) else np.zeros(0, dtype=bool)
+        docs = [d for d, k in zip(self.docs, keep) if k]
+        parts_doc = [new_id[self.post_doc[alive]].astype(np.int32)]
+        parts_term = [terms[alive]]
+        parts_tf = [self.post_tf[alive]]
+        doc_len = [self.doc_len[keep]]
+
+        for week in fresh:
+            week_dir, key = current[week]
+            add_doc, add_term, add_tf, add_len = [], [], [], []
+            for path in sorted(week_dir.glob("*.json")):
+                paper = read_paper(path)
+                if paper is None or not paper.get("doi"):
+                    continue
+                counts = document_terms(paper)
+                doc_id = len(docs)
+                docs.append({"doi": paper["doi"], "week": week, "file": path.name})
+                for word, tf in counts.items():
+                    add_doc.append(doc_id)
+                    add_term.append(self.vocab.setdefault(word, len(self.vocab)))
+                    add_tf.append(tf)
+                add_len.append(sum(counts.values()))
+            parts_doc.append(np.asarray(add_doc, dtype=np.int32))
+            parts_term.append(np.asarray(add_term, dtype=np.int32))
+            parts_tf.append(np.asarray(add_tf, dtype=np.float32))
+            doc_len.append(np.asarray(add_len, dtype=np.float32))
+            self.weeks[week] = key
+            stats["papers_added"] += len(add_len)
+        for week in stale - set(fresh):
+            del self.weeks[week]
+
+        post_doc = np.concatenate(parts_doc)
+        post_term = np.concatenate(parts_term)
+        order = np.argsort(post_term, kind="stable")
+        self.post_doc = post_doc[order]
+        self.post_tf = np.concatenate(parts_tf)[order]
+        self.term_ptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(post_term, minlength=len(self.vocab)))]
+        ).astype(np.int64)
+        self.doc_len = np.concatenate(doc_len)
+        self.docs = docs
+        return stats
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "postings.tmp.npz"
+        np.savez(tmp, term_ptr=self.term_ptr, post_doc=self.post_doc, post_tf=self.post_tf, doc_len=self.doc_len)
+        tmp.replace(self.root / "postings.npz")
+        vocab = sorted(self.vocab, key=self.vocab.__getitem__)
+        write_text_atomic(
+            self.root / "docs.json",
+            json.dumps({"docs": self.docs, "weeks": self.weeks, "vocab": vocab}, ensure_ascii=False),
+        )
+
+    def search(self, query: str, k: int = 100) -> list[Hit]:
+        """Top-k documents by Okapi BM25 for the query terms."""
+        n_docs = len(self.docs)
+        term_ids = {self.vocab[w] for w in normalize_words(query) if w in self.vocab}
+        if not n_docs or not term_ids:
+            return []
+        avg_len = float(self.doc_len.mean()) or 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / avg_len)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for t in term_ids:
+            start, end = self.term_ptr[t], self.term_ptr[t + 1]
+            docs, tf = self.post_doc[start:end], self.post_tf[start:end]
+            df = end - start
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        k = min(k, int(np.count_nonzero(scores)))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            Hit(int(i), self.docs[i]["doi"], self.docs[i]["week"], self.docs[i]["file"], float(scores[i]))
+            for i in top
+        ]
+
+
+def all_week_dirs(weeks_dir: Path) -> list[Path]:
+    return sorted(d for d in weeks_dir.iterdir() if d.is_dir()) if weeks_dir.exists() else []
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class RerankCache:
+    """rerank_scores table in index.sqlite, keyed by (model, normalized query, doi)."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.conn = connect_index(db_path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rerank_scores (
+                model TEXT NOT NULL,
+                query TEXT NOT NULL,
+                doi TEXT NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (model, query, doi)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, model: str, query: str, dois: list[str]) -> dict[str, float]:
+        scores: dict[str, float] = {}
+        for start in range(0, len(dois), 500):
+            chunk = dois[start:start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            scores.update(
+                self.conn.execute(
+                    f"SELECT doi, score FROM rerank_scores WHERE model = ? AND query = ? AND doi IN ({placeholders})",
+                    [model, query, *chunk],
+                )
+            )
+        return scores
+
+    def put(self, model: str, query: str, scores: dict[str, float]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO rerank_scores (model, query, doi, score) VALUES (?, ?, ?, ?)",
+            [(model, query, doi, score) for doi, score in scores.items()],
+        )
+        self.conn.commit()
+
+
+def rerank(
+    api,
+    query: str,
+    candidates: list[tuple[str, str]],
+    model: str = DEFAULT_RERANK_MODEL,
+    batch_size: int = DEFAULT_RERANK_BATCH,
+    concurrency: int = 4,
+    cache: RerankCache | None = None,
+) -> dict[str, float]:
+    """Rerank (doi, text) candidates in batches of batch_size; return DOI → relevance score.
+
+    Cross-encoder scores do not depend on the other documents in a request, so
+    batches are scored independently and merged. Cached DOIs are not resent.
+    """
+    key = normalize_query(query)
+    scores = cache.get(model, key, [doi for doi, _ in candidates]) if cache is not None else {}
+    todo = [(doi, text) for doi, text in candidates if doi not in scores]
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), max(1, batch_size))]
+
+    def score_batch(batch: list[tuple[str, str]]) -> dict[str, float]:
+        response = api.create_rerank(
+            model=model, query=query, documents=[text for _, text in batch], top_n=len(batch)
+        )
+        return {batch[r["index"]][0]: float(r["relevance_score"]) for r in response.get("results") or []}
+
+    fresh: dict[str, float] = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for result in pool.map(score_batch, batches):
+            fresh.update(result)
+    if cache is not None and fresh:
+        cache.put(model, key, fresh)
+    scores.update(fresh)
+    return scores
+
+
+def retrieve(
+    resource_dir: Path,
+    query: str,
+    top_k: int = 100,
+    candidates: int = 300,
+    api=None,
+    model: str = DEFAULT_RERANK_MODEL,
+    batch_size: int = DEFAULT_RERANK_BATCH,
+    concurrency: int = 4,
+    use_cache: bool = True,
+) -> list[tuple[dict, str, str, float]]:
+    """Return up to top_k (paper, week, file, score) across every week folder.
+
+    BM25 narrows the corpus to `candidates` papers; with an api they are
+    reranked, otherwise the BM25 order is kept.
+    """
+    weeks_dir = resource_dir / "by_publication_week"
+    index = BM25Index(resource_dir / "bm25")
+    stats = index.update(all_week_dirs(weeks_dir))
+    if stats["weeks_reindexed"] or stats["weeks_removed"]:
+        index.save()
+        print(
+            f"  BM25 index: {stats['weeks_reindexed']} weeks re-indexed, {stats['weeks_removed']} removed, "
+            f"{len(index)} papers"
+        )
+    hits = index.search(query, candidates if api is not None else top_k)
+    papers = {}
+    for hit in hits:
+        paper = read_paper(weeks_dir / hit.week / hit.file)
+        if paper is not None:
+            papers[hit.doi] = (paper, hit)
+
+    if api is None:
+        ranked = [(p, h.week, h.file, h.score) for p, h in papers.values()]
+        return ranked[:top_k]
+
+    cache = RerankCache(resource_dir / "index.sqlite") if use_cache else None
+    try:
+        scores = rerank(
+            api,
+            query,
+            [(doi, rerank_text(p)) for doi, (p, _) in papers.items()],
+            model,
+            batch_size,
+            concurrency,
+            cache,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    ranked = sorted(papers.values(), key=lambda ph: scores.get(ph[1].doi, float("-inf")), reverse=True)
+    return [(p, h.week, h.file, scores.get(h.doi, 0.0)) for p, h in ranked[:top_k]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find the papers most relevant to a query across the whole corpus.")
+    parser.add_argument("query", help='e.g. "UAV mmWave beam codebook design"')
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument("--top-k", type=int, default=20, help="Papers to return")
+    parser.add_argument("--candidates", type=int, default=300, help="BM25 shortlist size sent to the reranker")
+    parser.add_argument("--no-rerank", action="store_true", help="Rank by BM25 only (no API call).")
+    parser.add_argument("--rerank-model", default=os.getenv("SILICONFLOW_RERANK_MODEL") or DEFAULT_RERANK_MODEL)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_RERANK_BATCH, help="Documents per rerank request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent rerank requests")
+    parser.add_argument("--no-cache", action="store_true", help="Do not reuse cached rerank scores.")
+    args = parser.parse_args()
+
+    load_env_file(Path("private.env"))
+    resource_dir = Path(args.resource_dir)
+    if not all_week_dirs(resource_dir / "by_publication_week"):
+        print("No week folders found.", file=sys.stderr)
+        sys.exit(1)
+    api = None
+    if not args.no_rerank:
+        from siliconflow_api import SiliconFlowAPI
+
+        api = SiliconFlowAPI()
+    results = retrieve(
+        resource_dir,
+        args.query,
+        args.top_k,
+        args.candidates,
+        api,
+        args.rerank_model,
+        args.batch_size,
+        args.concurrency,
+        not args.no_cache,
+    )
+    for paper, week, _, score in results:
+        print(f"{score:8.3f}  {week}  {paper.get('venue_id') or '':<14} {paper.get('title')}")
+
+
+if __name__ == "__main__":
+    main()
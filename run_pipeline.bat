@@ -25,6 +25,14 @@ if %ERRORLEVEL% NEQ 0 (
     exit /b %ERRORLEVEL%
 )
 
+echo [%DATE% %TIME%] Embedding new papers... >> "%LOGFILE%" 2>&1
+echo [%DATE% %TIME%] Embedding new papers...
+%PYTHON_CMD% embed_papers.py --weeks 8 >> "%LOGFILE%" 2>&1
+if %ERRORLEVEL% NEQ 0 (
+    echo [%DATE% %TIME%] WARNING: embed_papers.py failed with code %ERRORLEVEL%; continuing >> "%LOGFILE%" 2>&1
+    echo [%DATE% %TIME%] WARNING: embed_papers.py failed with code %ERRORLEVEL%; continuing
+)
+
 echo [%DATE% %TIME%] Generating report... >> "%LOGFILE%" 2>&1
 echo [%DATE% %TIME%] Generating report...
 %PYTHON_CMD% generate_report.py --weeks 4 >> "%LOGFILE%" 2>&1
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Building blocks for section-parallel digests (generate_report.py --sections).
+
+Phase 1 picks the topics. A short LLM call returns one line per topic:
+
+    Topic name | keyword phrase; keyword phrase; ...
+
+Each paper then goes to the topic whose phrases it matches most strongly. All
+topics share one word-level Aho-Corasick automaton (relevance.py), so this
+takes a single pass per paper. With --cluster, the topics are the embedding
+clusters instead.
+
+Phase 2 writes every section of the report template in its own call. The
+calls run concurrently, and each sees only the papers it needs.
+assemble_report puts the sections back in template order. Counts and tables
+are filled in locally from the assignment.
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from relevance import TITLE_WEIGHT, Concept, RelevanceScorer, normalize_words, relevance_fields
+from topic_clusters import ClusterStats, assignment_stats
+
+# Sections rendered locally from exact counts; every other template section gets an LLM call.
+LOCAL_SECTIONS = ("Trend Signals", "Venue Breakdown")
+TOPICS_SECTION = "Hot Topics"
+
+_TOPIC_LINE_RE = re.compile(r"^\s*(?:[-*]\s*|\d+[.)]\s*)?(?:\*\*)?(.+?)(?:\*\*)?\s*\|\s*(.+?)\s*$")
+_SECTION_RE = re.compile(r"^## +(.+?)\s*$", re.M)
+
+
+@dataclass
+class Topic:
+    name: str
+    keywords: tuple[str, ...] = ()
+    members: list[int] = field(default_factory=list)  # indices into the window's entries
+
+
+def parse_topic_plan(text: str) -> list[Topic]:
+    """Topics from 'name | phrase; phrase' lines; other lines and repeated names are skipped."""
+    topics: dict[str, Topic] = {}
+    for line in text.splitlines():
+        match = _TOPIC_LINE_RE.match(line)
+        if not match:
+            continue
+        name = match.group(1).strip().strip("[]")
+        keywords = tuple(k.strip() for k in re.split(r"[;,]", match.group(2)) if normalize_words(k))
+        if name and name.lower() not in topics:
+            topics[name.lower()] = Topic(name, keywords)
+    return list(topics.values())
+
+
+def parse_numbered_names(text: str, n: int) -> list[str]:
+    """Names from 'k. name' lines for k = 1..n; missing ones become 'Cluster k'."""
+    found: dict[int, str] = {}
+    for match in re.finditer(r"^\s*(?:###\s*)?(\d+)[.)]\s*(?:\*\*)?(.+?)(?:\*\*)?\s*$", text, re.M):
+        k = int(match.group(1))
+        if 1 <= k <= n and k not in found:
+            found[k] = match.group(2).strip().strip("[]")
+    return [found.get(k, f"Cluster {k}") for k in range(1, n + 1)]
+
+
+def assign_topics(entries: list[dict], topics: list[Topic]) -> list[Topic]:
+    """Fill each topic's members; return the topics that got papers, largest first.
+
+    A paper's strength for a topic is TITLE_WEIGHT when a phrase (or the topic
+    name) is in its title, plus log1p(abstract mentions). Each paper goes to
+    its strongest topic, ties to the earlier one. Papers matching no topic stay
+    unassigned.
+    """
+    concepts = [
+        Concept(1.0, tuple(p for p in (t.name, *t.keywords) if normalize_words(p))) for t in topics
+    ]
+    scorer = RelevanceScorer(concepts)
+    for topic in topics:
+        topic.members = []
+    for i, entry in enumerate(entries):
+        title, abstract = relevance_fields(entry)
+        in_title = scorer.concept_counts(normalize_words(title))
+        in_abstract = scorer.concept_counts(normalize_words(abstract))
+        best, best_strength = None, 0.0
+        for c in sorted(in_title.keys() | in_abstract.keys()):
+            strength = (TITLE_WEIGHT if c in in_title else 0.0) + math.log1p(in_abstract.get(c, 0))
+            if strength > best_strength:
+                best, best_strength = c, strength
+        if best is not None:
+            topics[best].members.append(i)
+    assigned = [t for t in topics if t.members]
+    return sorted(assigned, key=lambda t: len(t.members), reverse=True)
+
+
+def topic_stats(entries: list[dict], topics: list[Topic]) -> tuple[ClusterStats, list[dict]]:
+    """(counts, assigned entries) for topics in their given order; stats.order follows that order."""
+    assigned = [entries[i] for t in topics for i in t.members]
+    labels = np.repeat(np.arange(len(topics)), [len(t.members) for t in topics])
+    stats = assignment_stats(
+        labels,
+        len(topics),
+        [e.get("venue_id") or "unknown" for e in assigned],
+        [e.get("week") or (e.get("published") or "")[:10] for e in assigned],
+    )
+    stats.order = list(range(len(topics)))
+    return stats, assigned
+
+
+def template_sections(template: str) -> tuple[str, list[tuple[str, str]]]:
+    """Split a report template into its header and ('## heading', body) pairs, in order."""
+    matches = list(_SECTION_RE.finditer(template))
+    if not matches:
+        return template.strip(), []
+    header = template[: matches[0].start()].strip()
+    sections = []
+    for m, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following is not None else len(template)
+        sections.append((m.group(1), template[m.end():end].strip()))
+    return header, sections
+
+
+def topic_block(template: str) -> str:
+    """The per-topic block of the Hot Topics section, from its '### 1.' heading to the '---' rule."""
+    body = dict(template_sections(template)[1]).get(TOPICS_SECTION, "")
+    match = re.search(r"^### .*?(?=^---|^\*\(|\Z)", body, re.M | re.S)
+    return (match.group(0) if match else body).strip()
+
+
+def fill_placeholders(text: str, values: dict[str, str]) -> str:
+    return re.sub(r"\{\{(\w+)\}\}", lambda m: values.get(m.group(1), m.group(0)), text)
+
+
+def strip_heading(markdown: str, prefix: str) -> str:
+    """Drop a leading heading line starting with prefix (models often repeat it)."""
+    text = markdown.strip()
+    if text.startswith(prefix):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    return text.strip()
+
+
+def assemble_report(template: str, bodies: dict[str, str], values: dict[str, str]) -> str:
+    """The template's header and sections, in template order, with generated bodies.
+
+    Sections without a body are left out.
+    """
+    header, sections = template_sections(template)
+    parts = [fill_placeholders(header, values)]
+    for heading, _ in sections:
+        if bodies.get(heading):
+            parts.append(f"## {heading}\n\n{bodies[heading].strip()}")
+    return "\n\n".join(p for p in parts if p) + "\n"
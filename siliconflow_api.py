@@ -80,6 +80,23 @@ class SiliconFlowAPI:
         files: dict[str, Any] | None = None,
         data: dict[str, Any] | None = None,
     ) -> dict[str, Any]:
+        response = self._send(method, path, json_body=json_body, params=params, files=files, data=data)
+        try:
+            payload = response.json()
+        except Exception as exc:
+            raise SiliconFlowAPIError("Non-JSON response returned by SiliconFlow API") from exc
+        return payload
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        *,
+        json_body: dict[str, Any] | None = None,
+        params: dict[str, Any] | None = None,
+        files: dict[str, Any] | None = None,
+        data: dict[str, Any] | None = None,
+    ) -> httpx.Response:
         url = f"{self.base_url}{path}"
         headers = {"Authorization": f"Bearer {self.api_key}"}
         if files is None:
@@ -101,12 +118,7 @@ class SiliconFlowAPI:
         if response.status_code >= 400:
             detail = response.text[:500]
             raise SiliconFlowAPIError(f"HTTP {response.status_code} for {path}: {detail}")
-
-        try:
-            payload = response.json()
-        except Exception as exc:
-            raise SiliconFlowAPIError("Non-JSON response returned by SiliconFlow API") from exc
-        return payload
+        return response
 
     @staticmethod
     def _unwrap_data(payload: dict[str, Any]) -> dict[str, Any]:
@@ -207,6 +219,10 @@ class SiliconFlowAPI:
         payload = self._request("GET", "/files")
         return self._unwrap_data(payload)
 
+    def get_file_content(self, *, file_id: str) -> str:
+        """Download a file (e.g. a finished batch's JSONL output) as text."""
+        return self._send("GET", f"/files/{file_id}/content").text
+
     def create_batch(
         self,
         *,
@@ -0,0 +1,78 @@
+# tests/test_abstract_compressor.py
+from abstract_compressor import compress_abstracts, compress_entries, split_sentences, text_tokens
+from payload_planner import plan_payload, split_line
+
+ABSTRACT = (
+    "Millimeter wave links for UAVs suffer from beam misalignment. "
+    "Prior work relies on exhaustive search over a fixed grid of narrow beams. "
+    "We design a hierarchical codebook that adapts the beam width to position uncertainty. "
+    "The codebook is built by solving a sequence of convex problems with a closed-form initial point. "
+    "Simulations show the codebook reduces training overhead by 48% and stays within 1 dB of the optimum."
+)
+SHORT = "Federated learning over wireless channels converges 2x faster with age-based scheduling."
+
+
+def test_split_sentences_handles_truncated_payload_abstracts():
+    assert split_sentences("First one. Second (2x) one! 3 more? e.g. not split. Cut off...") == [
+        "First one.",
+        "Second (2x) one!",
+        "3 more? e.g. not split.",
+        "Cut off",
+    ]
+    assert split_sentences("   ") == []
+
+
+def test_keeps_opening_and_results_within_budget():
+    compressed, short = compress_abstracts([ABSTRACT, SHORT], budget=45)
+    assert text_tokens(compressed) <= 45
+    assert compressed.startswith("Millimeter wave links")
+    assert compressed.endswith("within 1 dB of the optimum.")
+    assert "convex problems" not in compressed
+    assert short == SHORT  # already within budget
+
+
+def test_overlong_best_sentence_is_cut_at_budget():
+    long_sentence = "Beamforming " + " ".join(["gain"] * 200) + "."
+    (compressed,) = compress_abstracts([long_sentence], budget=20)
+    assert 0 < text_tokens(compressed) <= 20
+    assert compress_abstracts([""], budget=20) == [""]
+
+
+def test_compressed_payload_fits_more_papers_than_truncation():
+    def entry(i):
+        return {
+            "title": f"P{i}",
+            "venue_id": "ieee_twc",
+            "cited_by_count": i,
+            "published": "2025-02-10",
+            "line": f"P{i} | ieee_twc | 2025-02 | {i} | {ABSTRACT} {ABSTRACT}",
+        }
+
+    entries = [entry(i) for i in range(20)]
+    budget = 20 * 60
+    truncated = plan_payload([dict(e) for e in entries], budget, 0, stages=(300,))
+    shortened, before, after = compress_entries(entries, budget=45)
+    assert shortened == 20 and after < before
+    assert all(split_line(e["line"])[0] == f"P{i} | ieee_twc | 2025-02 | {i}" for i, e in enumerate(entries))
+    compressed = plan_payload(entries, budget, 0, stages=(300,))
+    assert compressed.dropped == 0
+    assert len(compressed.lines) > len(truncated.lines)
+
+
+def test_compress_entries_uses_the_full_abstract_not_the_truncated_line():
+    results = "Measurements confirm a 3 dB gain over exhaustive search."
+    full = " ".join([ABSTRACT] + ["Filler sentence number %d adds nothing new." % i for i in range(60)] + [results])
+    line = "P | ieee_twc | 2025-02 | 1 | " + " ".join(full.split()[:300]) + "..."
+    entries = [{"abstract": full, "line": line}, {"abstract": SHORT, "line": f"S | ieee_twc | 2025-02 | 1 | {SHORT}"}]
+    shortened, _, _ = compress_entries(entries, budget=60)
+    assert shortened == 1
+    assert split_line(entries[0]["line"])[1].endswith(results)
+    assert entries[1]["line"].endswith(SHORT)
+
+
+def test_compressed_line_escapes_pipes_in_the_full_abstract():
+    full = ABSTRACT.replace("of the optimum", "of the channel | capacity optimum")
+    entry = {"abstract": full, "line": "P | ieee_twc | 2025-02 | 1 | " + full.replace("|", "/")}
+    assert compress_entries([entry], budget=45)[0] == 1
+    assert entry["line"].count("|") == 4
+    assert "channel / capacity" in entry["line"]
@@ -186,6 +186,27 @@ def test_run_report_stream_content_type(client, monkeypatch):
     assert "text/event-stream" in resp.content_type
 
 
+def test_run_stream_children_are_unbuffered(client, monkeypatch):
+    import dashboard
+
+    seen = {}
+
+    class MockProc:
+        def __init__(self):
+            self.stdout = iter([])
+            self.returncode = 0
+        def wait(self):
+            pass
+
+    def fake_popen(*args, **kwargs):
+        seen.update(kwargs.get("env") or {})
+        return MockProc()
+
+    monkeypatch.setattr(dashboard.subprocess, "Popen", fake_popen)
+    client.get("/run/report/stream").get_data()
+    assert seen.get("PYTHONUNBUFFERED") == "1"
+
+
 def test_run_stream_done_ok_on_success(client, monkeypatch):
     """Stream ends with [DONE:OK] when both scripts exit 0."""
     import dashboard
@@ -0,0 +1,94 @@
+# tests/test_dedupe.py
+import sqlite3
+
+import numpy as np
+
+import ingest_openalex
+from dedupe import DedupeIndex, collapse_duplicates, groups_for, minhash, shingles
+
+ABSTRACT = (
+    "We propose a hierarchical beam codebook for UAV millimeter wave links that adapts the beam width "
+    "to the estimated position uncertainty and reduces training overhead by half compared with "
+    "exhaustive search while keeping the spectral efficiency within one decibel of the optimum"
+)
+REVISED = ABSTRACT.replace("by half", "by roughly fifty percent") + " Simulations confirm the analysis"
+OTHER = (
+    "Federated learning over wireless channels suffers from straggling clients; we schedule uplink "
+    "transmissions with a age of update metric and show faster convergence on standard benchmarks"
+)
+
+
+def test_minhash_estimates_jaccard():
+    a, b = shingles(ABSTRACT), shingles(REVISED)
+    true = len(a & b) / len(a | b)
+    estimate = float(np.mean(minhash(ABSTRACT) == minhash(REVISED)))
+    assert abs(estimate - true) < 0.15
+    assert np.array_equal(minhash(ABSTRACT), minhash(ABSTRACT))
+    assert minhash("   ") is None
+
+
+def test_near_duplicates_share_a_group(tmp_path):
+    conn = sqlite3.connect(tmp_path / "index.sqlite")
+    index = DedupeIndex(conn)
+    assert index.add("10.1/preprint", f"Beam codebooks for UAVs {ABSTRACT}") == "10.1/preprint"
+    assert index.add("10.1/article", f"Beam Codebooks for UAVs {REVISED}") == "10.1/preprint"
+    assert index.add("10.1/other", f"Federated scheduling {OTHER}") == "10.1/other"
+    assert index.add("10.1/article", "ignored: already indexed") == "10.1/preprint"
+    assert groups_for(conn, ["10.1/article", "10.1/other", "10.1/missing"]) == {
+        "10.1/article": "10.1/preprint",
+        "10.1/other": "10.1/other",
+    }
+
+
+def test_bridging_paper_merges_groups(tmp_path):
+    conn = sqlite3.connect(tmp_path / "index.sqlite")
+    index = DedupeIndex(conn, threshold=0.9)
+    words = [f"w{i}" for i in range(80)]
+    index.add("a", " ".join(words[0:60]))
+    index.add("b", " ".join(words[20:80]))  # Jaccard ~0.49 with a: separate groups
+    index.threshold = 0.6
+    assert index.add("c", " ".join(words[10:70])) == "a"  # ~0.7 with both
+    assert groups_for(conn, ["a", "b", "c"]) == {"a": "a", "b": "a", "c": "a"}
+
+
+def test_collapse_keeps_most_cited_version_in_order(tmp_path):
+    db = tmp_path / "index.sqlite"
+    entries = [
+        {"doi": "10.1/preprint", "cited_by_count": 2, "published": "2024-01-01"},
+        {"doi": "10.1/other", "cited_by_count": 0, "published": "2024-02-01"},
+        {"doi": "10.1/article", "cited_by_count": 9, "published": "2024-06-01"},
+        {"doi": "10.1/unindexed", "cited_by_count": 1, "published": "2024-06-01"},
+    ]
+    assert collapse_duplicates(entries, db) == (entries, 0)
+
+    conn = sqlite3.connect(db)
+    index = DedupeIndex(conn)
+    index.add("10.1/preprint", ABSTRACT)
+    index.add("10.1/article", REVISED)
+    index.add("10.1/other", OTHER)
+    conn.commit()
+    conn.close()
+
+    kept, dropped = collapse_duplicates(entries, db)
+    assert dropped == 1
+    assert [e["doi"] for e in kept] == ["10.1/other", "10.1/article", "10.1/unindexed"]
+
+
+def test_ingest_indexes_new_records(tmp_path, monkeypatch):
+    def work(doi, title, abstract):
+        words = abstract.split()
+        return {
+            "doi": f"https://doi.org/{doi}",
+            "display_name": title,
+            "publication_date": "2024-05-15",
+            "abstract_inverted_index": {w: [i] for i, w in enumerate(words) if w not in words[:i]},
+        }
+
+    works = [work("10.1/p", "Codebooks", ABSTRACT), work("10.1/j", "Codebooks", ABSTRACT)]
+    monkeypatch.setattr(ingest_openalex, "openalex_works", lambda *args, **kwargs: works)
+    source = ingest_openalex.Source("ieee_twc", "TWC", ["S1"])
+    ingest_openalex.ingest_source(source, tmp_path, None, None, "", None, "monday")
+
+    conn = sqlite3.connect(tmp_path / "index.sqlite")
+    groups = groups_for(conn, ["10.1/p", "10.1/j"])
+    assert groups["10.1/p"] == groups["10.1/j"]
@@ -0,0 +1,94 @@
+# tests/test_embed_papers.py
+import numpy as np
+
+from embed_papers import EmbeddingStore, embed_papers
+
+
+class FakeEmbeddingsAPI:
+    """Deterministic 4-d vectors derived from text length; records request sizes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def create_embeddings(self, *, model, input_text):
+        self.batches.append(len(input_text))
+        data = [
+            {"index": i, "embedding": [len(text), 1.0, float(i), 0.0]}
+            for i, text in enumerate(input_text)
+        ]
+        return {"data": list(reversed(data))}
+
+
+def paper(doi: str, abstract: str = "beamforming for mmWave") -> dict:
+    return {"doi": doi, "title": f"Title {doi}", "abstract": abstract}
+
+
+def test_embeds_in_batches_and_skips_unchanged(tmp_path):
+    api = FakeEmbeddingsAPI()
+    store = EmbeddingStore(tmp_path, "BAAI/bge-m3")
+    stats = embed_papers(store, [paper(f"10.1/{i}") for i in range(5)], api, batch_size=2)
+    assert stats == {"scanned": 5, "unchanged": 0, "embedded": 5}
+    assert api.batches == [2, 2, 1]
+
+    again = embed_papers(store, [paper(f"10.1/{i}") for i in range(5)], api, batch_size=2)
+    assert again["unchanged"] == 5
+    assert again["embedded"] == 0
+    assert api.batches == [2, 2, 1]
+    store.close()
+
+
+def test_changed_text_overwrites_row_in_place(tmp_path):
+    api = FakeEmbeddingsAPI()
+    store = EmbeddingStore(tmp_path, "m")
+    embed_papers(store, [paper("a"), paper("b")], api)
+    before, _ = store.vectors_for(["b"])
+    embed_papers(store, [paper("b", abstract="a much longer abstract about RIS")], api)
+    after, _ = store.vectors_for(["b"])
+    assert store.n_rows == 2
+    assert not np.allclose(before, after)
+    store.close()
+
+
+def test_reopened_store_memory_maps_normalized_vectors(tmp_path):
+    api = FakeEmbeddingsAPI()
+    store = EmbeddingStore(tmp_path, "m")
+    embed_papers(store, [paper("a"), paper("b"), paper("c")], api)
+    store.close()
+
+    reopened = EmbeddingStore(tmp_path, "m")
+    matrix = reopened.matrix()
+    assert isinstance(matrix, np.memmap)
+    assert matrix.dtype == np.float16
+    assert matrix.shape == (3, 4)
+    vectors, found = reopened.vectors_for(["c", "missing", "a"])
+    assert found == ["c", "a"]
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-3)
+    reopened.close()
+
+
+def test_models_are_stored_separately(tmp_path):
+    api = FakeEmbeddingsAPI()
+    first = EmbeddingStore(tmp_path, "model/one")
+    embed_papers(first, [paper("a")], api)
+    second = EmbeddingStore(tmp_path, "model/two")
+    stats = embed_papers(second, [paper("a")], api)
+    assert stats["embedded"] == 1
+    assert first.matrix_path != second.matrix_path
+    first.close()
+    second.close()
+
+
+def test_two_open_stores_append_without_clobbering_each_other(tmp_path):
+    api = FakeEmbeddingsAPI()
+    first = EmbeddingStore(tmp_path, "m")
+    second = EmbeddingStore(tmp_path, "m")
+    embed_papers(first, [paper("a"), paper("b")], api)
+    embed_papers(second, [paper("c", abstract="a different abstract")], api)
+    embed_papers(first, [paper("d", abstract="yet another abstract text")], api)
+    for store in (first, second):
+        vectors, found = store.vectors_for(["a", "b", "c", "d"])
+        assert found == ["a", "b", "c", "d"]
+        assert store.matrix().shape == (4, 4)
+    assert first.rows_for(["a", "b", "c", "d"]) == {"a": 0, "b": 1, "c": 2, "d": 3}
+    first.close()
+    second.close()
@@ -1,11 +1,15 @@
 # tests/test_generate_report.py
 import json
 import pytest
+from dataclasses import replace
 from pathlib import Path
 from datetime import date, timedelta
-from generate_report import load_weeks, load_papers
-from generate_report import truncate_abstract, build_payload
-from generate_report import inject_wiki_links
+from paper_corpus import load_weeks, load_papers
+from paper_corpus import truncate_abstract, build_payload
+from paper_corpus import load_payload_entries, load_week_entries, week_cache_path
+from generate_report import shard_entries, corpus_stats
+from payload_planner import estimate_tokens
+import generate_report as gr
 from generate_report import write_report
 from generate_report import (
     load_topic_registry,
@@ -99,6 +103,18 @@ def test_load_papers_does_not_cap_normal_week(tmp_path):
     assert len(result) == 90
 
 
+def test_load_papers_parallel_matches_sequential_order(tmp_path):
+    weeks = [
+        make_week(tmp_path, f"2025-01-{6 + 7 * w:02d}", [sample_paper(cited=w * 100 + i) for i in range(25)])
+        for w in range(3)
+    ]
+    (weeks[1] / "no_abstract.json").write_text(json.dumps({**sample_paper(), "abstract": ""}), encoding="utf-8")
+    sequential = load_papers(weeks, workers=1)
+    parallel = load_papers(weeks, workers=8)
+    assert parallel == sequential
+    assert len(parallel) == 75
+
+
 # --- truncate_abstract ---
 
 def test_truncate_short_abstract_unchanged():
@@ -149,43 +165,48 @@ def test_build_payload_replaces_pipes_in_title():
     assert "|" not in fields[0]  # title field has no stray pipes
 
 
-# --- inject_wiki_links ---
+# --- payload cache ---
 
-def test_inject_wiki_links_wraps_topic_headings():
-    md = "### 1. Integrated Sensing and Communication\nsome content"
-    result = inject_wiki_links(md)
-    assert "### 1. [[Integrated Sensing and Communication]]" in result
+def test_payload_entries_match_build_payload(tmp_path):
+    weeks = [
+        make_week(tmp_path, "2025-01-06", [sample_paper(cited=i) for i in range(5)]),
+        make_week(tmp_path, "2025-01-13", [sample_paper(cited=i) for i in range(400)]),
+    ]
+    entries = load_payload_entries(weeks, cap_count=300)
+    assert [e["line"] for e in entries] == build_payload(load_papers(weeks, cap_count=300)).split("\n")
+    assert all(week_cache_path(w).exists() for w in weeks)
 
 
-def test_inject_wiki_links_ignores_other_headings():
-    md = "## Summary\n### 1. My Topic\n## Trend Signals"
-    result = inject_wiki_links(md)
-    assert "## Summary" in result
-    assert "## Trend Signals" in result
-    assert "[[My Topic]]" in result
+def test_week_cache_is_reused_until_files_change(tmp_path):
+    week = make_week(tmp_path, "2025-01-06", [sample_paper(cited=1)])
+    load_week_entries(week)
+    cache_path = week_cache_path(week)
+    cached = json.loads(cache_path.read_text(encoding="utf-8"))
+    cached["entries"][0]["line"] = "from cache"
+    cache_path.write_text(json.dumps(cached), encoding="utf-8")
+    assert load_week_entries(week)[0]["line"] == "from cache"
+    assert load_week_entries(week, use_cache=False)[0]["line"] != "from cache"
 
+    (week / "paper_new.json").write_text(json.dumps(sample_paper(cited=2)), encoding="utf-8")
+    entries = load_week_entries(week)
+    assert len(entries) == 2
+    assert "from cache" not in [e["line"] for e in entries]
 
-def test_inject_wiki_links_handles_multiple_topics():
-    md = "### 1. Topic A\n### 2. Topic B\n### 3. Topic C"
-    result = inject_wiki_links(md)
-    assert "[[Topic A]]" in result
-    assert "[[Topic B]]" in result
-    assert "[[Topic C]]" in result
 
+def test_week_cache_keyed_on_truncation(tmp_path):
+    paper = {**sample_paper(), "abstract": " ".join(["word"] * 50)}
+    week = make_week(tmp_path, "2025-01-06", [paper])
+    long_line = load_week_entries(week, max_words=300)[0]["line"]
+    short_line = load_week_entries(week, max_words=10)[0]["line"]
+    assert short_line.endswith("...")
+    assert long_line != short_line
 
-def test_inject_wiki_links_wraps_quoted_paper_titles():
-    md = '- **Representative papers:** "Deep Learning for Beamforming in mmWave" (TWC, 8 citations)'
-    result = inject_wiki_links(md)
-    assert "[[Deep Learning for Beamforming in mmWave]]" in result
-    assert '"Deep Learning for Beamforming in mmWave"' not in result
 
+# --- wrap_topic_headings ---
 
-def test_inject_wiki_links_ignores_short_quoted_strings():
-    # Short quoted strings (< 10 chars) should not be wrapped
-    md = 'The method is "optimal" in this case.'
-    result = inject_wiki_links(md)
-    assert '"optimal"' in result
-    assert "[[optimal]]" not in result
+def test_wrap_topic_headings_wraps_numbered_topic_headings():
+    md = "## Summary\n### 1. Topic A\n### 2. [[Topic B]]\n## Trend Signals"
+    assert gr.wrap_topic_headings(md) == "## Summary\n### 1. [[Topic A]]\n### 2. [[Topic B]]\n## Trend Signals"
 
 
 
@@ -311,3 +332,190 @@ def test_update_topic_registry_deduplicates(tmp_path):
     update_topic_registry(path, ["ISAC", "RIS"])
     data = json.loads(path.read_text())
     assert data["topics"].count("ISAC") == 1
+
+
+# --- map-reduce ---
+
+def payload_entries_for(papers: list[tuple[str, str]]) -> list[dict]:
+    return [
+        {"week": week, "venue_id": venue, "cited_by_count": 0, "published": week, "line": f"T{i} | {venue} | {week[:7]} | 0 | abs"}
+        for i, (week, venue) in enumerate(papers)
+    ]
+
+
+def test_shard_entries_by_week_and_venue():
+    entries = payload_entries_for([("2025-01-13", "twc"), ("2025-01-06", "jsac"), ("2025-01-13", "jsac")])
+    by_week = shard_entries(entries, "week")
+    assert [label for label, _ in by_week] == ["week of 2025-01-06", "week of 2025-01-13"]
+    assert [len(shard) for _, shard in by_week] == [1, 2]
+    by_venue = shard_entries(entries, "venue")
+    assert [label for label, _ in by_venue] == ["venue jsac", "venue twc"]
+
+
+def test_corpus_stats_counts_weeks_and_venues():
+    stats = corpus_stats(payload_entries_for([("2025-01-06", "twc"), ("2025-01-06", "twc"), ("2025-01-13", "jsac")]))
+    assert "Total papers: 3" in stats
+    assert "2025-01-06: 2" in stats
+    assert "twc: 2, jsac: 1" in stats
+
+
+def test_map_reduce_calls_each_shard_then_reduces(monkeypatch):
+    import siliconflow_api
+
+    calls = []
+
+    def fake_chat(client, messages, max_tokens=8192, **kwargs):
+        calls.append((max_tokens, messages[1]["content"]))
+        if max_tokens == gr.MAP_MAX_TOKENS:
+            return "### Topic\n- Papers: 1"
+        return "# Digest"
+
+    monkeypatch.setattr(siliconflow_api, "build_openai_client", lambda **kwargs: object())
+    monkeypatch.setattr(gr, "chat_completion", fake_chat)
+    entries = payload_entries_for([("2025-01-06", "twc"), ("2025-01-13", "jsac"), ("2025-01-20", "twc")])
+    result = gr.call_llm_map_reduce(entries, "TEMPLATE", 3, "key", shard_by="week", concurrency=2)
+
+    assert result == "# Digest"
+    map_calls = [c for c in calls if c[0] == gr.MAP_MAX_TOKENS]
+    assert len(map_calls) == 3
+    reduce_prompt = calls[-1][1]
+    assert reduce_prompt.count("=== week of") == 3
+    assert "TEMPLATE" in reduce_prompt
+
+
+def test_map_reduce_gives_each_shard_the_whole_budget(monkeypatch):
+    import siliconflow_api
+
+    prompts = []
+
+    def fake_chat(client, messages, max_tokens=8192, **kwargs):
+        if max_tokens == gr.MAP_MAX_TOKENS:
+            prompts.append(sum(estimate_tokens(m["content"]) for m in messages))
+        return "### Topic"
+
+    monkeypatch.setattr(siliconflow_api, "build_openai_client", lambda **kwargs: object())
+    monkeypatch.setattr(gr, "chat_completion", fake_chat)
+    weeks = ["2025-01-06", "2025-01-13", "2025-01-20"]
+    entries = [
+        {"week": w, "venue_id": "twc", "cited_by_count": i, "published": w,
+         "line": f"T{i} | twc | {w[:7]} | {i} | " + "abstract words " * 200}
+        for i in range(30) for w in [weeks[i % 3]]
+    ]
+    budget = 6000
+    gr.call_llm_map_reduce(entries, "TEMPLATE", 3, "key", shard_by="week", token_budget=budget)
+    assert len(prompts) == 3
+    assert all(budget // 3 < tokens <= budget for tokens in prompts)
+
+
+def test_map_reduce_combines_summaries_until_the_reduce_prompt_fits(monkeypatch):
+    import siliconflow_api
+
+    calls = []
+
+    def fake_chat(client, messages, max_tokens=8192, **kwargs):
+        kind = "map" if "--- PAPERS ---" in messages[1]["content"] else "combine"
+        calls.append((kind if max_tokens == gr.MAP_MAX_TOKENS else "reduce", messages))
+        return "### Topic\n" + "summary words " * 500 if max_tokens == gr.MAP_MAX_TOKENS else "# Digest"
+
+    monkeypatch.setattr(siliconflow_api, "build_openai_client", lambda **kwargs: object())
+    monkeypatch.setattr(gr, "chat_completion", fake_chat)
+    weeks = [(date(2025, 1, 6) + timedelta(weeks=i)).isoformat() for i in range(20)]
+    entries = [
+        {"week": w, "venue_id": "twc", "cited_by_count": 1, "published": w, "line": f"T | twc | {w[:7]} | 1 | words"}
+        for w in weeks
+    ]
+    budget = 8000
+    assert gr.call_llm_map_reduce(entries, "TEMPLATE", 20, "key", shard_by="week", token_budget=budget) == "# Digest"
+    kinds = [kind for kind, _ in calls]
+    assert kinds.count("map") == 20 and "combine" in kinds and kinds[-1] == "reduce"
+    for _, messages in calls:
+        assert sum(estimate_tokens(m["content"]) for m in messages) <= budget
+    with pytest.raises(ValueError):
+        gr.call_llm_map_reduce(entries, "TEMPLATE", 20, "key", shard_by="week", token_budget=1500)
+
+
+# --- multi-spec runs ---
+
+def spec_defaults(tmp_path: Path) -> gr.ReportSpec:
+    template = tmp_path / "template.md"
+    template.write_text("TEMPLATE", encoding="utf-8")
+    return gr.ReportSpec(gr.REPORT_NAME, 4, template, 0)
+
+
+def test_load_report_specs_fill_defaults_and_reject_mistakes(tmp_path):
+    defaults = spec_defaults(tmp_path)
+    path = tmp_path / "specs.json"
+    path.write_text(json.dumps([{"name": "wireless-digest"}, {"name": "twc-12w", "weeks": 12, "venues": ["ieee_twc"]}]))
+    digest, twc = gr.load_report_specs(path, defaults)
+    assert digest == defaults
+    assert (twc.weeks, twc.venues, twc.template, twc.filtered) == (12, ("ieee_twc",), defaults.template, True)
+
+    for bad in (
+        [{"name": "a", "week": 4}],
+        [{"name": "a"}, {"name": "a"}],
+        [{"name": "../a"}],
+        [{"name": "a", "min_relevance": 1}],
+        [{"name": "a", "weeks": "4"}],
+        [{"name": "a", "weeks": True}],
+        [{"name": "a", "token_budget": 1.5}],
+        [{"name": "a", "keywords": "k.txt", "min_relevance": "high"}],
+        [{"name": "a", "venues": "ieee_twc"}],
+        [{"name": "a", "venues": [1]}],
+        [{"name": 7}],
+        [],
+    ):
+        path.write_text(json.dumps(bad))
+        with pytest.raises(ValueError):
+            gr.load_report_specs(path, defaults)
+
+
+def test_spec_reports_share_one_load_and_run_concurrently(tmp_path, monkeypatch):
+    import siliconflow_api
+
+    weeks_dir = tmp_path / "by_publication_week"
+    weeks_dir.mkdir()
+    recent = [(date.today() - timedelta(weeks=w)).isoformat() for w in (10, 1)]
+    for week, venue in zip(recent, ("ieee_jsac", "ieee_twc")):
+        paper = dict(sample_paper(), venue_id=venue, title=f"Paper in {venue}", doi=f"10.1/{venue}")
+        make_week(weeks_dir, week, [paper])
+
+    import paper_corpus
+
+    loads = []
+    original_load = paper_corpus.load_week_entries
+    monkeypatch.setattr(
+        paper_corpus, "load_week_entries", lambda d, *a, **k: loads.append(d.name) or original_load(d, *a, **k)
+    )
+    prompts = {}
+
+    def fake_chat(client, messages, max_tokens=8192, model=None, **kwargs):
+        if model == "broken":
+            raise RuntimeError("boom")
+        prompts[model] = messages[1]["content"]
+        return "### 1. Beam Codebooks\n"
+
+    monkeypatch.setattr(siliconflow_api, "build_openai_client", lambda **kwargs: object())
+    monkeypatch.setattr(gr, "chat_completion", fake_chat)
+    defaults = spec_defaults(tmp_path)
+    specs = [
+        defaults,
+        replace(defaults, name="trends-12w", weeks=12, model="m12"),
+        replace(defaults, name="twc-only", weeks=12, venues=("ieee_twc",), model="twc"),
+        replace(defaults, name="failing", model="broken"),
+    ]
+    written, failures = gr.generate_spec_reports(
+        specs, tmp_path, tmp_path / "reports", "key", concurrency=3, date_str="2025-06-02"
+    )
+
+    assert sorted(loads) == sorted(recent)
+    assert [path.name for _, path in written] == [
+        "2025-06-02-wireless-digest.md",
+        "2025-06-02-trends-12w.md",
+        "2025-06-02-twc-only.md",
+    ]
+    assert [spec.name for spec, _ in failures] == ["failing"]
+    assert "Paper in ieee_jsac" not in prompts[None] and "Paper in ieee_twc" in prompts[None]
+    assert "Paper in ieee_jsac" in prompts["m12"]
+    assert "Paper in ieee_jsac" not in prompts["twc"]
+    assert (tmp_path / "reports" / "2025-06-02-trends-12w.md").read_text() == "### 1. [[Beam Codebooks]]\n"
+    assert load_topic_registry(tmp_path / "topic_registry.json") == ["Beam Codebooks"]
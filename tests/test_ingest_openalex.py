@@ -0,0 +1,75 @@
+# tests/test_ingest_openalex.py
+import json
+
+from ingest_openalex import connect_index, file_lock, load_last_run, save_last_run, write_text_atomic
+
+
+# --- file_lock ---
+
+def test_file_lock_excludes_second_holder(tmp_path):
+    lock_path = tmp_path / "locks" / "ieee_twc.lock"
+    with file_lock(lock_path, timeout=0) as first:
+        assert first
+        with file_lock(lock_path, timeout=0) as second:
+            assert not second
+    with file_lock(lock_path, timeout=0) as again:
+        assert again
+
+
+def test_file_lock_separate_venues_do_not_block(tmp_path):
+    with file_lock(tmp_path / "a.lock", timeout=0) as a:
+        with file_lock(tmp_path / "b.lock", timeout=0) as b:
+            assert a and b
+
+
+# --- save_last_run ---
+
+def test_save_last_run_merges_venue_dates(tmp_path):
+    path = tmp_path / "last_run.json"
+    save_last_run(path, "2026-03-01", ["ieee_twc"])
+    save_last_run(path, "2026-03-02", ["ieee_jsac"])
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["last_run_date"] == "2026-03-02"
+    assert data["venues"] == {"ieee_twc": "2026-03-01", "ieee_jsac": "2026-03-02"}
+
+
+def test_partial_run_keeps_global_date_and_venues_read_their_own(tmp_path):
+    path = tmp_path / "last_run.json"
+    save_last_run(path, "2026-03-01", ["ieee_twc", "ieee_jsac"])
+    save_last_run(path, "2026-03-08", ["ieee_twc"], advance_global=False)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["last_run_date"] == "2026-03-01"
+    assert load_last_run(path, "ieee_twc") == "2026-03-08"
+    assert load_last_run(path, "ieee_jsac") == "2026-03-01"
+    assert load_last_run(path, "ieee_tcom") == "2026-03-01"  # no date of its own
+
+
+def test_partial_first_run_leaves_no_global_date(tmp_path):
+    path = tmp_path / "last_run.json"
+    save_last_run(path, "2026-03-01", ["ieee_twc"], advance_global=False)
+    assert "last_run_date" not in json.loads(path.read_text(encoding="utf-8"))
+    assert load_last_run(path, "ieee_jsac") is None
+
+
+def test_save_last_run_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "last_run.json"
+    save_last_run(path, "2026-03-01")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["last_run.json", "last_run.json.lock"]
+
+
+def test_write_text_atomic_replaces_content(tmp_path):
+    path = tmp_path / "record.json"
+    path.write_text("old", encoding="utf-8")
+    write_text_atomic(path, "new")
+    assert path.read_text(encoding="utf-8") == "new"
+
+
+# --- connect_index ---
+
+def test_connect_index_uses_wal_and_busy_timeout(tmp_path):
+    conn = connect_index(tmp_path / "index.sqlite")
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    finally:
+        conn.close()
@@ -0,0 +1,139 @@
+# tests/test_label_papers.py
+import json
+import sqlite3
+from datetime import date
+from types import SimpleNamespace
+
+import label_papers as lp
+from ingest_openalex import ensure_papers_table
+
+
+def make_index(tmp_path, rows):
+    conn = sqlite3.connect(tmp_path / "index.sqlite")
+    ensure_papers_table(conn)
+    conn.executemany(
+        "INSERT INTO papers (doi, title, venue_id, published) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    lp.ensure_topics_table(conn)
+    return conn
+
+
+class FakeLabelClient:
+    """Labels every paper in a prompt with a topic derived from its title."""
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        user = kwargs["messages"][1]["content"]
+        self.prompts.append(user)
+        lines = [line for line in user.split("Papers (id | title | abstract):\n", 1)[1].splitlines() if line]
+        out = []
+        for line in lines:
+            idx, title = line.split(" | ")[:2]
+            out.append(json.dumps({"id": int(idx), "topic": "ISAC" if "sensing" in title else "RIS"}))
+        message = SimpleNamespace(content="```json\n" + "\n".join(out) + "\n```")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+
+ROWS = [
+    ("10.1/a", "Joint sensing and comms", "ieee_twc", "2025-03-04"),
+    ("10.1/b", "RIS phase design", "ieee_jsac", "2025-03-05"),
+    ("10.1/c", "Radar sensing waveforms", "ieee_twc", "2025-03-12"),
+    ("10.1/d", "RIS channel estimation", "ieee_twc", "2025-03-13"),
+    ("10.1/e", "Untitled", "ieee_twc", "2025-03"),
+]
+
+
+def test_labels_only_unlabeled_papers_in_multi_paper_prompts(tmp_path):
+    conn = make_index(tmp_path, ROWS)
+    client = FakeLabelClient()
+    papers = lp.unlabeled_papers(conn)
+    stats = lp.label_with_chat(conn, papers, client, "m", papers_per_prompt=2, concurrency=2)
+    assert stats == {"prompts": 3, "labeled": 5, "missing": 0}
+    assert len(client.prompts) == 3
+    assert dict(conn.execute("SELECT doi, topic FROM paper_topics"))["10.1/c"] == "ISAC"
+
+    assert lp.unlabeled_papers(conn) == []
+    conn.execute("INSERT INTO papers (doi, title, venue_id, published) VALUES ('10.1/f', 'New', 'ieee_twc', '2025-03-14')")
+    assert [p["doi"] for p in lp.unlabeled_papers(conn)] == ["10.1/f"]
+
+
+def test_parse_labels_skips_malformed_and_out_of_range_ids():
+    text = '{"id": 1, "topic": " RIS  Design "}\nnot json {"id": "x"}\n{"id": 9, "topic": "Other"}\n{"id": 2, "topic": ""}'
+    assert lp.parse_labels(text, 3) == {1: "RIS Design"}
+
+
+def test_topic_matrix_by_week_and_venue(tmp_path):
+    conn = make_index(tmp_path, ROWS)
+    lp.store_labels(conn, [("10.1/a", "ISAC"), ("10.1/b", "RIS"), ("10.1/c", "ISAC"), ("10.1/d", "RIS"), ("10.1/e", "RIS")], "m")
+
+    weekly = lp.topic_matrix(conn, by="week")
+    assert weekly.keys == ["2025-03-03", "2025-03-10"]
+    assert weekly.topics == ["ISAC", "RIS"]
+    assert weekly.counts == [[1, 1], [1, 1]]
+
+    sunday = lp.topic_matrix(conn, by="week", week_start_day="sunday")
+    assert sunday.keys == ["2025-03-02", "2025-03-09"]
+
+    venues = lp.topic_matrix(conn, by="venue", since="2025-03-10")
+    assert venues.keys == ["ieee_twc"]
+    assert venues.counts == [[1], [1]]
+    table = lp.render_matrix(venues, by="venue")
+    assert "| Topic | TWC | Total |" in table
+    assert "| ISAC | 1 | 1 |" in table
+
+
+def test_batch_submit_and_collect(tmp_path):
+    conn = make_index(tmp_path, ROWS[:3])
+    pending_path = tmp_path / lp.PENDING_BATCHES_FILE
+    submitted = {}
+
+    class FakeBatchAPI:
+        def upload_batch_file(self, *, file_path):
+            submitted["lines"] = [json.loads(line) for line in file_path.read_text(encoding="utf-8").splitlines()]
+            return {"id": "file-1"}
+
+        def create_batch(self, *, input_file_id, metadata=None):
+            return {"id": "batch-1"}
+
+        def get_batch(self, *, batch_id):
+            return {"status": "completed", "output_file_id": "out-1"}
+
+        def get_file_content(self, *, file_id):
+            out = []
+            for line in submitted["lines"]:
+                content = "\n".join(json.dumps({"id": i, "topic": "T"}) for i in range(1, 3))
+                body = {"choices": [{"message": {"content": content}}]}
+                out.append(json.dumps({"custom_id": line["custom_id"], "response": {"body": body}}))
+            return "\n".join(out)
+
+    papers = lp.unlabeled_papers(conn)
+    assert lp.submit_batch(FakeBatchAPI(), papers, "m", pending_path, papers_per_prompt=2) == "batch-1"
+    assert [line["custom_id"] for line in submitted["lines"]] == ["labels-0", "labels-1"]
+    assert lp.unlabeled_papers(conn, exclude=lp.pending_dois(lp.load_pending(pending_path))) == []
+
+    stats = lp.collect_batches(conn, FakeBatchAPI(), pending_path)
+    assert stats["completed"] == 1
+    assert stats["labeled"] == 3
+    assert lp.load_pending(pending_path) == {}
+    assert conn.execute("SELECT COUNT(*) FROM paper_topics").fetchone()[0] == 3
+
+
+def test_window_start_covers_current_week():
+    assert lp.window_start(2, today=date(2025, 3, 13)) == "2025-03-03"
+
+
+def test_attach_abstracts_skips_papers_without_one(tmp_path):
+    weeks = tmp_path / "by_publication_week"
+    week = weeks / "2025-03-03"
+    week.mkdir(parents=True)
+    for doi, abstract in (("10.1/a", "Joint radar and communication waveforms."), ("10.1/b", "  ")):
+        record = {"doi": doi, "title": "T", "abstract": abstract}
+        (week / f"{doi.replace('/', '_')}.json").write_text(json.dumps(record), encoding="utf-8")
+    papers = [{"doi": d, "title": "T", "published": "2025-03-04"} for d in ("10.1/a", "10.1/b", "10.1/missing")]
+    found = lp.attach_abstracts(papers, weeks)
+    assert [(p["doi"], p["abstract"]) for p in found] == [("10.1/a", "Joint radar and communication waveforms.")]
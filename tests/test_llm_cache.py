@@ -0,0 +1,209 @@
+# tests/test_llm_cache.py
+import json
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import generate_report as gr
+import pdf_to_markdown as p2m
+from llm_cache import CONTINUE_PROMPT, LLMCache, cache_key, chat_completion
+
+
+class FakeClient:
+    def __init__(self, content: str = "answer"):
+        self.calls = 0
+        self.content = content
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_cache_key_depends_on_model_messages_and_params():
+    base = cache_key("m", MESSAGES, max_tokens=10, temperature=0)
+    assert base == cache_key("m", MESSAGES, temperature=0, max_tokens=10)
+    assert base != cache_key("m2", MESSAGES, max_tokens=10, temperature=0)
+    assert base != cache_key("m", [{"role": "user", "content": "hello"}], max_tokens=10, temperature=0)
+    assert base != cache_key("m", MESSAGES, max_tokens=11, temperature=0)
+
+
+def test_get_or_create_calls_once(tmp_path):
+    cache = LLMCache(tmp_path)
+    calls = []
+    create = lambda: calls.append(1) or "result"
+    assert cache.get_or_create("m", MESSAGES, create, max_tokens=5) == "result"
+    assert cache.get_or_create("m", MESSAGES, create, max_tokens=5) == "result"
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def age_entry(cache: LLMCache, key: str, seconds: float) -> None:
+    path = cache.path_for(key)
+    record = json.loads(path.read_text(encoding="utf-8"))
+    record["created"] -= seconds
+    path.write_text(json.dumps(record), encoding="utf-8")
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    cache = LLMCache(tmp_path, ttl_seconds=60)
+    key = cache_key("m", MESSAGES)
+    cache.put(key, "old")
+    age_entry(cache, key, 120)
+    assert cache.get(key) is None
+    assert not cache.path_for(key).exists()
+
+
+def test_hits_do_not_extend_ttl(tmp_path):
+    cache = LLMCache(tmp_path, ttl_seconds=60)
+    key = cache_key("m", MESSAGES)
+    cache.put(key, "hot")
+    age_entry(cache, key, 50)
+    assert cache.get(key) == "hot"  # refreshes mtime for LRU only
+    age_entry(cache, key, 20)
+    assert cache.get(key) is None
+
+
+def test_put_rescans_only_periodically(tmp_path, monkeypatch):
+    import llm_cache
+
+    cache = LLMCache(tmp_path)
+    scans = []
+    real_evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or real_evict())
+    for i in range(llm_cache.EVICT_SCAN_EVERY + 1):
+        cache.put(cache_key("m", MESSAGES, n=i), "x")
+    assert len(scans) == 2  # first write, then after EVICT_SCAN_EVERY more
+    cache.max_bytes = 1
+    cache.put(cache_key("m", MESSAGES, n=-1), "x" * 100)
+    assert len(scans) == 3  # over max_bytes: scan immediately
+
+
+def test_size_eviction_drops_least_recently_used(tmp_path):
+    cache = LLMCache(tmp_path, max_bytes=0)
+    keys = [cache_key("m", MESSAGES, n=i) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 200)
+        stamp = time.time() - 100 + i
+        os.utime(cache.path_for(key), (stamp, stamp))
+    cache.max_bytes = sum(cache.path_for(k).stat().st_size for k in keys[1:])
+    assert cache.evict() == 1
+    assert not cache.path_for(keys[0]).exists()
+    assert cache.path_for(keys[2]).exists()
+
+
+def test_chat_completion_reuses_cached_response(tmp_path):
+    client = FakeClient("digest")
+    cache = LLMCache(tmp_path)
+    assert chat_completion(client, MESSAGES, model="m", cache=cache) == "digest"
+    assert chat_completion(client, MESSAGES, model="m", cache=cache) == "digest"
+    assert chat_completion(client, MESSAGES, model="m") == "digest"
+    assert client.calls == 2
+
+
+def test_call_ocr_once_uses_cache(tmp_path):
+    chunk = tmp_path / "chunk.pdf"
+    chunk.write_bytes(b"%PDF-1.4 fake")
+    client = FakeClient("page\r\ntext")
+    cache = LLMCache(tmp_path / "cache")
+    for _ in range(2):
+        out = p2m.call_ocr_once(client=client, model="ocr", timeout_seconds=5, chunk_pdf=chunk, cache=cache)
+        assert out == "page\ntext"
+    assert client.calls == 1
+    assert len(list(Path(tmp_path / "cache").glob("*/*.json"))) == 1
+
+
+# --- streaming ---
+
+class FakeStreamClient:
+    """Streams the given pieces, optionally raising after fail_after events."""
+
+    def __init__(self, pieces: list[str], fail_after: int | None = None, finish_reason: str = "stop"):
+        self.pieces = pieces
+        self.fail_after = fail_after
+        self.finish_reason = finish_reason
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        assert kwargs["stream"] is True
+
+        def events():
+            for i, piece in enumerate(self.pieces):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise ConnectionError("stream dropped")
+                last = i == len(self.pieces) - 1
+                choice = SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=self.finish_reason if last else None)
+                yield SimpleNamespace(choices=[choice])
+
+        return events()
+
+
+def test_stream_writes_partial_and_returns_text(tmp_path):
+    partial = tmp_path / "r.md.partial"
+    client = FakeStreamClient(["# Dig", "est\n", "body"])
+    text = chat_completion(client, MESSAGES, model="m", partial_path=partial)
+    assert text == "# Digest\nbody"
+    assert partial.read_text(encoding="utf-8") == text
+
+
+def test_failed_stream_resumes_with_continuation(tmp_path):
+    import pytest
+
+    partial = tmp_path / "r.md.partial"
+    failing = FakeStreamClient(["# Digest\n", "## Hot", " Topics"], fail_after=2)
+    with pytest.raises(ConnectionError):
+        chat_completion(failing, MESSAGES, model="m", partial_path=partial)
+    assert partial.read_text(encoding="utf-8") == "# Digest\n## Hot"
+
+    resumed = FakeStreamClient([" Topics\n", "done"])
+    text = chat_completion(resumed, MESSAGES, model="m", partial_path=partial, resume=True)
+    assert text == "# Digest\n## Hot Topics\ndone"
+    sent = resumed.requests[0]["messages"]
+    assert sent[:1] == MESSAGES
+    assert sent[1] == {"role": "assistant", "content": "# Digest\n## Hot"}
+    assert sent[2]["content"] == CONTINUE_PROMPT
+
+
+def test_resume_ignores_partial_from_other_prompt(tmp_path):
+    partial = tmp_path / "r.md.partial"
+    chat_completion(FakeStreamClient(["old"]), MESSAGES, model="m", partial_path=partial)
+    fresh = FakeStreamClient(["new"])
+    other = [{"role": "user", "content": "different"}]
+    assert chat_completion(fresh, other, model="m", partial_path=partial, resume=True) == "new"
+    assert len(fresh.requests[0]["messages"]) == 1
+
+
+def test_streamed_result_is_cached(tmp_path):
+    cache = LLMCache(tmp_path / "cache")
+    partial = tmp_path / "r.md.partial"
+    client = FakeStreamClient(["cached ", "text"])
+    chat_completion(client, MESSAGES, model="m", cache=cache, partial_path=partial)
+    chat_completion(client, MESSAGES, model="m", cache=cache, partial_path=partial)
+    assert len(client.requests) == 1
+
+
+def test_stream_cut_at_max_tokens_is_kept_as_partial(tmp_path):
+    import pytest
+
+    cache = LLMCache(tmp_path / "cache")
+    partial = tmp_path / "r.md.partial"
+    client = FakeStreamClient(["# Digest\n", "## Hot"], finish_reason="length")
+    with pytest.raises(ValueError, match="incomplete"):
+        chat_completion(client, MESSAGES, model="m", cache=cache, partial_path=partial)
+    assert partial.read_text(encoding="utf-8") == "# Digest\n## Hot"
+    assert not list((tmp_path / "cache").glob("*/*.json"))
+
+
+def test_find_partial_reuses_leftovers_only_with_resume(tmp_path):
+    leftover = tmp_path / f"2026-03-01-{gr.REPORT_NAME}.md{gr.PARTIAL_SUFFIX}"
+    leftover.write_text("old", encoding="utf-8")
+    today = tmp_path / f"2026-03-02-{gr.REPORT_NAME}.md{gr.PARTIAL_SUFFIX}"
+    assert gr.find_partial(tmp_path, "2026-03-02") == today
+    assert gr.find_partial(tmp_path, "2026-03-02", resume=True) == leftover
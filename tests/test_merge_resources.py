@@ -0,0 +1,147 @@
+# tests/test_merge_resources.py
+import json
+import sqlite3
+from pathlib import Path
+
+from dedupe import DedupeIndex, groups_for
+from ingest_openalex import ensure_papers_table
+from label_papers import ensure_topics_table, store_labels
+from merge_resources import merge_resources
+
+
+def make_shard(root: Path, name: str, rows: list[tuple], records: dict[str, list[str]], last_run: str | None = None) -> Path:
+    shard = root / name
+    shard.mkdir()
+    conn = sqlite3.connect(shard / "index.sqlite")
+    ensure_papers_table(conn)
+    conn.executemany(
+        "INSERT INTO papers (doi, title, venue_id, venue_name, published, url, source_url, fetched_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    for week, names in records.items():
+        week_dir = shard / "by_publication_week" / week
+        week_dir.mkdir(parents=True)
+        for file_name in names:
+            (week_dir / file_name).write_text(json.dumps({"doi": file_name}), encoding="utf-8")
+    if last_run:
+        (shard / "last_run.json").write_text(json.dumps({"last_run_date": last_run}), encoding="utf-8")
+    return shard
+
+
+def row(doi: str, title: str = "T", venue: str = "ieee_twc", fetched_at: str = "2026-01-01T00:00:00") -> tuple:
+    return (doi, title, venue, "Venue", "2025-02-10", "u", "openalex", fetched_at)
+
+
+def read_papers(resource_dir: Path) -> dict[str, tuple]:
+    conn = sqlite3.connect(resource_dir / "index.sqlite")
+    try:
+        return {r[0]: r for r in conn.execute("SELECT doi, title, venue_id, fetched_at FROM papers")}
+    finally:
+        conn.close()
+
+
+def test_merge_unions_rows_and_records(tmp_path):
+    a = make_shard(tmp_path, "a", [row("10.1/a")], {"2025-02-10": ["10.1_a.json"]})
+    b = make_shard(tmp_path, "b", [row("10.1/b", venue="ieee_jsac")], {"2025-02-17": ["10.1_b.json"]})
+    dest = tmp_path / "merged"
+    stats = merge_resources(dest, [a, b])
+    assert set(read_papers(dest)) == {"10.1/a", "10.1/b"}
+    assert (dest / "by_publication_week" / "2025-02-10" / "10.1_a.json").exists()
+    assert (dest / "by_publication_week" / "2025-02-17" / "10.1_b.json").exists()
+    assert stats.rows_inserted == 2
+    assert stats.files_linked + stats.files_copied == 2
+
+
+def test_merge_doi_conflict_fills_blanks_and_keeps_earliest_fetch(tmp_path):
+    a = make_shard(tmp_path, "a", [row("10.1/x", title="", fetched_at="2026-02-01T00:00:00")], {})
+    b = make_shard(tmp_path, "b", [row("10.1/x", title="Real Title", fetched_at="2026-01-15T00:00:00")], {})
+    dest = tmp_path / "merged"
+    stats = merge_resources(dest, [a, b])
+    merged = read_papers(dest)["10.1/x"]
+    assert merged[1] == "Real Title"
+    assert merged[3] == "2026-01-15T00:00:00"
+    assert stats.rows_conflicted == 1
+
+
+def test_merge_is_idempotent(tmp_path):
+    a = make_shard(tmp_path, "a", [row("10.1/a")], {"2025-02-10": ["10.1_a.json"]})
+    dest = tmp_path / "merged"
+    merge_resources(dest, [a])
+    first = read_papers(dest)
+    stats = merge_resources(dest, [a])
+    assert read_papers(dest) == first
+    assert stats.rows_inserted == 0
+    assert stats.files_skipped_exists == 1
+
+
+def test_merge_keeps_earliest_last_run_and_unions_topics(tmp_path):
+    a = make_shard(tmp_path, "a", [], {}, last_run="2026-03-01")
+    b = make_shard(tmp_path, "b", [], {}, last_run="2026-02-20")
+    (a / "topic_registry.json").write_text('{"topics": ["ISAC", "RIS"]}', encoding="utf-8")
+    (b / "topic_registry.json").write_text('{"topics": ["RIS", "NTN"]}', encoding="utf-8")
+    dest = tmp_path / "merged"
+    merge_resources(dest, [a, b])
+    assert json.loads((dest / "last_run.json").read_text())["last_run_date"] == "2026-02-20"
+    assert json.loads((dest / "topic_registry.json").read_text())["topics"] == ["ISAC", "RIS", "NTN"]
+
+
+def test_merge_keeps_earliest_date_per_venue(tmp_path):
+    a = make_shard(tmp_path, "a", [], {})
+    b = make_shard(tmp_path, "b", [], {})
+    dest = tmp_path / "merged"
+    dest.mkdir()
+    (a / "last_run.json").write_text(json.dumps(
+        {"last_run_date": "2026-01-01", "venues": {"ieee_twc": "2026-03-01", "ieee_jsac": "2026-02-01"}}))
+    (b / "last_run.json").write_text(json.dumps({"venues": {"ieee_tcom": "2026-03-08"}}))
+    (dest / "last_run.json").write_text(json.dumps({"last_run_date": "2026-02-15", "venues": {"ieee_jsac": "2026-03-02"}}))
+    assert merge_resources(dest, [a, b]).files_scanned == 0
+    data = json.loads((dest / "last_run.json").read_text())
+    assert data["last_run_date"] == "2026-01-01"
+    assert data["venues"] == {"ieee_twc": "2026-03-01", "ieee_jsac": "2026-02-01", "ieee_tcom": "2026-03-08"}
+
+
+def test_merge_move_mode_removes_source_records(tmp_path):
+    a = make_shard(tmp_path, "a", [row("10.1/a")], {"2025-02-10": ["10.1_a.json"]})
+    dest = tmp_path / "merged"
+    stats = merge_resources(dest, [a], mode="move")
+    assert stats.files_moved == 1
+    assert not (a / "by_publication_week" / "2025-02-10" / "10.1_a.json").exists()
+    assert (dest / "by_publication_week" / "2025-02-10" / "10.1_a.json").exists()
+
+
+def test_merge_reindexes_duplicates_and_unions_topic_labels(tmp_path):
+    abstract = "hierarchical beam codebook for uav millimeter wave links that adapts the beam width to uncertainty"
+    a = make_shard(tmp_path, "a", [row("10.1/preprint")], {})
+    b = make_shard(tmp_path, "b", [row("10.1/article"), row("10.1/other")], {})
+    for shard, papers in ((a, {"10.1/preprint": abstract}),
+                          (b, {"10.1/article": abstract + " in practice", "10.1/other": "federated learning"})):
+        conn = sqlite3.connect(shard / "index.sqlite")
+        index = DedupeIndex(conn)
+        for doi, text in papers.items():
+            index.add(doi, text)
+        ensure_topics_table(conn)
+        conn.commit()
+        conn.close()
+    conn = sqlite3.connect(a / "index.sqlite")
+    store_labels(conn, [("10.1/preprint", "mmWave")], "local:nb")
+    conn.close()
+    conn = sqlite3.connect(b / "index.sqlite")
+    store_labels(conn, [("10.1/preprint", "Beam Management"), ("10.1/other", "FL")], "llm")
+    conn.close()
+
+    dest = tmp_path / "merged"
+    stats = merge_resources(dest, [a, b])
+    assert stats.signatures_added == 3
+    conn = sqlite3.connect(dest / "index.sqlite")
+    try:
+        groups = groups_for(conn, ["10.1/preprint", "10.1/article", "10.1/other"])
+        assert groups["10.1/preprint"] == groups["10.1/article"] != groups["10.1/other"]
+        assert conn.execute("SELECT COUNT(DISTINCT doi) FROM lsh_buckets").fetchone()[0] == 3
+        labels = dict(conn.execute("SELECT doi, topic FROM paper_topics"))
+    finally:
+        conn.close()
+    assert labels == {"10.1/preprint": "Beam Management", "10.1/other": "FL"}  # the later label wins
+    assert merge_resources(dest, [a, b]).signatures_added == 0
@@ -0,0 +1,228 @@
+# tests/test_organize_by_publication_date.py
+import json
+import os
+from pathlib import Path
+
+from organize_by_publication_date import (
+    Journal,
+    Stats,
+    iter_json_files,
+    load_record_fields,
+    organize,
+    read_head_fields,
+)
+
+
+def write_record(root: Path, rel: str, record: dict) -> Path:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(record), encoding="utf-8")
+    return path
+
+
+def make_legacy_tree(root: Path, n: int = 6) -> None:
+    for i in range(n):
+        write_record(
+            root,
+            f"2026-01-0{i % 3 + 1}/paper_{i}.json",
+            {"doi": f"10.1/p{i}", "publication_date": f"2025-02-1{i % 7}"},
+        )
+    write_record(root, "bad/no_date.json", {"doi": "10.1/nodate"})
+    (root / "bad" / "broken.json").write_text("{not json", encoding="utf-8")
+
+
+def test_iter_json_files_walks_nested_dirs(tmp_path):
+    make_legacy_tree(tmp_path)
+    names = sorted(p.name for p in iter_json_files(tmp_path))
+    assert len(names) == 8
+    assert "broken.json" in names
+
+
+def test_organize_copy_groups_by_week(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write_record(src, "a/x.json", {"doi": "10.1/X", "publication_date": "2025-02-12"})
+    stats = organize(src, dst, "week", "monday", move=False, dry_run=False)
+    assert stats.copied == 1
+    assert (dst / "2025-02-10" / "10.1_x.json").exists()
+
+
+def test_organize_hardlink_mode_shares_inode(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    original = write_record(src, "a/x.json", {"doi": "10.1/x", "publication_date": "2025-02-12"})
+    stats = organize(src, dst, "day", "monday", move=False, dry_run=False, link="hard")
+    placed = dst / "2025-02-12" / "10.1_x.json"
+    assert stats.linked == 1
+    assert os.stat(placed).st_ino == os.stat(original).st_ino
+
+
+def test_organize_reflink_mode_falls_back_to_copy(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write_record(src, "a/x.json", {"doi": "10.1/x", "publication_date": "2025-02-12"})
+    stats = organize(src, dst, "day", "monday", move=False, dry_run=False, link="reflink")
+    assert stats.linked + stats.copied == 1
+    assert (dst / "2025-02-12" / "10.1_x.json").exists()
+
+
+def test_organize_parallel_matches_serial(tmp_path):
+    src = tmp_path / "in"
+    make_legacy_tree(src, n=40)
+    serial = organize(src, tmp_path / "serial", "week", "monday", move=False, dry_run=False)
+    parallel = organize(
+        src, tmp_path / "parallel", "week", "monday", move=False, dry_run=False, workers=2, batch_size=3
+    )
+    assert parallel == serial
+    serial_files = sorted(p.relative_to(tmp_path / "serial") for p in iter_json_files(tmp_path / "serial"))
+    parallel_files = sorted(p.relative_to(tmp_path / "parallel") for p in iter_json_files(tmp_path / "parallel"))
+    assert parallel_files == serial_files
+
+
+def test_organize_skips_existing_destination(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write_record(src, "a/x.json", {"doi": "10.1/x", "publication_date": "2025-02-12"})
+    organize(src, dst, "day", "monday", move=False, dry_run=False)
+    stats = organize(src, dst, "day", "monday", move=False, dry_run=False)
+    assert stats.skipped_exists == 1
+
+
+def test_stats_merge_sums_fields():
+    a = Stats(scanned=2, copied=1, skipped_invalid_json=1)
+    a.merge(Stats(scanned=3, linked=2, skipped_exists=1))
+    assert a == Stats(scanned=5, copied=1, linked=2, skipped_invalid_json=1, skipped_exists=1)
+
+
+# --- journal ---
+
+def make_journal(tmp_path: Path) -> Journal:
+    return Journal(tmp_path / "journal.sqlite", "week|monday|out")
+
+
+def test_journal_skips_unchanged_inputs(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    make_legacy_tree(src)
+    journal = make_journal(tmp_path)
+    first = organize(src, dst, "week", "monday", move=False, dry_run=False, journal=journal)
+    second = organize(src, dst, "week", "monday", move=False, dry_run=False, journal=journal)
+    assert first.copied == 6
+    assert second.scanned == 8
+    assert second.skipped_unchanged == 8
+    assert second.skipped_exists == 0
+
+
+def test_journal_reprocesses_modified_input(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    path = write_record(src, "a/x.json", {"doi": "10.1/x"})
+    journal = make_journal(tmp_path)
+    assert organize(src, dst, "week", "monday", move=False, dry_run=False, journal=journal).skipped_missing_pubdate == 1
+    path.write_text(json.dumps({"doi": "10.1/x", "publication_date": "2025-02-12"}), encoding="utf-8")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+    stats = organize(src, dst, "week", "monday", move=False, dry_run=False, journal=journal)
+    assert stats.copied == 1
+
+
+def test_journal_verify_catches_deleted_destination(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write_record(src, "a/x.json", {"doi": "10.1/x", "publication_date": "2025-02-12"})
+    journal = make_journal(tmp_path)
+    organize(src, dst, "day", "monday", move=False, dry_run=False, journal=journal)
+    placed = dst / "2025-02-12" / "10.1_x.json"
+    placed.unlink()
+    assert journal.verify() == [str(placed.resolve())]
+    stats = organize(src, dst, "day", "monday", move=False, dry_run=False, journal=journal)
+    assert stats.copied == 1
+    assert placed.exists()
+
+
+def test_journal_verify_replaces_changed_destination(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write_record(src, "a/x.json", {"doi": "10.1/x", "publication_date": "2025-02-12"})
+    journal = make_journal(tmp_path)
+    organize(src, dst, "day", "monday", move=False, dry_run=False, journal=journal)
+    placed = dst / "2025-02-12" / "10.1_x.json"
+    original = placed.read_text(encoding="utf-8")
+    placed.write_text("{}", encoding="utf-8")
+    stale = journal.verify()
+    assert stale == [str(placed.resolve())]
+    stats = organize(src, dst, "day", "monday", move=False, dry_run=False, journal=journal, replace=set(stale))
+    assert stats.copied == 1 and stats.skipped_exists == 0
+    assert placed.read_text(encoding="utf-8") == original
+    assert journal.verify() == []
+
+
+def test_journal_resets_when_settings_change(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write_record(src, "a/x.json", {"doi": "10.1/x", "publication_date": "2025-02-12"})
+    journal = make_journal(tmp_path)
+    organize(src, dst, "week", "monday", move=False, dry_run=False, journal=journal)
+    journal.close()
+    other = Journal(tmp_path / "journal.sqlite", "week|sunday|out")
+    stats = organize(src, dst, "week", "sunday", move=False, dry_run=False, journal=other)
+    assert stats.skipped_unchanged == 0
+
+
+# --- read_head_fields ---
+
+def ingest_style_record(**overrides) -> dict:
+    record = {
+        "doi": "10.1109/twc.2025.1",
+        "title": 'A "Quoted" Title',
+        "openalex_id": "https://openalex.org/W1",
+        "openalex_type": "article",
+        "publication_date": "2025-02-12",
+        "primary_location": {"doi": "https://doi.org/nested"},
+        "published": "2025-02-12",
+        "abstract": "word " * 2000,
+    }
+    record.update(overrides)
+    return record
+
+
+def test_read_head_fields_reads_ingest_layout(tmp_path):
+    path = tmp_path / "x.json"
+    path.write_text(json.dumps(ingest_style_record(), indent=2), encoding="utf-8")
+    assert read_head_fields(path) == {"doi": "10.1109/twc.2025.1", "publication_date": "2025-02-12"}
+
+
+def test_read_head_fields_decodes_escapes(tmp_path):
+    path = tmp_path / "x.json"
+    path.write_text(json.dumps(ingest_style_record(doi='10.1/a"b'), indent=2), encoding="utf-8")
+    assert read_head_fields(path)["doi"] == '10.1/a"b'
+
+
+def test_read_head_fields_returns_none_for_other_layouts(tmp_path):
+    compact = tmp_path / "compact.json"
+    compact.write_text(json.dumps(ingest_style_record()), encoding="utf-8")
+    null_date = tmp_path / "null.json"
+    null_date.write_text(json.dumps(ingest_style_record(publication_date=None), indent=2), encoding="utf-8")
+    assert read_head_fields(compact) is None
+    assert read_head_fields(null_date) is None
+
+
+def test_truncated_record_is_not_read_from_head(tmp_path):
+    path = tmp_path / "x.json"
+    text = json.dumps(ingest_style_record(), indent=2)
+    path.write_text(text[: len(text) // 2], encoding="utf-8")
+    assert read_head_fields(path) is None
+    assert load_record_fields(path) is None
+    # Cut right after the nested primary_location object, which also ends in "}".
+    path.write_text(text[: text.index("},") + 1], encoding="utf-8")
+    assert read_head_fields(path) is None
+
+
+def test_load_record_fields_falls_back_to_published(tmp_path):
+    path = tmp_path / "x.json"
+    path.write_text(json.dumps(ingest_style_record(publication_date=None), indent=2), encoding="utf-8")
+    assert load_record_fields(path)["published"] == "2025-02-12"
+
+
+def test_journal_verify_catches_same_size_edit(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write_record(src, "a/x.json", {"doi": "10.1/x", "publication_date": "2025-02-12"})
+    journal = make_journal(tmp_path)
+    organize(src, dst, "day", "monday", move=False, dry_run=False, journal=journal)
+    placed = dst / "2025-02-12" / "10.1_x.json"
+    original = placed.read_text(encoding="utf-8")
+    placed.write_text(original.replace("2025-02-12", "2025-02-13"), encoding="utf-8")
+    st = placed.stat()
+    os.utime(placed, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert placed.stat().st_size == len(original.encode("utf-8"))
+    assert journal.verify() == [str(placed.resolve())]
@@ -0,0 +1,76 @@
+# tests/test_payload_planner.py
+from datetime import date
+
+from payload_planner import (
+    estimate_tokens,
+    line_profile,
+    plan_payload,
+    select_by_priority,
+    shorten_line,
+    staged_tokens,
+)
+
+
+def entry(title: str, venue: str = "ieee_twc", cited: int = 0, published: str = "2025-02-10", words: int = 100) -> dict:
+    abstract = " ".join(["channel"] * words)
+    return {
+        "title": title,
+        "venue_id": venue,
+        "cited_by_count": cited,
+        "published": published,
+        "line": f"{title} | {venue} | {published[:7]} | {cited} | {abstract}",
+    }
+
+
+def test_estimate_tokens_scales_with_text():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("beam") == 1
+    assert estimate_tokens("beamforming") == 3
+    assert estimate_tokens("a | b") == 3
+    assert estimate_tokens("word " * 100) == 100
+
+
+def test_shorten_line_only_touches_abstract():
+    line = "Title | ieee_twc | 2025-02 | 3 | one two three four"
+    assert shorten_line(line, 2) == "Title | ieee_twc | 2025-02 | 3 | one two..."
+    assert shorten_line(line, 10) == line
+
+
+def test_staged_tokens_match_reestimating_the_shortened_line():
+    line = "RIS-aided ISAC | ieee_jsac | 2025-02 | 12 | We propose 3 schemes, achieving 42.5% gains in 6G mmWave links..."
+    profile = line_profile(line)
+    for words in (0, 3, 8, 100):
+        assert staged_tokens(profile, words) == estimate_tokens(shorten_line(line, words))
+
+
+def test_plan_unlimited_keeps_everything():
+    entries = [entry(f"P{i}") for i in range(5)]
+    plan = plan_payload(entries, 0, 100)
+    assert plan.lines == [e["line"] for e in entries]
+    assert plan.dropped == 0
+
+
+def test_plan_shrinks_abstracts_before_dropping():
+    entries = [entry(f"P{i}", words=300) for i in range(10)]
+    full = sum(estimate_tokens(e["line"]) + 1 for e in entries)
+    plan = plan_payload(entries, full // 2, 0)
+    assert plan.dropped == 0
+    assert plan.abstract_words < 300
+    assert plan.paper_tokens <= full // 2
+
+
+def test_plan_drops_lowest_priority_last_resort():
+    entries = [entry(f"P{i}", cited=i, words=30) for i in range(10)]
+    one_line = estimate_tokens(entries[0]["line"]) + 1
+    plan = plan_payload(entries, one_line * 3, 0, today=date(2025, 3, 1))
+    assert plan.dropped == 7
+    assert [line.split(" | ")[0] for line in plan.lines] == ["P7", "P8", "P9"]
+    assert plan.total_tokens <= one_line * 3
+
+
+def test_selection_spreads_across_venues():
+    entries = [entry(f"A{i}", venue="a", cited=100) for i in range(20)] + [entry("B0", venue="b", cited=60)]
+    tokens = [10] * len(entries)
+    chosen = select_by_priority(entries, tokens, budget=11 * 5, today=date(2025, 3, 1))
+    assert len(chosen) == 5
+    assert len(entries) - 1 in chosen
@@ -0,0 +1,76 @@
+# tests/test_rebucket_weeks.py
+import json
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+from ingest_openalex import ensure_papers_table
+from rebucket_weeks import rebucket, rollback
+
+
+def make_resource(root: Path, papers: list[tuple[str, str, bool]]) -> Path:
+    """papers: (doi, published, on_disk) filed under Monday-start weeks."""
+    resource = root / "resource"
+    weeks = resource / "by_publication_week"
+    weeks.mkdir(parents=True)
+    conn = sqlite3.connect(resource / "index.sqlite")
+    ensure_papers_table(conn)
+    for doi, published, on_disk in papers:
+        conn.execute("INSERT INTO papers (doi, published) VALUES (?, ?)", (doi, published))
+        if on_disk:
+            day = date.fromisoformat(published)
+            week = (day - timedelta(days=day.weekday())).isoformat()
+            (weeks / week).mkdir(exist_ok=True)
+            (weeks / week / f"{doi.replace('/', '_')}.json").write_text(json.dumps({"doi": doi}), encoding="utf-8")
+    conn.commit()
+    conn.close()
+    return resource
+
+
+def week_files(resource: Path) -> set[str]:
+    weeks = resource / "by_publication_week"
+    return {str(p.relative_to(weeks)).replace("\\", "/") for p in weeks.rglob("*.json")}
+
+
+PAPERS = [
+    ("10.1/wed", "2025-02-12", True),   # monday week 2025-02-10 → sunday week 2025-02-09
+    ("10.1/sun", "2025-02-16", True),   # monday week 2025-02-10 → sunday week 2025-02-16
+    ("10.1/noabs", "2025-02-12", False),
+    ("10.1/undated", "", False),
+]
+
+
+def test_rebucket_moves_to_sunday_weeks(tmp_path):
+    resource = make_resource(tmp_path, PAPERS)
+    stats = rebucket(resource, "monday", "sunday", tmp_path / "manifest.jsonl")
+    assert week_files(resource) == {"2025-02-09/10.1_wed.json", "2025-02-16/10.1_sun.json"}
+    assert stats.moved == 2
+    assert stats.missing == 1
+    assert stats.undated == 1
+    assert not (resource / "by_publication_week" / "2025-02-10").exists()
+
+
+def test_rebucket_dry_run_leaves_files(tmp_path):
+    resource = make_resource(tmp_path, PAPERS)
+    before = week_files(resource)
+    stats = rebucket(resource, "monday", "sunday", None, dry_run=True)
+    assert week_files(resource) == before
+    assert stats.moved == 2
+
+
+def test_rollback_restores_original_layout(tmp_path):
+    resource = make_resource(tmp_path, PAPERS)
+    before = week_files(resource)
+    manifest = tmp_path / "manifest.jsonl"
+    rebucket(resource, "monday", "sunday", manifest)
+    stats = rollback(resource, manifest)
+    assert week_files(resource) == before
+    assert stats.moved == 2
+
+
+def test_rebucket_is_repeatable(tmp_path):
+    resource = make_resource(tmp_path, PAPERS)
+    rebucket(resource, "monday", "sunday", tmp_path / "m1.jsonl")
+    stats = rebucket(resource, "monday", "sunday", tmp_path / "m2.jsonl")
+    assert stats.moved == 0
+    assert week_files(resource) == {"2025-02-09/10.1_wed.json", "2025-02-16/10.1_sun.json"}
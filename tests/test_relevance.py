@@ -0,0 +1,114 @@
+# tests/test_relevance.py
+import json
+
+import pytest
+
+from aho_corasick import AhoCorasick
+from paper_corpus import load_papers
+from payload_planner import priority_scores
+from relevance import RelevanceCache, RelevanceScorer, normalize_words, parse_keywords
+
+KEYWORDS = """
+# research focus
+3: beam codebook | codebook design
+2: UAV | unmanned aerial vehicle
+-1: optical fiber
+mmWave
+"""
+
+
+def test_automaton_finds_overlapping_matches():
+    ac = AhoCorasick(["he", "she", "his", "hers"])
+    found = sorted((start, end, ["he", "she", "his", "hers"][pid]) for start, end, pid in ac.iter_matches("ushers"))
+    assert found == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_automaton_matches_word_sequences():
+    ac = AhoCorasick([["beam", "codebook"], ["codebook"]])
+    matches = list(ac.iter_matches("a beam codebook and another codebook".split()))
+    assert [(s, e, pid) for s, e, pid in matches] == [(1, 3, 0), (2, 3, 1), (5, 6, 1)]
+
+
+def test_parse_keywords_weights_and_synonyms():
+    concepts = parse_keywords(KEYWORDS)
+    assert [c.weight for c in concepts] == [3.0, 2.0, -1.0, 1.0]
+    assert concepts[1].phrases == ("UAV", "unmanned aerial vehicle")
+    with pytest.raises(ValueError):
+        parse_keywords("2: | ")
+
+
+def test_score_counts_synonyms_title_and_negative_weights():
+    scorer = RelevanceScorer(parse_keywords(KEYWORDS))
+    assert normalize_words("Beam Codebooks") == ["beam", "codebook"]
+    plain = scorer.score("A survey", "Nothing relevant here.")
+    uav = scorer.score("A survey", "An unmanned aerial vehicle relay.")
+    uav_title = scorer.score("UAV relays", "An unmanned aerial vehicle relay.")
+    codebook = scorer.score("Beam codebooks for UAVs", "codebook design for mmWave")
+    fiber = scorer.score("Optical fiber links", "")
+    assert plain == 0
+    assert 0 < uav < uav_title < codebook
+    assert fiber < 0
+
+
+def test_scores_are_cached_per_keyset(tmp_path, monkeypatch):
+    cache = RelevanceCache(tmp_path / "index.sqlite")
+    scorer = RelevanceScorer(parse_keywords(KEYWORDS))
+    items = [{"doi": f"10.1/{i}", "title": "UAV beam codebook", "abstract": ""} for i in range(3)]
+    first = scorer.score_items(items, cache)
+
+    calls = []
+    original = RelevanceScorer.score
+    monkeypatch.setattr(RelevanceScorer, "score", lambda self, t, a: calls.append(t) or original(self, t, a))
+    again = scorer.score_items(items + [{"doi": "10.1/new", "title": "UAV", "abstract": ""}], cache)
+    assert calls == ["UAV"]
+    assert {k: again[k] for k in first} == first
+
+    other = RelevanceScorer(parse_keywords("mmWave"))
+    assert other.keyset != scorer.keyset
+    other.score_items(items, cache)
+    assert len(calls) == 4
+
+    calls.clear()
+    longer = [dict(items[0], abstract="UAV beam codebook design and more")]
+    assert scorer.score_items(longer, cache)["10.1/0"] > first["10.1/0"]
+    assert calls == ["UAV beam codebook"]
+    assert scorer.score_items(longer, cache) and len(calls) == 1
+    cache.close()
+
+
+def test_scores_payload_entries_from_their_line():
+    scorer = RelevanceScorer(parse_keywords(KEYWORDS))
+    entry = {"doi": "d", "title": "Title", "line": "Title | ieee_twc | 2025-02 | 3 | UAV beam codebook design"}
+    assert scorer.score_items([entry])["d"] == scorer.score("Title", "UAV beam codebook design")
+
+
+def test_load_papers_caps_by_relevance_first(tmp_path):
+    def paper(i, abstract, cited):
+        return {"doi": f"10.1/{i}", "title": f"P{i}", "venue_id": "ieee_twc", "published": "2025-02-10",
+                "cited_by_count": cited, "abstract": abstract}
+
+    normal = tmp_path / "2025-02-03"
+    normal.mkdir()
+    (normal / "p.json").write_text(json.dumps(paper(0, "filler", 1)), encoding="utf-8")
+    busy = tmp_path / "2025-02-10"
+    busy.mkdir()
+    for i in range(1, 11):
+        abstract = "UAV beam codebook" if i == 10 else "filler words"
+        (busy / f"p{i}.json").write_text(json.dumps(paper(i, abstract, 100 - i)), encoding="utf-8")
+
+    scorer = RelevanceScorer(parse_keywords(KEYWORDS))
+    result = load_papers([normal, busy], cap_count=2, relevance=scorer.score_items)
+    kept = [p["doi"] for p in result]
+    assert kept == ["10.1/0", "10.1/10", "10.1/1"]
+    assert result[1]["relevance"] > 0
+
+
+def test_priority_scores_boost_relevant_papers():
+    entries = [
+        {"cited_by_count": 500, "published": "2025-02-10", "relevance": 0.0},
+        {"cited_by_count": 0, "published": "2025-02-10", "relevance": 4.0},
+        {"cited_by_count": 500, "published": "2025-02-10", "relevance": -2.0},
+    ]
+    scores = priority_scores(entries)
+    assert scores[1] > scores[0] > scores[2]
+    assert scores[2] >= 0
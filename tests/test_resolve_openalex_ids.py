@@ -0,0 +1,59 @@
+# tests/test_resolve_openalex_ids.py
+from urllib.parse import unquote
+
+import resolve_openalex_ids as roi
+from resolve_openalex_ids import Venue
+
+
+def make_venue(venue_id: str, ids: list[str]) -> Venue:
+    return Venue(venue_id=venue_id, name=venue_id, type="journal", publisher="IEEE", openalex_source_ids=ids)
+
+
+def test_fetch_source_work_counts_single_request(monkeypatch):
+    calls = []
+
+    def fake_fetch(url, headers=None, **kwargs):
+        calls.append(unquote(url))
+        return {
+            "group_by": [
+                {"key": "https://openalex.org/S1", "count": 10},
+                {"key": "S2", "count": 5},
+            ]
+        }
+
+    monkeypatch.setattr(roi, "fetch_json", fake_fetch)
+    counts = roi.fetch_source_work_counts(["S1", "S2", "S3", "S1"], None, None)
+    assert counts == {"S1": 10, "S2": 5, "S3": 0}
+    assert len(calls) == 1
+    assert "primary_location.source.id:S1|S2|S3" in calls[0]
+    assert "group_by=primary_location.source.id" in calls[0]
+
+
+def test_fetch_source_work_counts_chunks_large_or_filters(monkeypatch):
+    calls = []
+    monkeypatch.setattr(roi, "fetch_json", lambda url, headers=None, **kw: calls.append(url) or {"group_by": []})
+    ids = [f"S{i}" for i in range(roi.MAX_OR_FILTER_VALUES + 1)]
+    counts = roi.fetch_source_work_counts(ids, None, None)
+    assert len(calls) == 2
+    assert len(counts) == len(ids)
+
+
+def test_validate_sources_sums_per_venue(monkeypatch, capsys):
+    monkeypatch.setattr(
+        roi,
+        "fetch_json",
+        lambda url, headers=None, **kw: {"group_by": [{"key": "S1", "count": 3}, {"key": "S2", "count": 4}]},
+    )
+    roi.validate_sources([make_venue("icc", ["S1", "S2"]), make_venue("empty", [])], None, None)
+    out = capsys.readouterr().out
+    assert "icc: count=7" in out
+    assert "empty: missing openalex_source_ids" in out
+
+
+def test_validate_sources_reports_error_per_venue(monkeypatch, capsys):
+    def boom(url, headers=None, **kwargs):
+        raise RuntimeError("HTTP 503")
+
+    monkeypatch.setattr(roi, "fetch_json", boom)
+    roi.validate_sources([make_venue("twc", ["S1"])], None, None)
+    assert "twc: error HTTP 503" in capsys.readouterr().out
@@ -0,0 +1,116 @@
+# tests/test_retrieve.py
+import json
+import shutil
+
+import generate_report as gr
+from retrieve import BM25Index, RerankCache, rerank, retrieve
+
+
+def write_paper(weeks_dir, week, doi, title, abstract, keywords=()):
+    week_dir = weeks_dir / week
+    week_dir.mkdir(parents=True, exist_ok=True)
+    record = {
+        "doi": doi,
+        "title": title,
+        "abstract": abstract,
+        "keywords": list(keywords),
+        "venue_id": "ieee_twc",
+        "published": f"{week}",
+        "cited_by_count": 1,
+    }
+    (week_dir / f"{doi.replace('/', '_')}.json").write_text(json.dumps(record), encoding="utf-8")
+
+
+def make_corpus(tmp_path):
+    weeks_dir = tmp_path / "by_publication_week"
+    write_paper(weeks_dir, "2024-01-01", "10.1/a", "UAV beam codebook design", "Codebooks for mmWave UAV links.")
+    write_paper(weeks_dir, "2024-01-01", "10.1/b", "Federated learning at the edge", "Clients aggregate models.")
+    write_paper(weeks_dir, "2025-06-02", "10.1/c", "RIS channel estimation", "Beam training with a codebook.", ["mmWave"])
+    write_paper(weeks_dir, "2025-06-02", "10.1/d", "Satellite handover", "LEO constellations and handover.")
+    return weeks_dir
+
+
+class FakeRerankAPI:
+    """Scores documents by how many query words they contain; records batch sizes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def create_rerank(self, *, model, query, documents, top_n):
+        self.batches.append(len(documents))
+        words = set(query.lower().split())
+        results = [
+            {"index": i, "relevance_score": sum(w in doc.lower() for w in words) / len(words)}
+            for i, doc in enumerate(documents)
+        ]
+        return {"results": sorted(results, key=lambda r: -r["relevance_score"])[:top_n]}
+
+
+def test_bm25_ranks_title_matches_first_and_roundtrips(tmp_path):
+    weeks_dir = make_corpus(tmp_path)
+    index = BM25Index(tmp_path / "bm25")
+    stats = index.update(sorted(weeks_dir.iterdir()))
+    assert stats == {"weeks_reindexed": 2, "weeks_removed": 0, "papers_added": 4}
+    hits = index.search("mmWave beam codebook", k=10)
+    assert [h.doi for h in hits] == ["10.1/a", "10.1/c"]
+    assert index.search("nothing matches", k=10) == []
+
+    index.save()
+    reloaded = BM25Index(tmp_path / "bm25")
+    assert [(h.doi, round(h.score, 5)) for h in reloaded.search("mmWave beam codebook")] == [
+        (h.doi, round(h.score, 5)) for h in hits
+    ]
+
+
+def test_update_only_reindexes_changed_weeks(tmp_path):
+    weeks_dir = make_corpus(tmp_path)
+    index = BM25Index(tmp_path / "bm25")
+    index.update(sorted(weeks_dir.iterdir()))
+    assert index.update(sorted(weeks_dir.iterdir()))["weeks_reindexed"] == 0
+
+    write_paper(weeks_dir, "2025-06-02", "10.1/e", "Handover for UAV swarms", "Satellite handover.")
+    stats = index.update(sorted(weeks_dir.iterdir()))
+    assert stats == {"weeks_reindexed": 1, "weeks_removed": 0, "papers_added": 3}
+    assert len(index) == 5
+    assert {h.doi for h in index.search("handover")} == {"10.1/d", "10.1/e"}
+
+    shutil.rmtree(weeks_dir / "2024-01-01")
+    stats = index.update(sorted(weeks_dir.iterdir()))
+    assert stats["weeks_removed"] == 1
+    assert {d["doi"] for d in index.docs} == {"10.1/c", "10.1/d", "10.1/e"}
+    assert [h.doi for h in index.search("codebook")] == ["10.1/c"]
+
+
+def test_rerank_batches_merge_and_cache(tmp_path):
+    api = FakeRerankAPI()
+    cache = RerankCache(tmp_path / "index.sqlite")
+    candidates = [(f"10.1/{i}", "uav codebook" if i == 6 else f"doc {i}") for i in range(7)]
+    scores = rerank(api, "UAV codebook", candidates, batch_size=3, cache=cache)
+    assert api.batches == [3, 3, 1]
+    assert max(scores, key=scores.get) == "10.1/6"
+    assert len(scores) == 7
+
+    again = rerank(api, "  uav   CODEBOOK ", candidates + [("10.1/new", "uav")], batch_size=3, cache=cache)
+    assert api.batches == [3, 3, 1, 1]
+    assert again["10.1/6"] == scores["10.1/6"]
+    cache.close()
+
+
+def test_retrieve_and_query_entries(tmp_path):
+    make_corpus(tmp_path)
+    api = FakeRerankAPI()
+    results = retrieve(tmp_path, "UAV codebook", top_k=1, candidates=10, api=api)
+    assert [paper["doi"] for paper, *_ in results] == ["10.1/a"]
+
+    entries = gr.query_entries(tmp_path, "beam codebook", top_k=5, api=None)
+    assert [e["doi"] for e in entries] == ["10.1/a", "10.1/c"]
+    assert [e["week"] for e in entries] == ["2024-01-01", "2025-06-02"]
+    assert all(e["relevance"] > 0 for e in entries)
+
+
+def test_query_reports_get_their_own_file(tmp_path):
+    slug = gr.query_slug("What's new on UAV mmWave beam codebooks?")
+    assert slug == "what-s-new-on-uav-mmwave-beam-codebooks"
+    path = gr.write_report("# Q", tmp_path, "2025-06-02", f"query-{slug}")
+    assert path.name == "2025-06-02-query-what-s-new-on-uav-mmwave-beam-codebooks.md"
+    assert gr.write_report("# W", tmp_path, "2025-06-02").name == "2025-06-02-wireless-digest.md"
@@ -0,0 +1,121 @@
+# tests/test_section_digest.py
+import threading
+import time
+from pathlib import Path
+
+import generate_report as gr
+from section_digest import (
+    Topic,
+    assemble_report,
+    assign_topics,
+    parse_numbered_names,
+    parse_topic_plan,
+    template_sections,
+    topic_block,
+    topic_stats,
+)
+
+TEMPLATE = (Path(__file__).resolve().parent.parent / "templates" / "report_template.md").read_text(encoding="utf-8")
+
+
+def entry(i, title, abstract, venue="ieee_twc", week="2025-06-02", cited=0):
+    return {
+        "doi": f"10.1/{i}",
+        "title": title,
+        "venue_id": venue,
+        "week": week,
+        "published": week,
+        "cited_by_count": cited,
+        "line": f"{title} | {venue} | {week[:7]} | {cited} | {abstract}",
+    }
+
+
+ENTRIES = [
+    entry(0, "RIS-aided ISAC", "A reconfigurable intelligent surface for sensing.", cited=9),
+    entry(1, "Passive beamforming design", "We optimise RIS phase shifts.", venue="ieee_jsac", week="2025-05-26"),
+    entry(2, "Federated learning at the edge", "Clients train over wireless uplinks.", cited=4),
+    entry(3, "LEO satellite handover", "Handover between satellites."),
+]
+PLAN = """Here are the topics:
+1. **RIS and Passive Beamforming** | reconfigurable intelligent surface; RIS; passive beamforming
+- Federated Edge Learning | federated learning; edge learning
+Satellite Links | LEO; satellite
+RIS and passive beamforming | RIS
+"""
+
+
+def test_parse_topic_plan_and_numbered_names():
+    topics = parse_topic_plan(PLAN)
+    assert [t.name for t in topics] == ["RIS and Passive Beamforming", "Federated Edge Learning", "Satellite Links"]
+    assert topics[0].keywords == ("reconfigurable intelligent surface", "RIS", "passive beamforming")
+    assert parse_numbered_names("1. **ISAC**\n### 3. [[RIS]]\nnoise", 3) == ["ISAC", "Cluster 2", "RIS"]
+
+
+def test_assign_topics_picks_strongest_match_largest_first():
+    topics = assign_topics(ENTRIES, parse_topic_plan(PLAN) + [Topic("Optical fiber", ("fiber",))])
+    assert [(t.name, t.members) for t in topics] == [
+        ("RIS and Passive Beamforming", [0, 1]),
+        ("Federated Edge Learning", [2]),
+        ("Satellite Links", [3]),
+    ]
+    stats, assigned = topic_stats(ENTRIES, topics)
+    assert stats.order == [0, 1, 2]
+    assert stats.sizes.tolist() == [2, 1, 1]
+    assert (stats.first_half.tolist(), stats.second_half.tolist()) == ([1, 0, 0], [1, 1, 1])
+    assert len(assigned) == 4
+
+
+def test_template_sections_and_assembly():
+    header, sections = template_sections(TEMPLATE)
+    assert header == "# Wireless Research Digest — {{DATE_RANGE}}"
+    assert [h for h, _ in sections][:3] == ["Summary", "Hot Topics", "Trend Signals"]
+    block = topic_block(TEMPLATE)
+    assert block.startswith("### 1. {{TOPIC_NAME}}") and block.endswith("{{PAPER_3}}")
+
+    report = assemble_report(
+        TEMPLATE, {"Suggested Reading": "- read", "Summary": "- sum"}, {"DATE_RANGE": "2025-05-26 → 2025-06-02"}
+    )
+    assert report == "# Wireless Research Digest — 2025-05-26 → 2025-06-02\n\n## Summary\n\n- sum\n\n## Suggested Reading\n\n- read\n"
+
+
+def test_sections_are_written_concurrently_and_assembled(monkeypatch):
+    import siliconflow_api
+
+    running, peak, lock = [0], [0], threading.Lock()
+    prompts = []
+
+    def fake_chat(client, messages, max_tokens=8192, **kwargs):
+        user = messages[1]["content"]
+        if max_tokens == gr.PLAN_MAX_TOKENS:
+            return PLAN
+        with lock:
+            prompts.append(user)
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        if "Write only this report section" in user:
+            heading = next(line for line in user.splitlines() if line.startswith("### "))
+            return f"{heading}\n- **Core problem:** from the abstracts"
+        section = user.split("'## ", 1)[1].split("'", 1)[0]
+        return f"## {section}\n- {section} body"
+
+    monkeypatch.setattr(siliconflow_api, "build_openai_client", lambda **kwargs: object())
+    monkeypatch.setattr(gr, "chat_completion", fake_chat)
+    report = gr.call_llm_sections(ENTRIES, TEMPLATE, 2, "key", concurrency=8)
+
+    assert peak[0] > 1
+    topic_prompts = [p for p in prompts if "Write only this report section" in p]
+    assert len(topic_prompts) == 3
+    ris = next(p for p in topic_prompts if "### 1. RIS and Passive Beamforming" in p)
+    assert "RIS-aided ISAC" in ris and "LEO satellite handover" not in ris
+    assert "- **Papers this period:** 2 | **Venues:** TWC (1), JSAC (1)" in ris
+
+    assert report.startswith("# Wireless Research Digest — 2025-05-26 → 2025-06-02\n\n## Summary\n\n- Summary body")
+    assert report.index("### 1. RIS") < report.index("### 2. Federated") < report.index("## Trend Signals")
+    assert "- **Satellite Links:** → stable — 0 papers in first half → 1 in second half" in report
+    assert "| RIS and Passive Beamforming | 1 | 1 |" in report
+    assert "## Research Gaps\n\n- Research Gaps body" in report
+    assert report.rstrip().endswith("- Suggested Reading body")
+    assert gr.extract_topics_from_markdown(gr.wrap_topic_headings(report))[0] == "RIS and Passive Beamforming"
@@ -0,0 +1,148 @@
+# tests/test_topic_classifier.py
+import random
+import sqlite3
+
+import label_papers as lp
+import topic_classifier as tc
+from ingest_openalex import ensure_papers_table
+
+VOCAB = {
+    "RIS": "reconfigurable intelligent surface phase shift reflecting elements passive beamforming",
+    "ISAC": "integrated sensing communication radar target detection dual-function waveform",
+    "Federated Learning": "federated learning clients aggregation model updates edge devices",
+}
+
+
+def synthetic_papers(n, seed=0):
+    rng = random.Random(seed)
+    topics = list(VOCAB)
+    papers = []
+    for i in range(n):
+        topic = topics[i % len(topics)]
+        words = VOCAB[topic].split()
+        noise = "wireless network system performance analysis proposed scheme".split()
+        abstract = " ".join(rng.choice(words + noise) for _ in range(40))
+        papers.append({"doi": f"10.1/{i}", "title": f"On {rng.choice(words)} design", "abstract": abstract, "topic": topic})
+    return papers
+
+
+def test_hashed_features_are_stable_and_include_bigrams():
+    ids = tc.hashed_features("RIS phase RIS phase", 1024)
+    # unigrams ris, phase (x2 each) + bigrams "ris phase" (x2), "phase ris" (x1)
+    assert len(ids) == 7
+    assert len(set(ids.tolist())) == 4
+    assert ids.tolist() == tc.hashed_features("ris PHASE ris phase", 1024).tolist()
+
+
+def test_partial_fit_matches_single_fit_and_roundtrips(tmp_path):
+    papers = synthetic_papers(60)
+    texts = [tc.classifier_text(p) for p in papers]
+    topics = [p["topic"] for p in papers]
+
+    whole = tc.TopicClassifier(n_features=4096)
+    whole.partial_fit(texts, topics)
+    incremental = tc.TopicClassifier(n_features=4096)
+    incremental.partial_fit(texts[:25], topics[:25])
+    incremental.partial_fit(texts[25:], topics[25:])
+    assert incremental.predict(texts[:5]) == whole.predict(texts[:5])
+
+    path = tmp_path / "clf.npz"
+    whole.trained_until = "2025-03-01T00:00:00"
+    whole.save(path)
+    loaded = tc.TopicClassifier.load(path)
+    assert loaded.classes == whole.classes
+    assert loaded.trained_until == "2025-03-01T00:00:00"
+    assert loaded.predict(texts[:5]) == whole.predict(texts[:5])
+
+
+def test_route_predictions_keeps_only_confident_labels():
+    model = tc.TopicClassifier(n_features=4096)
+    train = synthetic_papers(90)
+    model.partial_fit([tc.classifier_text(p) for p in train], [p["topic"] for p in train])
+    clear = {"doi": "x", "title": "Reflecting surface", "abstract": VOCAB["RIS"]}
+    vague = {"doi": "y", "title": "Analysis", "abstract": "system performance"}
+    confident, uncertain = tc.route_predictions(model, [clear, vague], threshold=0.9)
+    assert confident == [("x", "RIS")]
+    assert uncertain == [vague]
+
+
+def test_evaluate_reports_agreement():
+    report = tc.evaluate(synthetic_papers(200), threshold=0.9, n_features=4096)
+    assert report.n_train + report.n_test == 200
+    assert report.accuracy > 0.9
+    assert {t for t, *_ in report.per_topic} == set(VOCAB)
+    assert "Agreement with LLM labels" in report.render()
+
+
+def test_update_classifier_trains_only_on_new_llm_labels(tmp_path):
+    conn = sqlite3.connect(tmp_path / "index.sqlite")
+    ensure_papers_table(conn)
+    lp.ensure_topics_table(conn)
+    papers = synthetic_papers(30)
+    conn.executemany(
+        "INSERT INTO papers (doi, title, venue_id, published) VALUES (?, ?, 'ieee_twc', '2025-03-04')",
+        [(p["doi"], p["title"]) for p in papers],
+    )
+    lp.store_labels(conn, [(p["doi"], p["topic"]) for p in papers[:20]], "llm")
+    lp.store_labels(conn, [(p["doi"], p["topic"]) for p in papers[20:]], tc.LOCAL_MODEL)
+
+    assert lp.update_classifier(conn, tmp_path) == 0
+    tc.TopicClassifier(n_features=4096).save(tmp_path / tc.CLASSIFIER_FILE)
+    assert lp.update_classifier(conn, tmp_path) == 20
+    assert lp.update_classifier(conn, tmp_path) == 0
+    model = tc.TopicClassifier.load(tmp_path / tc.CLASSIFIER_FILE)
+    assert model.n_trained == 20
+    assert model.trained_until
+
+
+def test_confidence_does_not_saturate_on_long_untopical_text():
+    model = tc.TopicClassifier(n_features=4096)
+    train = synthetic_papers(90)
+    model.partial_fit([tc.classifier_text(p) for p in train], [p["topic"] for p in train])
+    rng = random.Random(1)
+    filler = "wireless network system performance analysis proposed scheme".split()
+    long_noise = " ".join(rng.choice(filler) for _ in range(600))
+    long_topical = " ".join(rng.choice(VOCAB["ISAC"].split() + filler) for _ in range(600))
+    (_, noise_conf), (topic, topical_conf) = model.predict([long_noise, long_topical])
+    assert noise_conf < 0.9
+    assert topic == "ISAC" and topical_conf >= 0.9
+
+
+def test_pick_threshold_keeps_target_agreement():
+    confidences = [0.99, 0.97, 0.95, 0.9, 0.8, 0.7, 0.6]
+    hits = [True, True, True, True, False, True, False]
+    assert tc.pick_threshold(confidences, hits, target=1.0) == 0.9
+    assert tc.pick_threshold(confidences, hits, target=0.8) == 0.7
+    assert tc.pick_threshold([0.9, 0.8], [False, False]) is None
+
+
+def test_classes_grow_without_copying_and_merge_case_variants(tmp_path):
+    model = tc.TopicClassifier(n_features=64)
+    model.partial_fit(["a"], ["RIS"])
+    buffer = model._feature_counts
+    model.partial_fit(["b", "c"], ["ris ", "ISAC"])
+    assert model._feature_counts is buffer  # spare rows reused
+    assert model.classes == ["RIS", "ISAC"]
+    assert model.class_counts.tolist() == [2.0, 1.0]
+    model.partial_fit([str(i) for i in range(30)], [f"T{i}" for i in range(30)])
+    assert model.feature_counts.shape == (32, 64)
+    model.threshold = 0.8
+    model.save(tmp_path / "clf.npz")
+    loaded = tc.TopicClassifier.load(tmp_path / "clf.npz")
+    assert loaded.threshold == 0.8 and loaded.feature_counts.shape == (32, 64)
+    loaded.partial_fit(["x"], ["New topic"])
+    assert len(loaded.classes) == 33
+
+
+def test_relabelled_dois_move_their_counts_instead_of_doubling(tmp_path):
+    model = tc.TopicClassifier(n_features=256)
+    assert model.partial_fit(["ris phase", "radar target"], ["RIS", "ISAC"], ["d1", "d2"]) == 2
+    assert model.partial_fit(["ris phase"], ["ris"], ["d1"]) == 0  # same topic again
+    assert model.class_counts.tolist() == [1.0, 1.0]
+    assert model.partial_fit(["ris phase"], ["ISAC"], ["d1"]) == 1
+    assert model.class_counts.tolist() == [0.0, 2.0]
+    assert model.feature_counts[0].sum() == 0
+    model.save(tmp_path / "clf.npz")
+    loaded = tc.TopicClassifier.load(tmp_path / "clf.npz")
+    assert loaded.trained == {"d1": 1, "d2": 1}
+    assert loaded.partial_fit(["ris phase"], ["ISAC"], ["d1"]) == 0
@@ -0,0 +1,87 @@
+# tests/test_topic_clusters.py
+
+import numpy as np
+
+import generate_report as gr
+from embed_papers import DEFAULT_MODEL, EmbeddingStore
+from topic_clusters import (
+    cluster_stats,
+    minibatch_kmeans,
+    render_trend_signals,
+    render_venue_breakdown,
+    replace_section,
+)
+
+
+def blobs(sizes: list[int], dim: int = 8, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centres = np.eye(dim)[: len(sizes)]
+    X = np.vstack([centres[i] + 0.05 * rng.standard_normal((n, dim)) for i, n in enumerate(sizes)])
+    truth = np.repeat(np.arange(len(sizes)), sizes)
+    return X.astype(np.float32), truth
+
+
+def test_minibatch_kmeans_recovers_separated_blobs():
+    X, truth = blobs([40, 25, 10])
+    _, labels = minibatch_kmeans(X, 3, batch_size=32, n_iter=30)
+    for c in range(3):
+        assert len(set(labels[truth == c].tolist())) == 1
+    assert len(set(labels.tolist())) == 3
+
+
+def test_cluster_stats_counts_are_exact():
+    X, truth = blobs([6, 3])
+    centroids, labels = minibatch_kmeans(X, 2, n_iter=20)
+    venues = ["ieee_twc"] * 4 + ["ieee_jsac"] * 2 + ["ieee_jsac"] * 3
+    weeks = ["2025-01-06", "2025-01-06", "2025-01-13", "2025-01-13", "2025-01-20", "2025-01-27",
+             "2025-01-06", "2025-01-27", "2025-01-27"]
+    stats = cluster_stats(X, centroids, labels, venues, weeks, n_representatives=2)
+    big, small = stats.order
+    assert stats.sizes[big] == 6 and stats.sizes[small] == 3
+    assert stats.venues == ["ieee_jsac", "ieee_twc"]
+    assert stats.venue_counts[big].tolist() == [2, 4]
+    assert stats.venue_counts[small].tolist() == [3, 0]
+    assert (stats.first_half[big], stats.second_half[big]) == (4, 2)
+    assert (stats.first_half[small], stats.second_half[small]) == (1, 2)
+    assert all(labels[i] == small for i in stats.representatives[small])
+
+
+def test_render_and_replace_sections():
+    X, _ = blobs([4, 2])
+    centroids, labels = minibatch_kmeans(X, 2, n_iter=10)
+    stats = cluster_stats(X, centroids, labels, ["ieee_twc"] * 4 + ["ieee_wcl"] * 2, ["w1"] * 3 + ["w2"] * 3)
+    table = render_venue_breakdown(["ISAC", "RIS"], stats)
+    assert table.splitlines()[0] == "| Topic | TWC | WCL |"
+    assert "| ISAC | 4 | 0 |" in table
+    trends = render_trend_signals(["ISAC", "RIS"], stats)
+    assert "**RIS:**" in trends
+
+    markdown = "# D\n\n## Trend Signals\n- guessed\n\n## Venue Breakdown\n| old |\n\n## Suggested Reading\n- x\n"
+    out = replace_section(markdown, "Venue Breakdown", table)
+    assert "| old |" not in out
+    assert "| ISAC | 4 | 0 |" in out
+    assert out.index("## Venue Breakdown") < out.index("## Suggested Reading")
+    assert "- guessed" in out
+
+
+def test_cluster_entries_and_apply_tables(tmp_path):
+    X, truth = blobs([5, 3], dim=4)
+    entries = [
+        {"doi": f"10.1/{i}", "venue_id": "ieee_twc" if i % 2 else "ieee_jsac", "week": "2025-01-06" if i < 4 else "2025-01-13",
+         "file": f"{i}.json", "line": f"Paper {i} | v | 2025-01 | 0 | abs", "cited_by_count": 0}
+        for i in range(8)
+    ]
+    entries.append({"doi": "10.1/unembedded", "venue_id": "ieee_twc", "week": "2025-01-13", "line": "x"})
+    store = EmbeddingStore(tmp_path / "embeddings", DEFAULT_MODEL)
+    store.write([e["doi"] for e in entries[:8]], ["h"] * 8, X)
+    store.close()
+
+    stats, clustered = gr.cluster_entries(entries, tmp_path, k=2)
+    assert len(clustered) == 8
+    assert sorted(stats.sizes.tolist()) == [3, 5]
+
+    markdown = "### 1. [[Beam Training]]\n### 2. Sensing\n\n## Trend Signals\n- ?\n\n## Venue Breakdown\n?\n"
+    out = gr.apply_cluster_tables(markdown, stats)
+    assert "| Beam Training |" in out
+    assert "| Sensing |" in out
+    assert "- ?" not in out
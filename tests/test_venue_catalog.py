@@ -0,0 +1,97 @@
+# tests/test_venue_catalog.py
+import gzip
+import json
+
+from venue_catalog import (
+    is_confident,
+    iter_snapshot_sources,
+    normalize_name,
+    open_catalog,
+    search,
+    trigrams,
+    upsert_sources,
+)
+
+
+def source(sid: str, name: str, works: int, type_: str = "journal", alternates: list[str] | None = None) -> dict:
+    return {
+        "id": f"https://openalex.org/{sid}",
+        "display_name": name,
+        "type": type_,
+        "works_count": works,
+        "alternate_titles": alternates or [],
+        "host_organization_name": "IEEE",
+    }
+
+
+CATALOG = [
+    source("S1", "IEEE Transactions on Wireless Communications", 20000, alternates=["IEEE Trans. Wireless Commun."]),
+    source("S2", "IEEE Transactions on Communications", 25000),
+    source("S3", "IEEE Wireless Communications Letters", 8000),
+    source("S10", "ICC 2023 - IEEE International Conference on Communications", 2500, type_="conference"),
+    source("S11", "ICC 2024 - IEEE International Conference on Communications", 3000, type_="conference"),
+]
+
+
+def make_catalog(tmp_path):
+    conn = open_catalog(tmp_path / "catalog.sqlite")
+    upsert_sources(conn, CATALOG)
+    return conn
+
+
+def test_normalize_name_folds_case_and_punctuation():
+    assert normalize_name("IEEE Communications Surveys & Tutorials") == "ieee communications surveys and tutorials"
+
+
+def test_trigrams_are_distinct():
+    grams = trigrams("aaaa")
+    assert len(grams) == len(set(grams))
+
+
+def test_search_prefers_closest_name(tmp_path):
+    conn = make_catalog(tmp_path)
+    results = search(conn, "IEEE Transactions on Wireless Communications")
+    assert results[0].source_id == "S1"
+
+
+def test_search_matches_alternate_titles(tmp_path):
+    conn = make_catalog(tmp_path)
+    results = search(conn, "IEEE Trans Wireless Commun")
+    assert results[0].source_id == "S1"
+
+
+def test_search_returns_yearly_conference_alternatives_by_works_count(tmp_path):
+    conn = make_catalog(tmp_path)
+    results = search(conn, "IEEE International Conference on Communications", limit=5)
+    ids = [r.source_id for r in results]
+    assert ids[:2] == ["S11", "S10"]
+
+
+def test_is_confident_requires_high_score_or_clear_margin(tmp_path):
+    conn = make_catalog(tmp_path)
+    assert is_confident(search(conn, "IEEE Trans Wireless Commun"))
+    assert is_confident(search(conn, "IEEE International Conference on Communications"))
+    # A different journal whose closest catalog name is only similar.
+    assert not is_confident(search(conn, "IEEE Communications Letters"))
+    assert not is_confident(search(conn, "IEEE Transactions on Signal Processing"))
+    assert not is_confident([])
+
+
+def test_upsert_replaces_existing_source(tmp_path):
+    conn = make_catalog(tmp_path)
+    upsert_sources(conn, [source("S3", "IEEE Wireless Communications Letters", 9000)])
+    count = conn.execute("SELECT COUNT(*) FROM source_names WHERE source_id = 'S3'").fetchone()[0]
+    assert count == 1
+    assert search(conn, "Wireless Communications Letters")[0].works_count == 9000
+
+
+def test_iter_snapshot_sources_reads_gzip_jsonl(tmp_path):
+    part = tmp_path / "sources" / "part_000.gz"
+    part.parent.mkdir()
+    with gzip.open(part, "wt", encoding="utf-8") as f:
+        for record in CATALOG[:2]:
+            f.write(json.dumps(record) + "\n")
+    assert [r["display_name"] for r in iter_snapshot_sources(tmp_path / "sources")] == [
+        CATALOG[0]["display_name"],
+        CATALOG[1]["display_name"],
+    ]
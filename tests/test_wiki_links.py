@@ -0,0 +1,53 @@
+# tests/test_wiki_links.py
+import generate_report as gr
+from wiki_links import WikiLinker
+
+TITLES = [
+    "RIS-Aided ISAC: A Survey",
+    "Federated Learning Over Wireless Channels",
+    "Federated Learning Over Wireless Channels With Stragglers",
+]
+
+
+def test_links_quoted_bare_and_existing_titles_to_canonical_names():
+    linker = WikiLinker(TITLES, ["Satellite Networks"])
+    markdown = (
+        '- **Representative papers:** "ris aided isac - a survey", [[federated learning over wireless channels]]\n'
+        "- Builds on Federated learning over wireless channels with stragglers and on satellite networks.\n"
+        '- "A quoted phrase that is not a paper" and [[ISAC]] and [[Deep Unfolding For Massive MIMO Detection]]\n'
+    )
+    linked, unmatched = linker.link(markdown)
+    assert linked.splitlines() == [
+        "- **Representative papers:** [[RIS-Aided ISAC: A Survey]], [[Federated Learning Over Wireless Channels]]",
+        "- Builds on [[Federated Learning Over Wireless Channels With Stragglers]] and on [[Satellite Networks]].",
+        '- "A quoted phrase that is not a paper" and [[ISAC]] and [[Deep Unfolding For Massive MIMO Detection]]',
+    ]
+    assert unmatched == ["A quoted phrase that is not a paper", "Deep Unfolding For Massive MIMO Detection"]
+
+
+def test_headings_and_line_breaks_are_left_alone():
+    linker = WikiLinker(TITLES, ["Satellite Networks"])
+    markdown = "## Satellite Networks\nfederated learning over\nwireless channels\n"
+    assert linker.link(markdown) == (markdown, [])
+
+
+def test_code_urls_and_markdown_links_are_left_alone():
+    linker = WikiLinker(TITLES, ["Satellite Networks"])
+    markdown = (
+        "See [satellite networks](https://example.org/satellite-networks) and https://example.org/satellite/networks.\n"
+        "Run `python survey.py --topic \"satellite networks\"` first.\n"
+        "```\nfederated learning over wireless channels\n```\n"
+        "Plain satellite networks get linked.\n"
+    )
+    linked, unmatched = linker.link(markdown)
+    assert linked == markdown.replace("Plain satellite networks", "Plain [[Satellite Networks]]")
+    assert unmatched == []
+
+
+def test_resolve_wiki_links_keeps_topic_headings_for_the_registry():
+    linker = WikiLinker(TITLES, ["Integrated Sensing"])
+    markdown = "### 1. Integrated Sensing\n- Representative papers: \"RIS-aided ISAC: a survey\"\n"
+    linked, unmatched = gr.resolve_wiki_links(markdown, linker)
+    assert linked == "### 1. [[Integrated Sensing]]\n- Representative papers: [[RIS-Aided ISAC: A Survey]]\n"
+    assert unmatched == []
+    assert gr.extract_topics_from_markdown(linked) == ["Integrated Sensing"]
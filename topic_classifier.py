@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Local topic classifier trained on the LLM labels in paper_topics.
+
+Title and abstract are hashed into word unigram + bigram buckets and scored
+with multinomial Naive Bayes in NumPy. Training only adds counts, so new LLM
+labels are folded in incrementally (labels newer than the stored watermark).
+Predictions above a confidence threshold are stored as `local:nb` labels; the
+rest are left for label_papers.py to send to the LLM.
+
+Raw Naive Bayes posteriors are not calibrated: n-gram evidence is summed over
+hundreds of correlated tokens, so almost every long text scores ~1.0. The
+confidence is instead the posterior of the per-token average evidence scaled
+to EFFECTIVE_TOKENS tokens, which does not grow with text length. The
+threshold that keeps held-out agreement at TARGET_AGREEMENT is picked by
+--evaluate and stored with the model.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from ingest_openalex import connect_index
+
+N_FEATURES = 2 ** 16
+DEFAULT_ALPHA = 0.1
+DEFAULT_THRESHOLD = 0.9
+# Confidence is the posterior of a text this many tokens long with the paper's mean per-token evidence.
+EFFECTIVE_TOKENS = 10
+# --evaluate picks the lowest threshold whose held-out agreement reaches this.
+TARGET_AGREEMENT = 0.95
+# Rows reserved for classes when the count matrix first grows; it doubles when full.
+INITIAL_CLASS_CAPACITY = 16
+CLASSIFIER_FILE = "topic_classifier.npz"
+LOCAL_MODEL = "local:nb"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def classifier_text(paper: dict) -> str:
+    return f"{paper.get('title') or ''} {paper.get('abstract') or ''}"
+
+
+def topic_key(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+def hashed_features(text: str, n_features: int = N_FEATURES) -> np.ndarray:
+    """Bucket id of every word unigram and bigram (repeats kept); crc32 keeps buckets stable across runs."""
+    words = TOKEN_RE.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    ids = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+    return ids % n_features
+
+
+class TopicClassifier:
+    """Multinomial Naive Bayes over hashed n-grams; partial_fit only accumulates counts.
+
+    Topics differing only in case or spacing share a class. The class × feature
+    count matrix is over-allocated and doubled when full, so adding a class does
+    not copy it. The class each DOI was learned under is remembered: a paper
+    labelled again under the same topic is skipped, and one relabelled under a
+    new topic has its counts moved rather than added twice.
+    """
+
+    def __init__(self, n_features: int = N_FEATURES, alpha: float = DEFAULT_ALPHA) -> None:
+        self.n_features = n_features
+        self.alpha = alpha
+        self.threshold = DEFAULT_THRESHOLD
+        self.classes: list[str] = []
+        self.trained_until = ""
+        self.trained: dict[str, int] = {}  # DOI → class index it was learned under
+        self._index: dict[str, int] = {}
+        self._feature_counts = np.zeros((0, n_features), dtype=np.float32)
+        self._class_counts = np.zeros(0, dtype=np.float64)
+        self._log_prior: np.ndarray | None = None
+        self._log_likelihood: np.ndarray | None = None
+
+    @property
+    def feature_counts(self) -> np.ndarray:
+        return self._feature_counts[: len(self.classes)]
+
+    @property
+    def class_counts(self) -> np.ndarray:
+        return self._class_counts[: len(self.classes)]
+
+    @property
+    def n_trained(self) -> int:
+        return int(self.class_counts.sum())
+
+    def _class_index(self, topic: str) -> int:
+        key = topic_key(topic)
+        index = self._index.get(key)
+        if index is not None:
+            return index
+        index = len(self.classes)
+        if index == len(self._class_counts):
+            capacity = max(INITIAL_CLASS_CAPACITY, 2 * index)
+            grown = np.zeros((capacity, self.n_features), dtype=np.float32)
+            grown[:index] = self._feature_counts
+            self._feature_counts = grown
+            self._class_counts = np.concatenate([self._class_counts, np.zeros(capacity - index)])
+        self.classes.append(topic)
+        self._index[key] = index
+        return index
+
+    def partial_fit(self, texts: list[str], topics: list[str], dois: list[str] | None = None) -> int:
+        """Add labelled texts; return how many changed the counts.
+
+        With dois, a DOI already learned under the same topic is skipped, and one
+        learned under another topic first has its current text's counts removed
+        from that class.
+        """
+        changed = 0
+        for i, (text, topic) in enumerate(zip(texts, topics)):
+            c = self._class_index(topic)
+            doi = dois[i] if dois else None
+            previous = self.trained.get(doi) if doi else None
+            if previous == c:
+                continue
+            features = hashed_features(text, self.n_features)
+            if previous is not None:
+                old = self._feature_counts[previous]
+                np.subtract.at(old, features, 1)
+                np.maximum(old, 0, out=old)
+                self._class_counts[previous] = max(0.0, self._class_counts[previous] - 1)
+            np.add.at(self._feature_counts[c], features, 1)
+            self._class_counts[c] += 1
+            if doi:
+                self.trained[doi] = c
+            changed += 1
+        self._log_prior = self._log_likelihood = None
+        return changed
+
+    def _tables(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._log_likelihood is None:
+            smoothed = self.feature_counts + self.alpha
+            log_likelihood = np.log(smoothed / smoothed.sum(axis=1, keepdims=True)).astype(np.float32)
+            # Features × classes, so scoring a paper gathers contiguous rows.
+            self._log_likelihood = np.ascontiguousarray(log_likelihood.T)
+            self._log_prior = np.log(self.class_counts / self.class_counts.sum())
+        return self._log_prior, self._log_likelihood
+
+    def predict(self, texts: list[str]) -> list[tuple[str, float]]:
+        """(topic, calibrated confidence) per text; see the module docstring."""
+        if not self.classes:
+            raise ValueError("Classifier has no training data")
+        log_prior, log_likelihood = self._tables()
+        out = []
+        for text in texts:
+            features = hashed_features(text, self.n_features)
+            evidence = log_likelihood[features].mean(axis=0) if len(features) else 0.0
+            scores = log_prior + EFFECTIVE_TOKENS * evidence
+            probs = np.exp(scores - scores.max())
+            probs /= probs.sum()
+            best = int(np.argmax(probs))
+            out.append((self.classes[best], float(probs[best])))
+        return out
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            classes=np.asarray(self.classes, dtype=str),
+            feature_counts=self.feature_counts,
+            class_counts=self.class_counts,
+            meta=np.asarray([self.n_features, self.alpha, self.threshold]),
+            trained_until=np.asarray(self.trained_until),
+            trained_dois=np.asarray(list(self.trained), dtype=str),
+            trained_classes=np.asarray(list(self.trained.values()), dtype=np.int32),
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "TopicClassifier":
+        with np.load(path) as data:
+            n_features, alpha, *rest = data["meta"].tolist()
+            model = cls(int(n_features), float(alpha))
+            model.threshold = float(rest[0]) if rest else DEFAULT_THRESHOLD
+            model.classes = data["classes"].tolist()
+            model._index = {topic_key(t): i for i, t in enumerate(model.classes)}
+            model._feature_counts = data["feature_counts"]
+            model._class_counts = data["class_counts"]
+            model.trained_until = str(data["trained_until"])
+            if "trained_dois" in data.files:
+                model.trained = dict(zip(data["trained_dois"].tolist(), data["trained_classes"].tolist()))
+        return model
+
+
+def llm_labeled_papers(conn, after: str = "") -> list[dict]:
+    """LLM-labeled papers (never our own local labels), oldest label first."""
+    rows = conn.execute(
+        "SELECT p.doi, p.title, p.published, t.topic, t.labeled_at FROM paper_topics t "
+        "JOIN papers p ON p.doi = t.doi "
+        "WHERE t.model NOT LIKE 'local:%' AND t.labeled_at > ? ORDER BY t.labeled_at",
+        (after,),
+    )
+    return [
+        {"doi": doi, "title": title or "", "published": published or "", "topic": topic, "labeled_at": labeled_at}
+        for doi, title, published, topic, labeled_at in rows
+    ]
+
+
+def train_incremental(model: TopicClassifier, papers: list[dict]) -> int:
+    """Fold newly labeled papers (with abstracts attached) into model; return how many changed it.
+
+    Relabelled papers replace their earlier label rather than counting twice.
+    """
+    if not papers:
+        return 0
+    added = model.partial_fit(
+        [classifier_text(p) for p in papers], [p["topic"] for p in papers], [p["doi"] for p in papers]
+    )
+    model.trained_until = max(model.trained_until, *(p["labeled_at"] for p in papers))
+    return added
+
+
+def route_predictions(
+    model: TopicClassifier,
+    papers: list[dict],
+    threshold: float | None = None,
+) -> tuple[list[tuple[str, str]], list[dict]]:
+    """Split papers into confident local (doi, topic) labels and papers left for the LLM.
+
+    threshold defaults to the one stored with the model by --evaluate.
+    """
+    threshold = model.threshold if threshold is None else threshold
+    confident: list[tuple[str, str]] = []
+    uncertain: list[dict] = []
+    for paper, (topic, confidence) in zip(papers, model.predict([classifier_text(p) for p in papers])):
+        if confidence >= threshold:
+            confident.append((paper["doi"], topic))
+        else:
+            uncertain.append(paper)
+    return confident, uncertain
+
+
+def is_holdout(doi: str, fraction: int = 5) -> bool:
+    """Deterministic ~1/fraction split, stable across runs and machines."""
+    return zlib.crc32(doi.encode("utf-8")) % fraction == 0
+
+
+def pick_threshold(confidences: list[float], hits: list[bool], target: float = TARGET_AGREEMENT) -> float | None:
+    """Lowest confidence threshold whose predictions at or above it agree with the LLM at target; None if none do."""
+    order = np.argsort(-np.asarray(confidences, dtype=np.float64), kind="stable")
+    sorted_conf = np.asarray(confidences, dtype=np.float64)[order]
+    agreement = np.cumsum(np.asarray(hits, dtype=np.float64)[order]) / np.arange(1, len(order) + 1)
+    # A cut is only possible between distinct confidences.
+    cut = np.r_[sorted_conf[1:] < sorted_conf[:-1], True]
+    ok = np.flatnonzero((agreement >= target) & cut)
+    return float(sorted_conf[ok[-1]]) if len(ok) else None
+
+
+@dataclass
+class Evaluation:
+    n_train: int
+    n_test: int
+    threshold: float
+    accuracy: float
+    coverage: float
+    confident_accuracy: float
+    suggested_threshold: float | None = None
+    per_topic: list[tuple[str, int, float, float]] = field(default_factory=list)  # topic, support, precision, recall
+
+    def render(self) -> str:
+        lines = [
+            f"Train: {self.n_train} papers | held out: {self.n_test} papers",
+            f"Agreement with LLM labels: {self.accuracy:.1%}",
+            f"Confidence >= {self.threshold:g}: {self.coverage:.1%} of papers, {self.confident_accuracy:.1%} agreement",
+            (
+                f"Suggested threshold ({TARGET_AGREEMENT:.0%} agreement): {self.suggested_threshold:.3f}"
+                if self.suggested_threshold is not None
+                else f"No threshold reaches {TARGET_AGREEMENT:.0%} agreement"
+            ),
+            "",
+            "| Topic | Support | Precision | Recall |",
+            "|-------|---------|-----------|--------|",
+        ]
+        lines.extend(f"| {t} | {n} | {p:.2f} | {r:.2f} |" for t, n, p, r in self.per_topic)
+        return "\n".join(lines)
+
+
+def evaluate(
+    papers: list[dict],
+    threshold: float = DEFAULT_THRESHOLD,
+    n_features: int = N_FEATURES,
+    alpha: float = DEFAULT_ALPHA,
+) -> Evaluation:
+    """Train on ~80% of labeled papers and measure agreement with the LLM on the rest."""
+    train = [p for p in papers if not is_holdout(p["doi"])]
+    test = [p for p in papers if is_holdout(p["doi"])]
+    if not train or not test:
+        raise ValueError(f"Need labeled papers on both sides of the split (train={len(train)}, test={len(test)})")
+    model = TopicClassifier(n_features, alpha)
+    model.partial_fit([classifier_text(p) for p in train], [p["topic"] for p in train])
+    predictions = model.predict([classifier_text(p) for p in test])
+
+    truth = [p["topic"] for p in test]
+    guessed = [topic for topic, _ in predictions]
+    hits = [t == g for t, g in zip(truth, guessed)]
+    confidences = [conf for _, conf in predictions]
+    confident = [h for h, conf in zip(hits, confidences) if conf >= threshold]
+
+    per_topic = []
+    for topic in sorted(set(truth), key=lambda t: (-truth.count(t), t)):
+        support = truth.count(topic)
+        predicted = guessed.count(topic)
+        correct = sum(1 for t, g in zip(truth, guessed) if t == g == topic)
+        per_topic.append((topic, support, correct / predicted if predicted else 0.0, correct / support))
+
+    return Evaluation(
+        n_train=len(train),
+        n_test=len(test),
+        threshold=threshold,
+        accuracy=sum(hits) / len(hits),
+        coverage=len(confident) / len(hits),
+        confident_accuracy=sum(confident) / len(confident) if confident else 0.0,
+        suggested_threshold=pick_threshold(confidences, hits),
+        per_topic=per_topic,
+    )
+
+
+def main() -> None:
+    from label_papers import attach_abstracts, ensure_topics_table
+
+    parser = argparse.ArgumentParser(description="Train and evaluate the local topic classifier on LLM labels.")
+    parser.add_argument("--resource-dir", default="resource", help="Path to resource folder")
+    parser.add_argument("--rebuild", action="store_true", help="Retrain from scratch instead of adding new labels.")
+    parser.add_argument(
+        "--evaluate",
+        action="store_true",
+        help="Report agreement with LLM labels on a held-out split and store the suggested threshold with the model.",
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Confidence threshold to report on")
+    parser.add_argument(
+        "--week-start-day",
+        default="monday",
+        choices=["monday", "sunday"],
+        help="Week convention of resource/by_publication_week (see ingest_openalex.py).",
+    )
+    args = parser.parse_args()
+
+    resource_dir = Path(args.resource_dir)
+    db_path = resource_dir / "index.sqlite"
+    if not db_path.exists():
+        print(f"Missing index: {db_path}", file=sys.stderr)
+        sys.exit(1)
+    model_path = resource_dir / CLASSIFIER_FILE
+    conn = connect_index(db_path)
+    try:
+        ensure_topics_table(conn)
+        if args.evaluate:
+            papers = llm_labeled_papers(conn)
+            attach_abstracts(papers, resource_dir / "by_publication_week", args.week_start_day)
+            try:
+                report = evaluate(papers, args.threshold)
+            except ValueError as exc:
+                print(exc, file=sys.stderr)
+                sys.exit(1)
+            print(report.render())
+            if report.suggested_threshold is not None and model_path.exists():
+                model = TopicClassifier.load(model_path)
+                model.threshold = report.suggested_threshold
+                model.save(model_path)
+                print(f"Stored threshold {model.threshold:.3f} in {model_path}")
+            return
+
+        model = TopicClassifier() if args.rebuild or not model_path.exists() else TopicClassifier.load(model_path)
+        papers = llm_labeled_papers(conn, model.trained_until)
+        attach_abstracts(papers, resource_dir / "by_publication_week", args.week_start_day)
+        added = train_incremental(model, papers)
+        if not model.classes:
+            print("No LLM labels yet; run label_papers.py first.", file=sys.stderr)
+            sys.exit(1)
+        model.save(model_path)
+        print(f"Added {added} labels; trained on {model.n_trained} papers across {len(model.classes)} topics → {model_path}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Cluster window papers by embedding and count them exactly.
+
+Spherical mini-batch k-means runs over the L2-normalized vectors from
+embed_papers.py. Per-topic, per-venue and first/second-half counts are computed
+with bincount, so the report numbers come from the data rather than from the
+LLM; the LLM only names the clusters and writes the narrative.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+
+def kmeans_plus_plus(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding on unit vectors using cosine distance."""
+    centroids = np.empty((k, X.shape[1]), dtype=np.float32)
+    centroids[0] = X[rng.integers(len(X))]
+    closest = 1.0 - X @ centroids[0]
+    for i in range(1, k):
+        weights = np.clip(closest, 0, None)
+        total = weights.sum()
+        idx = rng.choice(len(X), p=weights / total) if total > 0 else rng.integers(len(X))
+        centroids[i] = X[idx]
+        closest = np.minimum(closest, 1.0 - X @ centroids[i])
+    return centroids
+
+
+def normalize_rows(X: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.where(norms == 0, 1.0, norms)
+
+
+def minibatch_kmeans(
+    X: np.ndarray,
+    k: int,
+    batch_size: int = 1024,
+    n_iter: int = 100,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Spherical mini-batch k-means; return (unit centroids, labels for every row)."""
+    X = normalize_rows(np.asarray(X, dtype=np.float32))
+    k = max(1, min(k, len(X)))
+    rng = np.random.default_rng(seed)
+    centroids = kmeans_plus_plus(X, k, rng)
+    counts = np.zeros(k, dtype=np.float64)
+    batch_size = min(batch_size, len(X))
+    for _ in range(n_iter):
+        batch = X[rng.choice(len(X), size=batch_size, replace=False)]
+        labels = np.argmax(batch @ centroids.T, axis=1)
+        batch_counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, batch)
+        counts += batch_counts
+        hit = batch_counts > 0
+        # Per-centre learning rate 1/n: a running mean over every sample it has seen.
+        rate = (batch_counts[hit] / counts[hit])[:, None]
+        centroids[hit] = (1 - rate) * centroids[hit] + rate * (sums[hit] / batch_counts[hit][:, None])
+        centroids = normalize_rows(centroids)
+    return centroids, np.argmax(X @ centroids.T, axis=1)
+
+
+@dataclass
+class ClusterStats:
+    labels: np.ndarray          # (n,) cluster id per paper
+    order: list[int]            # cluster ids, largest first (topic N = order[N-1])
+    sizes: np.ndarray           # (k,)
+    venues: list[str]           # column order of venue_counts, most papers first
+    venue_counts: np.ndarray    # (k, V)
+    first_half: np.ndarray      # (k,)
+    second_half: np.ndarray     # (k,)
+    representatives: list[list[int]]  # per cluster: paper indices nearest the centroid
+
+
+def assignment_stats(labels: np.ndarray, k: int, venues: list[str], weeks: list[str]) -> ClusterStats:
+    """Exact per-cluster counts by venue and window half for any paper → cluster assignment.
+
+    Representatives are left empty; cluster_stats fills them from embeddings.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    sizes = np.bincount(labels, minlength=k)
+
+    venue_names, venue_idx = np.unique(np.asarray(venues, dtype=object).astype(str), return_inverse=True)
+    V = len(venue_names)
+    venue_counts = np.bincount(labels * V + venue_idx, minlength=k * V).reshape(k, V)
+    column_order = np.argsort(-venue_counts.sum(axis=0), kind="stable")
+
+    week_names, week_idx = np.unique(np.asarray(weeks, dtype=object).astype(str), return_inverse=True)
+    midpoint = len(week_names) / 2
+    second = week_idx >= midpoint
+    first_half = np.bincount(labels[~second], minlength=k)
+    second_half = np.bincount(labels[second], minlength=k)
+
+    return ClusterStats(
+        labels=labels,
+        order=np.argsort(-sizes, kind="stable").tolist(),
+        sizes=sizes,
+        venues=[str(venue_names[i]) for i in column_order],
+        venue_counts=venue_counts[:, column_order],
+        first_half=first_half,
+        second_half=second_half,
+        representatives=[[] for _ in range(k)],
+    )
+
+
+def cluster_stats(
+    X: np.ndarray,
+    centroids: np.ndarray,
+    labels: np.ndarray,
+    venues: list[str],
+    weeks: list[str],
+    n_representatives: int = 5,
+) -> ClusterStats:
+    """Exact per-cluster counts by venue and window half, plus representative papers."""
+    k = len(centroids)
+    stats = assignment_stats(labels, k, venues, weeks)
+    similarity = np.einsum("ij,ij->i", normalize_rows(np.asarray(X, dtype=np.float32)), centroids[labels])
+    for c in range(k):
+        members = np.flatnonzero(labels == c)
+        stats.representatives[c] = members[np.argsort(-similarity[members], kind="stable")[:n_representatives]].tolist()
+    return stats
+
+
+def venue_label(venue_id: str) -> str:
+    return re.sub(r"^ieee_", "", venue_id).upper()
+
+
+def trend_arrow(first: int, second: int) -> str:
+    if second > first * 1.2 and second - first >= 2:
+        return "↑ rising"
+    if first > second * 1.2 and first - second >= 2:
+        return "↓ declining"
+    return "→ stable"
+
+
+def build_cluster_summary(stats: ClusterStats, entries: list[dict]) -> str:
+    """Prompt block: one section per cluster with exact counts and representative papers."""
+    blocks = []
+    for rank, c in enumerate(stats.order, start=1):
+        venue_counts = ", ".join(
+            f"{v}: {n}" for v, n in zip(stats.venues, stats.venue_counts[c].tolist()) if n
+        )
+        lines = [
+            f"## Cluster {rank}",
+            f"Papers: {int(stats.sizes[c])} | first half: {int(stats.first_half[c])} | second half: {int(stats.second_half[c])}",
+            f"Venues: {venue_counts}",
+            "Representative papers (title | venue_id | year-month | citation_count | abstract_snippet):",
+        ]
+        lines.extend(f"- {entries[i]['line']}" for i in stats.representatives[c])
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def render_venue_breakdown(names: list[str], stats: ClusterStats) -> str:
+    header = "| Topic | " + " | ".join(venue_label(v) for v in stats.venues) + " |"
+    divider = "|-------|" + "|".join("-" * max(3, len(venue_label(v)) + 2) for v in stats.venues) + "|"
+    rows = []
+    for name, c in zip(names, stats.order):
+        counts = " | ".join(str(n) for n in stats.venue_counts[c].tolist())
+        rows.append(f"| {name} | {counts} |")
+    return "\n".join([header, divider, *rows])
+
+
+def render_trend_signals(names: list[str], stats: ClusterStats) -> str:
+    lines = []
+    for name, c in zip(names, stats.order):
+        first, second = int(stats.first_half[c]), int(stats.second_half[c])
+        lines.append(
+            f"- **{name}:** {trend_arrow(first, second)} — {first} papers in first half → {second} in second half"
+        )
+    return "\n".join(lines)
+
+
+def replace_section(markdown: str, heading: str, body: str) -> str:
+    """Replace the body of '## heading' up to the next '## ' heading; append the section if absent."""
+    pattern = re.compile(rf"(^## {re.escape(heading)}[^\n]*\n)(.*?)(?=^## |\Z)", re.M | re.S)
+    if pattern.search(markdown):
+        return pattern.sub(lambda m: f"{m.group(1)}\n{body}\n\n", markdown, count=1)
+    return f"{markdown.rstrip()}\n\n## {heading}\n\n{body}\n"
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import quote
+
+from paper_corpus import load_env_file
+
+DEFAULT_CATALOG_PATH = "resource/venue_catalog.sqlite"
+DEFAULT_REFRESH_FILTER = "type:journal|conference"
+# A best match is assigned without review when it scores ACCEPT_SCORE, or
+# MARGIN_SCORE with a lead of MIN_MARGIN over the runner-up.
+ACCEPT_SCORE = 0.8
+MARGIN_SCORE = 0.6
+MIN_MARGIN = 0.3
+
+
+@dataclass
+class CatalogEntry:
+    source_id: str
+    display_name: str
+    type: str
+    works_count: int
+    host_organization: str
+    matched_name: str
+    score: float
+
+
+def normalize_name(name: str) -> str:
+    text = name.lower().replace("&", " and ")
+    text = re.sub(r"[^\w]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def trigrams(name: str) -> List[str]:
+    """Return the distinct character trigrams of a normalized, space-padded name."""
+    text = f"  {normalize_name(name)} "
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+
+def open_catalog(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sources (
+            source_id TEXT PRIMARY KEY,
+            display_name TEXT,
+            type TEXT,
+            works_count INTEGER,
+            host_organization TEXT,
+            issn_l TEXT,
+            updated_at TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS source_names (
+            name_id INTEGER PRIMARY KEY,
+            source_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            n_trigrams INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS name_trigrams (
+            trigram TEXT NOT NULL,
+            name_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, name_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_source_names_source ON source_names(source_id)")
+    return conn
+
+
+def source_names(record: dict) -> List[str]:
+    """Return display, abbreviated and alternate titles of an OpenAlex source."""
+    names = [record.get("display_name") or ""]
+    names.append(record.get("abbreviated_title") or "")
+    names.extend(record.get("alternate_titles") or [])
+    return [n for n in dict.fromkeys(n.strip() for n in names) if n and normalize_name(n)]
+
+
+def upsert_sources(conn: sqlite3.Connection, records: Iterable[dict]) -> int:
+    """Insert or replace OpenAlex source objects and their trigram postings."""
+    count = 0
+    now = datetime.now(timezone.utc).isoformat()
+    for record in records:
+        openalex_id = record.get("id")
+        if not openalex_id:
+            continue
+        source_id = openalex_id.rsplit("/", 1)[-1]
+        host = record.get("host_organization_name") or ""
+        works_count = record.get("works_count")
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO sources
+            (source_id, display_name, type, works_count, host_organization, issn_l, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                source_id,
+                record.get("display_name") or "",
+                record.get("type") or "",
+                works_count if isinstance(works_count, int) else 0,
+                host,
+                record.get("issn_l") or "",
+                now,
+            ),
+        )
+        old_ids = [r[0] for r in conn.execute("SELECT name_id FROM source_names WHERE source_id = ?", (source_id,))]
+        if old_ids:
+            conn.executemany("DELETE FROM name_trigrams WHERE name_id = ?", [(i,) for i in old_ids])
+            conn.execute("DELETE FROM source_names WHERE source_id = ?", (source_id,))
+        for name in source_names(record):
+            grams = trigrams(name)
+            cur = conn.execute(
+                "INSERT INTO source_names (source_id, name, n_trigrams) VALUES (?, ?, ?)",
+                (source_id, name, len(grams)),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO name_trigrams (trigram, name_id) VALUES (?, ?)",
+                [(g, cur.lastrowid) for g in grams],
+            )
+        count += 1
+        if count % 1000 == 0:
+            conn.commit()
+    conn.commit()
+    return count
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int = 10, min_score: float = 0.2) -> List[CatalogEntry]:
+    """Fuzzy-match query against catalog names by trigram Jaccard similarity.
+
+    Candidates whose similarity rounds to the same tenth are ordered by
+    works_count, so the active source of a venue beats stale or yearly
+    variants with nearly identical names.
+    """
+    grams = trigrams(query)
+    if not grams:
+        return []
+    placeholders = ",".join("?" for _ in grams)
+    rows = conn.execute(
+        f"""
+        SELECT s.source_id, s.display_name, s.type, s.works_count, s.host_organization, n.name,
+               m.shared * 1.0 / (n.n_trigrams + ? - m.shared) AS score
+        FROM (
+            SELECT name_id, COUNT(*) AS shared
+            FROM name_trigrams
+            WHERE trigram IN ({placeholders})
+            GROUP BY name_id
+        ) AS m
+        JOIN source_names AS n ON n.name_id = m.name_id
+        JOIN sources AS s ON s.source_id = n.source_id
+        """,
+        [len(grams), *grams],
+    ).fetchall()
+
+    best: Dict[str, CatalogEntry] = {}
+    for source_id, display_name, type_, works_count, host, name, score in rows:
+        if score < min_score:
+            continue
+        current = best.get(source_id)
+        if current is None or score > current.score:
+            best[source_id] = CatalogEntry(source_id, display_name, type_, works_count or 0, host, name, score)
+    ranked = sorted(best.values(), key=lambda e: (round(e.score, 1), e.works_count, e.score), reverse=True)
+    return ranked[:limit]
+
+
+def is_confident(matches: List[CatalogEntry]) -> bool:
+    """Whether the top result of search() is safe to assign without review."""
+    if not matches:
+        return False
+    top = matches[0]
+    if top.score >= ACCEPT_SCORE:
+        return True
+    runner_up = max((e.score for e in matches[1:]), default=0.0)
+    return top.score >= MARGIN_SCORE and top.score - runner_up >= MIN_MARGIN
+
+
+def iter_openalex_sources(
+    api_key: Optional[str],
+    email: Optional[str],
+    filter_query: Optional[str],
+) -> Iterator[dict]:
+    from ingest_openalex import fetch_json
+
+    headers: Dict[str, str] = {}
+    if api_key:
+        headers["api-key"] = api_key
+    if email:
+        headers["From"] = email
+    cursor = "*"
+    while cursor:
+        url = (
+            "https://api.openalex.org/sources?"
+            + (f"filter={quote(filter_query)}&" if filter_query else "")
+            + f"per-page=200&cursor={quote(cursor)}"
+            + "&select=id,display_name,abbreviated_title,alternate_titles,type,works_count,host_organization_name,issn_l"
+        )
+        data = fetch_json(url, headers=headers)
+        results = data.get("results") or []
+        yield from results
+        cursor = data.get("meta", {}).get("next_cursor")
+        if not results:
+            break
+
+
+def iter_snapshot_sources(path: Path) -> Iterator[dict]:
+    """Yield source objects from an OpenAlex snapshot (JSON Lines, optionally gzipped)."""
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for file_path in files:
+        if file_path.suffix not in {".gz", ".jsonl", ".json"}:
+            continue
+        opener = gzip.open if file_path.suffix == ".gz" else open
+        with opener(file_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def format_entry(entry: CatalogEntry) -> str:
+    return f"{entry.source_id}\t{entry.type}\t{entry.works_count}\t{entry.score:.2f}\t{entry.display_name}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline OpenAlex venue catalog for source-ID lookup.")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH, help="Path to catalog SQLite file.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    refresh = sub.add_parser("refresh", help="Load sources from the OpenAlex API or a snapshot")
+    refresh.add_argument("--snapshot", help="OpenAlex sources snapshot file or directory (JSON Lines, .gz ok).")
+    refresh.add_argument(
+        "--filter",
+        default=DEFAULT_REFRESH_FILTER,
+        help=f"OpenAlex /sources filter for API refresh (default: {DEFAULT_REFRESH_FILTER}).",
+    )
+
+    find = sub.add_parser("search", help="Fuzzy-search venue names")
+    find.add_argument("query")
+    find.add_argument("--limit", type=int, default=10)
+
+    args = parser.parse_args()
+    catalog_path = Path(args.catalog)
+
+    if args.cmd == "search":
+        if not catalog_path.exists():
+            print(f"Catalog not found: {catalog_path}. Run 'venue_catalog.py refresh' first.", file=sys.stderr)
+            sys.exit(1)
+        conn = open_catalog(catalog_path)
+        try:
+            for entry in search(conn, args.query, limit=args.limit):
+                print(format_entry(entry))
+        finally:
+            conn.close()
+        return
+
+    if args.snapshot:
+        records = iter_snapshot_sources(Path(args.snapshot))
+    else:
+        load_env_file(Path("openalex.env"))
+        records = iter_openalex_sources(os.getenv("OPENALEX_API_KEY"), os.getenv("OPENALEX_EMAIL"), args.filter)
+    conn = open_catalog(catalog_path)
+    try:
+        count = upsert_sources(conn, records)
+    finally:
+        conn.close()
+    print(f"Catalog updated: {count} sources → {catalog_path}")
+
+
+if __name__ == "__main__":
+    main()
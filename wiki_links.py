@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Resolve report wiki-links against the window's paper titles and the topic registry.
+
+All titles and topic names are compiled into one word-level Aho-Corasick
+automaton (aho_corasick.py), keyed on lowercased word sequences, so matching
+ignores case and punctuation ("RIS-aided ISAC" = "RIS Aided ISAC"). The report
+is tokenized once and scanned once, however many titles there are:
+
+- existing [[links]] and "quoted strings" are looked up directly; matches are
+  rewritten to the canonical [[Title]];
+- bare mentions of a known title or topic (2+ words) become [[Title]];
+- cited spans that look like titles (TITLE_MIN_WORDS+ words) but match
+  nothing are reported, and quoted ones are left unlinked.
+
+Headings, fenced and inline code, [text](url) links and bare URLs are copied
+verbatim: nothing inside them is linked or reported.
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Iterable
+
+from aho_corasick import AhoCorasick
+
+WORD_RE = re.compile(r"\w+")
+LINK_RE = re.compile(r"\[\[([^\[\]\n]+)\]\]")
+QUOTED_RE = re.compile(r'"([^"\n]{10,})"')
+HEADING_RE = re.compile(r"^#{1,6} .*$", re.M)
+FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})[^\n]*\n.*?(?:^ {0,3}\1[^\n]*$|\Z)", re.M | re.S)
+INLINE_CODE_RE = re.compile(r"(`+)[^`\n]+\1")
+MARKDOWN_LINK_RE = re.compile(r"!?\[[^\[\]\n]*\]\([^()\n]*\)")
+URL_RE = re.compile(r"<?\b(?:https?|ftp)://[^\s<>]+|\bwww\.[^\s<>]+")
+VERBATIM_RES = (HEADING_RE, FENCE_RE, INLINE_CODE_RE, MARKDOWN_LINK_RE, URL_RE)
+# Cited spans this long are expected to be paper titles and reported when unknown.
+TITLE_MIN_WORDS = 4
+# Shorter names are only resolved inside links or quotes, never in running text.
+MIN_BARE_WORDS = 2
+
+
+def title_key(text: str) -> tuple[str, ...]:
+    return tuple(WORD_RE.findall(text.lower()))
+
+
+def merge_spans(spans: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sorted, non-overlapping (start, end) spans covering the same characters."""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class WikiLinker:
+    def __init__(self, titles: Iterable[str], topics: Iterable[str] = ()) -> None:
+        self.names: list[str] = []
+        self.keys: dict[tuple[str, ...], int] = {}
+        for name in (*titles, *topics):
+            key = title_key(name or "")
+            if key and key not in self.keys:
+                self.keys[key] = len(self.names)
+                self.names.append(" ".join(name.split()).strip("[] "))
+        self.automaton = AhoCorasick(self.keys)
+
+    def resolve(self, text: str) -> str | None:
+        """Canonical title or topic name for text, or None."""
+        index = self.keys.get(title_key(text))
+        return None if index is None else self.names[index]
+
+    def link(self, markdown: str) -> tuple[str, list[str]]:
+        """Return (markdown with resolved links, cited titles that match no paper or topic)."""
+        edits: list[tuple[int, int, str]] = []
+        unmatched: list[str] = []
+        verbatim = merge_spans(m.span() for regex in VERBATIM_RES for m in regex.finditer(markdown))
+        verbatim_starts = [start for start, _ in verbatim]
+        cited = sorted(
+            (m.start(), m.end(), m.group(1)) for regex in (LINK_RE, QUOTED_RE) for m in regex.finditer(markdown)
+        )
+        protected: list[tuple[int, int]] = []
+        for start, end, inner in cited:
+            v = bisect_right(verbatim_starts, start) - 1
+            if (v >= 0 and start < verbatim[v][1]) or (protected and start < protected[-1][1]):
+                continue  # inside a heading, code, URL or Markdown link, or a quote inside a link
+            protected.append((start, end))
+            name = self.resolve(inner)
+            if name is not None:
+                edits.append((start, end, f"[[{name}]]"))
+            elif len(title_key(inner)) >= TITLE_MIN_WORDS:
+                unmatched.append(inner.strip())
+        protected = merge_spans(protected + verbatim)
+
+        tokens = list(WORD_RE.finditer(markdown))
+        guarded = []
+        p = 0
+        for token in tokens:
+            while p < len(protected) and protected[p][1] <= token.start():
+                p += 1
+            guarded.append(p < len(protected) and protected[p][0] <= token.start())
+        words = [t.group(0).lower() for t in tokens]
+
+        candidates = sorted(
+            (start, -(end - start), pid)
+            for start, end, pid in self.automaton.iter_matches(words)
+            if end - start >= MIN_BARE_WORDS
+        )
+        next_free = 0
+        for start, negative_length, pid in candidates:
+            end = start - negative_length
+            if start < next_free or any(guarded[start:end]):
+                continue
+            first, last = tokens[start].start(), tokens[end - 1].end()
+            if "\n" in markdown[first:last]:
+                continue
+            edits.append((first, last, f"[[{self.names[pid]}]]"))
+            next_free = end
+
+        parts = []
+        position = 0
+        for start, end, text in sorted(edits):
+            parts.append(markdown[position:start])
+            parts.append(text)
+            position = end
+        parts.append(markdown[position:])
+        return "".join(parts), list(dict.fromkeys(unmatched))